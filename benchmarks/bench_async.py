@@ -0,0 +1,106 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import argparse
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pathlib import Path
+import sys
+
+# Ruta absoluta a la raíz del proyecto y a src/
+ROOT_DIR = Path(__file__).resolve().parent.parent
+for ruta in (ROOT_DIR, ROOT_DIR / "src"):
+    if str(ruta) not in sys.path:
+        sys.path.insert(0, str(ruta))
+
+import crud_libros
+from acceso_async import AccesoAsync
+from isbn import _digito_control_13
+from comun import agregar_backend, preparar_destino
+
+#********************************************************************************
+#   BENCH_ASYNC - Compara el API síncrono (un hilo por llamador) contra
+#                 AccesoAsync (una corrutina por llamador) con 1, 10 y 100
+#                 llamadores concurrentes sobre una base de datos temporal.
+#
+#   Uso:  python benchmarks/bench_async.py [--libros 5000] [--operaciones 2000]
+#                                          [--backend archivo|memoria]
+#********************************************************************************
+
+def _isbn(n):
+    base = f"978{n:09d}"
+    return base + _digito_control_13(base)
+
+def _preparar(libros, backend):
+    preparar_destino(backend, "bench_async")
+    filas = [
+        (_isbn(i), f"Libro {i}", f"Autor {i % 500}", 1950 + i % 70, f"Editorial {i % 40}")
+        for i in range(libros)
+    ]
+    crud_libros.insertar_libros_batch(filas)
+    return [fila[0] for fila in filas]
+
+def _operacion(isbns, rng, contador):
+    # Mezcla 90 % lecturas / 10 % escrituras, como el uso típico del catálogo
+    if rng.random() < 0.9:
+        return ("buscar_libro", (rng.choice(isbns),))
+    n = next(contador)
+    return ("insertar_libro", (_isbn(10_000_000 + n), f"Nuevo {n}", "Autor", 2024, "Editorial"))
+
+def _sync(isbns, llamadores, operaciones, semilla):
+    rng = random.Random(semilla)
+    contador = iter(range(10**9))
+    plan = [_operacion(isbns, rng, contador) for _ in range(operaciones)]
+    crud_libros._cache_libros.limpiar()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=llamadores) as hilos:
+        list(hilos.map(lambda op: getattr(crud_libros, op[0])(*op[1]), plan))
+    return time.perf_counter() - inicio
+
+def _async(isbns, llamadores, operaciones, semilla):
+    rng = random.Random(semilla)
+    contador = iter(range(10**9, 2 * 10**9))
+    plan = [_operacion(isbns, rng, contador) for _ in range(operaciones)]
+    crud_libros._cache_libros.limpiar()
+
+    async def principal():
+        acceso = AccesoAsync()
+        cola = iter(plan)
+
+        async def llamador():
+            for nombre, args in cola:
+                await getattr(acceso, nombre)(*args)
+
+        try:
+            await asyncio.gather(*(llamador() for _ in range(llamadores)))
+        finally:
+            acceso.cerrar()
+
+    inicio = time.perf_counter()
+    asyncio.run(principal())
+    return time.perf_counter() - inicio
+
+def _main():
+    parser = argparse.ArgumentParser(description="Benchmark API síncrono vs asíncrono")
+    parser.add_argument("--libros", type=int, default=5000)
+    parser.add_argument("--operaciones", type=int, default=2000)
+    parser.add_argument("--semilla", type=int, default=42)
+    agregar_backend(parser)
+    args = parser.parse_args()
+
+    isbns = _preparar(args.libros, args.backend)
+    print(f"{'llamadores':>10} {'sync op/s':>12} {'async op/s':>12}")
+    for llamadores in (1, 10, 100):
+        t_sync = _sync(isbns, llamadores, args.operaciones, args.semilla)
+        t_async = _async(isbns, llamadores, args.operaciones, args.semilla)
+        print(
+            f"{llamadores:>10} {args.operaciones / t_sync:>12.0f} "
+            f"{args.operaciones / t_async:>12.0f}"
+        )
+
+if __name__ == "__main__":
+    _main()
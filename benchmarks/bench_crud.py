@@ -0,0 +1,203 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from pathlib import Path
+import sys
+
+# Ruta absoluta a la raíz del proyecto y a src/
+ROOT_DIR = Path(__file__).resolve().parent.parent
+for ruta in (ROOT_DIR, ROOT_DIR / "src"):
+    if str(ruta) not in sys.path:
+        sys.path.insert(0, str(ruta))
+
+import crud_libros
+from config import INSTRUMENTAR_CONSULTAS
+from comun import agregar_backend, preparar_destino, percentil, rss_pico_mb
+from generador import generar_libros, isbn_sintetico
+
+#********************************************************************************
+#   BENCH_CRUD - Latencia (p50/p95/p99), throughput y memoria pico de las
+#                operaciones CRUD sobre catálogos sintéticos de distinto tamaño
+#                y con distintos niveles de concurrencia.
+#
+#   Uso:
+#     python benchmarks/bench_crud.py --filas 10000 100000 --hilos 1 8 \
+#         --salida resultados.json
+#     python benchmarks/bench_crud.py --base resultados.json   # compara
+#     python benchmarks/bench_crud.py --base                   # contra base.json
+#
+#   Con --base termina con código 1 si alguna medición empeora más que
+#   --tolerancia (p99 más alto o throughput más bajo).
+#
+#   benchmarks/base.json es la referencia versionada: valores por defecto
+#   (10 000 filas, 1 y 8 hilos, backend archivo, sin instrumentación). Los
+#   tiempos dependen de la máquina (ver "meta"); se regenera en la máquina
+#   donde se va a comparar, y se vuelve a versionar cuando un cambio mejora
+#   los números a propósito:
+#     python benchmarks/bench_crud.py --salida benchmarks/base.json
+#********************************************************************************
+
+BASE = Path(__file__).resolve().parent / "base.json"
+
+OPERACIONES = ("insertar_libro", "buscar_libro", "actualizar_libro", "eliminar_libro", "obtener_todos")
+
+def _medir(funcion, planes, hilos):
+    latencias = []
+
+    def una(args):
+        inicio = time.perf_counter()
+        funcion(*args)
+        latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    if hilos == 1:
+        for args in planes:
+            una(args)
+    else:
+        with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+            list(ejecutor.map(una, planes))
+    return latencias, time.perf_counter() - inicio
+
+def _resultado(filas, operacion, hilos, latencias, segundos):
+    return {
+        "filas": filas,
+        "operacion": operacion,
+        "hilos": hilos,
+        "operaciones": len(latencias),
+        "p50_ms": round(percentil(latencias, 0.50) * 1000, 4),
+        "p95_ms": round(percentil(latencias, 0.95) * 1000, 4),
+        "p99_ms": round(percentil(latencias, 0.99) * 1000, 4),
+        "ops_s": round(len(latencias) / segundos, 2) if segundos else 0.0,
+        "rss_pico_mb": rss_pico_mb(),
+    }
+
+def correr(tamanos, niveles, operaciones, backend, semilla):
+    resultados = []
+    desplazamiento = max(tamanos)      # ISBN nuevos: nunca chocan con el catálogo
+    for filas in tamanos:
+        preparar_destino(backend, f"bench_crud_{filas}")
+        inicio = time.perf_counter()
+        crud_libros.insertar_libros_batch(generar_libros(filas, semilla), tamano_lote=5000)
+        segundos = time.perf_counter() - inicio
+        resultados.append({
+            "filas": filas, "operacion": "carga", "hilos": 1, "operaciones": filas,
+            "p50_ms": None, "p95_ms": None, "p99_ms": None,
+            "ops_s": round(filas / segundos, 2), "rss_pico_mb": rss_pico_mb(),
+        })
+        print(f"{filas:>9} {'carga':>17} {1:>5} {resultados[-1]['ops_s']:>11.1f}")
+
+        azar = random.Random(semilla)
+        # obtener_todos lee el catálogo entero: pocas repeticiones en los grandes
+        repeticiones_todos = max(3, min(operaciones, 200000 // filas))
+        for hilos in niveles:
+            nuevos = list(generar_libros(operaciones, semilla, inicio=desplazamiento))
+            desplazamiento += operaciones
+            planes = {
+                "insertar_libro": nuevos,
+                "buscar_libro": [(isbn_sintetico(azar.randrange(filas)),) for _ in range(operaciones)],
+                "actualizar_libro": [
+                    (isbn_sintetico(azar.randrange(filas)), f"Edición revisada {n}", "Autor", 2024, "Editorial")
+                    for n in range(operaciones)
+                ],
+                # Borra justo lo insertado: el catálogo vuelve a su tamaño
+                "eliminar_libro": [(libro[0],) for libro in nuevos],
+                "obtener_todos": [()] * repeticiones_todos,
+            }
+            for operacion in OPERACIONES:
+                crud_libros._cache_libros.limpiar()
+                latencias, segundos = _medir(getattr(crud_libros, operacion), planes[operacion], hilos)
+                resultados.append(_resultado(filas, operacion, hilos, latencias, segundos))
+                _imprimir(resultados[-1])
+    return resultados
+
+#********************************************************************************
+#   SALIDA Y COMPARACION CONTRA UNA BASE GUARDADA
+#********************************************************************************
+
+def _imprimir(r):
+    print(
+        f"{r['filas']:>9} {r['operacion']:>17} {r['hilos']:>5} {r['ops_s']:>11.1f} "
+        f"{r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f} {r['rss_pico_mb'] or 0:>8.0f}"
+    )
+
+def comparar(actuales, base, tolerancia):
+
+    """
+    Empareja por (filas, operacion, hilos) y devuelve [(actual, anterior,
+    regresion)]: regresión si el p99 sube o el throughput baja más que
+    `tolerancia` (0.2 = 20 %).
+    """
+    anteriores = {(r["filas"], r["operacion"], r["hilos"]): r for r in base["resultados"]}
+    filas = []
+    for r in actuales:
+        b = anteriores.get((r["filas"], r["operacion"], r["hilos"]))
+        if b is None:
+            continue
+        regresion = bool(b["ops_s"]) and r["ops_s"] < b["ops_s"] * (1 - tolerancia)
+        if r["p99_ms"] is not None and b.get("p99_ms"):
+            regresion = regresion or r["p99_ms"] > b["p99_ms"] * (1 + tolerancia)
+        filas.append((r, b, regresion))
+    return filas
+
+def _main():
+    parser = argparse.ArgumentParser(description="Benchmark de las operaciones CRUD de libros")
+    parser.add_argument("--filas", type=int, nargs="+", default=[10000],
+                        help="Tamaños de catálogo, p. ej. 10000 100000 1000000")
+    parser.add_argument("--hilos", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--operaciones", type=int, default=1000, help="Llamadas por operación")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", help="Guarda los resultados en JSON")
+    parser.add_argument("--base", nargs="?", const=str(BASE),
+                        help="JSON de una corrida anterior para comparar (sin ruta: benchmarks/base.json)")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    agregar_backend(parser)
+    args = parser.parse_args()
+
+    print(f"{'filas':>9} {'operacion':>17} {'hilos':>5} {'ops/s':>11} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'RSS MB':>8}")
+    resultados = correr(args.filas, args.hilos, args.operaciones, args.backend, args.semilla)
+    informe = {
+        "meta": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "backend": args.backend,
+            "semilla": args.semilla,
+            "operaciones": args.operaciones,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "instrumentacion": INSTRUMENTAR_CONSULTAS,
+            "plataforma": platform.platform(),
+        },
+        "resultados": resultados,
+    }
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(informe, archivo, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en {args.salida}.")
+
+    if args.base:
+        with open(args.base, encoding="utf-8") as archivo:
+            base = json.load(archivo)
+        print(f"\nComparación contra {args.base} ({base['meta'].get('fecha')}):")
+        regresiones = 0
+        for r, b, regresion in comparar(resultados, base, args.tolerancia):
+            cambio = (r["ops_s"] / b["ops_s"] - 1) * 100 if b["ops_s"] else 0.0
+            p99 = f"{b['p99_ms']:.3f} -> {r['p99_ms']:.3f}" if r["p99_ms"] is not None else "-"
+            marca = "  REGRESIÓN" if regresion else ""
+            print(f"{r['filas']:>9} {r['operacion']:>17} {r['hilos']:>5}  ops/s {cambio:+6.1f} %  p99 {p99}{marca}")
+            regresiones += regresion
+        if regresiones:
+            print(f"{regresiones} regresiones por encima de {args.tolerancia:.0%}.")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    _main()
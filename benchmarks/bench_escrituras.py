@@ -0,0 +1,89 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import argparse
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pathlib import Path
+import sys
+
+# Ruta absoluta a la raíz del proyecto y a src/
+ROOT_DIR = Path(__file__).resolve().parent.parent
+for ruta in (ROOT_DIR, ROOT_DIR / "src"):
+    if str(ruta) not in sys.path:
+        sys.path.insert(0, str(ruta))
+
+import crud_libros
+from isbn import _digito_control_13
+from comun import agregar_backend, preparar_destino, percentil
+
+#********************************************************************************
+#   BENCH_ESCRITURAS - Muchos bibliotecarios registrando libros a la vez:
+#                      commit por llamada vs cola de escritura con commits
+#                      agrupados. Reporta escrituras/s, p50/p99 y errores.
+#
+#   Uso:  python benchmarks/bench_escrituras.py [--escrituras 2000] [--backend archivo|memoria]
+#********************************************************************************
+
+def _isbn(n):
+    base = f"978{n:09d}"
+    return base + _digito_control_13(base)
+
+def _correr(agrupada, hilos, escrituras, desplazamiento):
+    crud_libros.ESCRITURA_AGRUPADA = agrupada
+    latencias = []
+    errores = []
+    lock = threading.Lock()
+
+    def registrar(n):
+        inicio = time.perf_counter()
+        try:
+            ok, msg = crud_libros.insertar_libro(
+                _isbn(desplazamiento + n), f"Libro {n}", f"Autor {n % 300}", 2000 + n % 25, "Editorial"
+            )
+        except sqlite3.OperationalError as error:
+            ok, msg = False, str(error)
+        with lock:
+            latencias.append(time.perf_counter() - inicio)
+            if not ok:
+                errores.append(msg)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        list(ejecutor.map(registrar, range(escrituras)))
+    total = time.perf_counter() - inicio
+    return {
+        "por_segundo": escrituras / total,
+        "p50_ms": percentil(latencias, 0.50) * 1000,
+        "p99_ms": percentil(latencias, 0.99) * 1000,
+        "errores": len(errores),
+    }
+
+def _main():
+    parser = argparse.ArgumentParser(description="Benchmark de escrituras concurrentes")
+    parser.add_argument("--escrituras", type=int, default=2000)
+    parser.add_argument("--hilos", type=int, nargs="+", default=[1, 8, 32])
+    agregar_backend(parser)
+    args = parser.parse_args()
+
+    preparar_destino(args.backend, "bench_escrituras")
+
+    print(f"{'modo':>10} {'hilos':>6} {'escr/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errores':>8}")
+    desplazamiento = 0
+    for hilos in args.hilos:
+        for agrupada in (False, True):
+            r = _correr(agrupada, hilos, args.escrituras, desplazamiento)
+            desplazamiento += args.escrituras
+            modo = "agrupada" if agrupada else "directa"
+            print(
+                f"{modo:>10} {hilos:>6} {r['por_segundo']:>10.0f} {r['p50_ms']:>9.2f} "
+                f"{r['p99_ms']:>9.2f} {r['errores']:>8}"
+            )
+    print("cola:", crud_libros.estadisticas_escritura())
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,92 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import argparse
+import random
+import time
+
+from pathlib import Path
+import sys
+
+# Ruta absoluta a la raíz del proyecto y a src/
+ROOT_DIR = Path(__file__).resolve().parent.parent
+for ruta in (ROOT_DIR, ROOT_DIR / "src"):
+    if str(ruta) not in sys.path:
+        sys.path.insert(0, str(ruta))
+
+import cache_google_books
+from cache_google_books import CacheGoogleBooks, clave_consulta
+from comun import agregar_backend, preparar_destino, percentil
+from generador import isbn_sintetico
+
+#********************************************************************************
+#   BENCH_GOOGLE_BOOKS - Escaneo de un lote de libros contra la caché de
+#                        Google Books: en frío cada ISBN sale a la red; en
+#                        caliente ninguno. Luego se vencen las entradas para
+#                        ver que se siguen sirviendo y se actualizan aparte.
+#
+#                        No usa la red: Google Books se simula con una
+#                        consulta que tarda --latencia-ms y no encuentra una
+#                        parte de los ISBN.
+#
+#   Uso:  python benchmarks/bench_google_books.py [--libros 200]
+#             [--latencia-ms 50] [--backend archivo|memoria]
+#********************************************************************************
+
+def _google_simulado(latencia_s, no_encontrados, llamadas):
+    def consultar(isbn):
+        llamadas[0] += 1
+        time.sleep(latencia_s)
+        if isbn in no_encontrados:
+            return None
+        return {"titulo": f"Libro {isbn}", "autor": "Autor", "isbn": isbn, "editorial": "", "anio": 2000,
+                "portada_url": "", "descripcion": ""}
+    return consultar
+
+def _escaneo(cache, isbns, consultar, llamadas):
+    latencias = []
+    antes = llamadas[0]
+    inicio = time.perf_counter()
+    for isbn in isbns:
+        t0 = time.perf_counter()
+        cache.obtener(clave_consulta(isbn=isbn), lambda isbn=isbn: consultar(isbn))
+        latencias.append(time.perf_counter() - t0)
+    return time.perf_counter() - inicio, percentil(latencias, 0.50), percentil(latencias, 0.99), llamadas[0] - antes
+
+def _main():
+    parser = argparse.ArgumentParser(description="Benchmark de la caché de Google Books")
+    parser.add_argument("--libros", type=int, default=200)
+    parser.add_argument("--latencia-ms", type=float, default=50)
+    parser.add_argument("--no-encontrados", type=float, default=0.1, help="Fracción de ISBN sin resultados")
+    parser.add_argument("--semilla", type=int, default=42)
+    agregar_backend(parser)
+    args = parser.parse_args()
+
+    cache_google_books.DB_PATH = preparar_destino(args.backend, "bench_google_books")
+    cache = CacheGoogleBooks()
+    isbns = [isbn_sintetico(i) for i in range(args.libros)]
+    azar = random.Random(args.semilla)
+    no_encontrados = set(azar.sample(isbns, int(args.libros * args.no_encontrados)))
+    llamadas = [0]
+    consultar = _google_simulado(args.latencia_ms / 1000, no_encontrados, llamadas)
+
+    print(f"{args.libros} ISBN, Google Books simulado a {args.latencia_ms:.0f} ms")
+    print(f"{'escaneo':>10} {'total s':>8} {'p50 ms':>9} {'p99 ms':>9} {'red':>6}")
+    for nombre in ("frio", "caliente"):
+        total, p50, p99, red = _escaneo(cache, isbns, consultar, llamadas)
+        print(f"{nombre:>10} {total:>8.2f} {p50 * 1000:>9.2f} {p99 * 1000:>9.2f} {red:>6}")
+
+    # Todo vencido pero dentro de la ventana de obsoletos: se sirve lo guardado
+    # y las actualizaciones van en hilos aparte
+    with cache._conexion() as conn:
+        conn.execute("UPDATE cache_google_books SET expira = ?", (time.time() - 1,))
+        conn.commit()
+    total, p50, p99, red = _escaneo(cache, isbns, consultar, llamadas)
+    print(f"{'vencido':>10} {total:>8.2f} {p50 * 1000:>9.2f} {p99 * 1000:>9.2f} {red:>6}")
+    while cache._revalidando:
+        time.sleep(0.01)
+    print("cache:", cache.estadisticas())
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,147 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import argparse
+import threading
+import time
+
+from pathlib import Path
+import sys
+
+# Ruta absoluta a la raíz del proyecto y a src/
+ROOT_DIR = Path(__file__).resolve().parent.parent
+for ruta in (ROOT_DIR, ROOT_DIR / "src"):
+    if str(ruta) not in sys.path:
+        sys.path.insert(0, str(ruta))
+
+import crud_usuarios
+from comun import agregar_backend, preparar_destino, percentil
+
+#********************************************************************************
+#   BENCH_LOGIN - Ráfaga de inicios de sesión simultáneos (la apertura de la
+#                 biblioteca): p50/p99 del login y cuánto se atrasa mientras
+#                 tanto el resto del trabajo de la app ("render"), con el pool
+#                 de hash acotado a distintos tamaños.
+#
+#                 Con --ataque, además, un script que prueba contraseñas
+#                 desde un mismo cliente: los hashes calculados deben quedar
+#                 fijos (el límite de intentos corta antes de hashear) sin
+#                 importar cuántos intentos haga.
+#
+#   Uso:  python benchmarks/bench_login.py [--logins 100] [--hilos-hash 1 2 100]
+#             [--rondas 12] [--ataque 100 1000 10000] [--backend archivo|memoria]
+#********************************************************************************
+
+def _configurar_pool(hilos):
+    if crud_usuarios._ejecutor_hash is not None:
+        crud_usuarios._ejecutor_hash.shutdown(wait=True)
+    crud_usuarios._ejecutor_hash = None
+    crud_usuarios.HASH_HILOS = hilos
+
+def _sonda_render(detener, latencias):
+    # Trabajo corto de Python, como el de un rerun de Streamlit; se mide
+    # cuánto tarda cada vuelta mientras dura la ráfaga
+    while not detener.is_set():
+        inicio = time.perf_counter()
+        sum(i * i for i in range(2000))
+        latencias.append(time.perf_counter() - inicio)
+        time.sleep(0.002)
+
+def _rafaga(usuarios, logins, password):
+    latencias = []
+    fallidos = []
+    lock = threading.Lock()
+    barrera = threading.Barrier(logins)
+
+    def login(n):
+        barrera.wait()      # Todos a la vez
+        inicio = time.perf_counter()
+        ok, msg = crud_usuarios.verify_user(usuarios[n % len(usuarios)], password)
+        with lock:
+            latencias.append(time.perf_counter() - inicio)
+            if not ok:
+                fallidos.append(msg)
+
+    hilos = [threading.Thread(target=login, args=(n,)) for n in range(logins)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return latencias, fallidos, time.perf_counter() - inicio
+
+def _ataque(intentos, usuarios, hilos=16):
+    # Mitad contra cuentas que existen y mitad contra cuentas inventadas,
+    # todo desde el mismo cliente; se reinician los limitadores para que
+    # cada corrida parta de cero
+    crud_usuarios.reiniciar_limites_login()
+    hashes_antes = crud_usuarios.estadisticas_hash()["hashes"]
+    cuentas = usuarios[:5] + [f"no_existe{n}" for n in range(5)]
+    permitidos = [0]
+    lock = threading.Lock()
+
+    def probar(n):
+        for i in range(n, intentos, hilos):
+            ok, msg = crud_usuarios.verify_user(cuentas[i % len(cuentas)], f"mala{i}", cliente="203.0.113.7")
+            if not msg.startswith("Demasiados"):
+                with lock:
+                    permitidos[0] += 1
+
+    inicio = time.perf_counter()
+    trabajadores = [threading.Thread(target=probar, args=(n,)) for n in range(hilos)]
+    for hilo in trabajadores:
+        hilo.start()
+    for hilo in trabajadores:
+        hilo.join()
+    total = time.perf_counter() - inicio
+    return permitidos[0], crud_usuarios.estadisticas_hash()["hashes"] - hashes_antes, total
+
+def _main():
+    parser = argparse.ArgumentParser(description="Benchmark de una ráfaga de inicios de sesión")
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--usuarios", type=int, default=20)
+    parser.add_argument("--hilos-hash", type=int, nargs="+", default=[1, crud_usuarios.HASH_HILOS, 100])
+    parser.add_argument("--rondas", type=int, default=crud_usuarios.BCRYPT_ROUNDS)
+    parser.add_argument("--ataque", type=int, nargs="*", default=[],
+                        help="Intentos fallidos por corrida, p. ej. 100 1000 10000")
+    agregar_backend(parser)
+    args = parser.parse_args()
+
+    preparar_destino(args.backend, "bench_login")
+    crud_usuarios.BCRYPT_ROUNDS = args.rondas
+    password = "clave-de-prueba"
+    usuarios = [f"lector{n}" for n in range(args.usuarios)]
+    for usuario in usuarios:
+        crud_usuarios.create_user(usuario, password)
+
+    print(f"{args.logins} logins simultáneos, bcrypt costo {args.rondas}")
+    print(f"{'hilos hash':>10} {'total s':>8} {'p50 ms':>9} {'p99 ms':>9} {'render p99 ms':>14} {'fallidos':>9}")
+    for hilos in dict.fromkeys(args.hilos_hash):
+        _configurar_pool(hilos)
+        # Cada configuración parte sin intentos gastados por la anterior
+        crud_usuarios.reiniciar_limites_login()
+        detener = threading.Event()
+        render = []
+        sonda = threading.Thread(target=_sonda_render, args=(detener, render))
+        sonda.start()
+        latencias, fallidos, total = _rafaga(usuarios, args.logins, password)
+        detener.set()
+        sonda.join()
+        print(
+            f"{hilos:>10} {total:>8.2f} {percentil(latencias, 0.50) * 1000:>9.1f} "
+            f"{percentil(latencias, 0.99) * 1000:>9.1f} {percentil(render, 0.99) * 1000:>14.2f} "
+            f"{len(fallidos):>9}"
+        )
+    print("hash:", crud_usuarios.estadisticas_hash())
+
+    if args.ataque:
+        _configurar_pool(crud_usuarios.HASH_HILOS)
+        print(f"\n{'intentos':>10} {'hasheados':>10} {'hashes':>8} {'total s':>8}")
+        for intentos in args.ataque:
+            permitidos, hashes, total = _ataque(intentos, usuarios)
+            print(f"{intentos:>10} {permitidos:>10} {hashes:>8} {total:>8.2f}")
+        print("login:", {k: v for k, v in crud_usuarios.estadisticas_login().items() if k != "bloqueados"})
+
+if __name__ == "__main__":
+    _main()
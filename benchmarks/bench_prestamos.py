@@ -0,0 +1,171 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from pathlib import Path
+import sys
+
+# Ruta absoluta a la raíz del proyecto y a src/
+ROOT_DIR = Path(__file__).resolve().parent.parent
+for ruta in (ROOT_DIR, ROOT_DIR / "src"):
+    if str(ruta) not in sys.path:
+        sys.path.insert(0, str(ruta))
+
+import crud_libros
+import crud_prestamos
+from comun import agregar_backend, preparar_destino, percentil, rss_pico_mb
+from generador import generar_libros, isbn_sintetico
+
+#********************************************************************************
+#   BENCH_PRESTAMOS - Circulación con decenas de miles de préstamos activos:
+#                     préstamos y devoluciones concurrentes, consultas de
+#                     disponibilidad y la revisión nocturna de vencidos.
+#
+#   Uso:  python benchmarks/bench_prestamos.py [--activos 50000] [--hilos 1 8]
+#             [--backend archivo|memoria]
+#********************************************************************************
+
+def _cargar(libros, por_libro, usuarios, activos, semilla):
+
+    """
+    Catálogo, ejemplares, usuarios y préstamos activos cargados por SQL
+    directo (sin bcrypt ni una transacción por préstamo). Una décima parte de
+    los préstamos ya está vencida. Devuelve los ejemplares prestados.
+    """
+    crud_libros.insertar_libros_batch(generar_libros(libros, semilla), tamano_lote=5000)
+    ahora = datetime.utcnow().replace(microsecond=0)
+    alta = ahora.isoformat()
+    azar = random.Random(semilla)
+    with crud_libros.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO ejemplares (isbn, estado, alta) VALUES (?, 'disponible', ?)",
+            ((isbn_sintetico(i), alta) for i in range(libros) for _ in range(por_libro)),
+        )
+        conn.executemany(
+            "INSERT INTO usuarios (username, password_hash, created_at) VALUES (?, 'x', ?)",
+            ((f"lector{n}", alta) for n in range(usuarios)),
+        )
+        primer_usuario = conn.execute("SELECT MIN(id) FROM usuarios WHERE username LIKE 'lector%'").fetchone()[0]
+        prestados = azar.sample(range(1, libros * por_libro + 1), activos)
+        filas = []
+        for n, ejemplar in enumerate(prestados):
+            prestado_en = ahora - timedelta(days=azar.randrange(0, 16), minutes=n % 1440)
+            filas.append((
+                ejemplar,
+                primer_usuario + n % usuarios,
+                prestado_en.isoformat(),
+                (prestado_en + timedelta(days=crud_prestamos.PRESTAMO_DIAS)).isoformat(),
+            ))
+        conn.executemany(
+            "INSERT INTO prestamos (ejemplar_id, usuario_id, prestado_en, vence) VALUES (?, ?, ?, ?)",
+            filas,
+        )
+        conn.execute(
+            "UPDATE ejemplares SET estado = 'prestado' "
+            "WHERE id IN (SELECT ejemplar_id FROM prestamos WHERE devuelto_en IS NULL)"
+        )
+        conn.commit()
+    return prestados
+
+def _medir(funcion, planes, hilos):
+    latencias = []
+    rechazos = [0]
+    lock = threading.Lock()
+
+    def una(args):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        transcurrido = time.perf_counter() - inicio
+        with lock:
+            latencias.append(transcurrido)
+            if isinstance(resultado, tuple) and resultado and resultado[0] is False:
+                rechazos[0] += 1
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        list(ejecutor.map(una, planes))
+    segundos = time.perf_counter() - inicio
+    return {
+        "por_segundo": len(planes) / segundos,
+        "p50_ms": percentil(latencias, 0.50) * 1000,
+        "p99_ms": percentil(latencias, 0.99) * 1000,
+        "rechazos": rechazos[0],
+    }
+
+def _revision_vencidos(lote=1000):
+    # Recorrido completo por lotes, como lo haría un proceso nocturno
+    inicio = time.perf_counter()
+    total = 0
+    despues = None
+    while True:
+        filas = crud_prestamos.prestamos_vencidos(limite=lote, despues=despues)
+        total += len(filas)
+        if len(filas) < lote:
+            break
+        despues = (filas[-1][0], filas[-1][1])
+    return total, time.perf_counter() - inicio
+
+def _main():
+    parser = argparse.ArgumentParser(description="Benchmark de préstamos y devoluciones")
+    parser.add_argument("--libros", type=int, default=20000)
+    parser.add_argument("--por-libro", type=int, default=4, help="Ejemplares por libro")
+    parser.add_argument("--usuarios", type=int, default=25000)
+    parser.add_argument("--activos", type=int, default=50000, help="Préstamos activos al empezar")
+    parser.add_argument("--operaciones", type=int, default=2000, help="Llamadas por operación y nivel")
+    parser.add_argument("--hilos", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--semilla", type=int, default=42)
+    agregar_backend(parser)
+    args = parser.parse_args()
+    if args.activos > args.libros * args.por_libro:
+        parser.error("--activos no puede superar --libros x --por-libro")
+
+    preparar_destino(args.backend, "bench_prestamos")
+    inicio = time.perf_counter()
+    prestados = _cargar(args.libros, args.por_libro, args.usuarios, args.activos, args.semilla)
+    print(f"Carga: {args.libros} libros, {args.libros * args.por_libro} ejemplares, "
+          f"{args.usuarios} usuarios, {args.activos} préstamos activos "
+          f"en {time.perf_counter() - inicio:.1f} s")
+
+    azar = random.Random(args.semilla)
+    print(f"{'operacion':>16} {'hilos':>6} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'rechazos':>9}")
+    for hilos in args.hilos:
+        # Devoluciones de préstamos existentes y préstamos nuevos a usuarios al azar
+        devolver = [(ejemplar,) for ejemplar in prestados[:args.operaciones]]
+        del prestados[:args.operaciones]
+        planes = {
+            "disponibilidad": [
+                (isbn_sintetico(azar.randrange(args.libros)),) for _ in range(args.operaciones)
+            ],
+            "devolver": devolver,
+            "prestar": [
+                (f"lector{azar.randrange(args.usuarios)}", isbn_sintetico(azar.randrange(args.libros)))
+                for _ in range(args.operaciones)
+            ],
+        }
+        funciones = {
+            "disponibilidad": crud_prestamos.disponibilidad,
+            "devolver": crud_prestamos.devolver,
+            "prestar": crud_prestamos.prestar,
+        }
+        for operacion, plan in planes.items():
+            r = _medir(funciones[operacion], plan, hilos)
+            print(
+                f"{operacion:>16} {hilos:>6} {r['por_segundo']:>10.0f} {r['p50_ms']:>9.2f} "
+                f"{r['p99_ms']:>9.2f} {r['rechazos']:>9}"
+            )
+
+    vencidos, segundos = _revision_vencidos()
+    print(f"Revisión de vencidos: {vencidos} préstamos en {segundos * 1000:.1f} ms "
+          f"(contar_vencidos: {crud_prestamos.contar_vencidos()})")
+    print(f"RSS pico: {rss_pico_mb() or 0:.0f} MB")
+    print("cola:", crud_libros.estadisticas_escritura())
+
+if __name__ == "__main__":
+    _main()
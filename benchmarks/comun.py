@@ -0,0 +1,62 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import tempfile
+
+from pathlib import Path
+import sys
+
+# Ruta absoluta a la raíz del proyecto y a src/
+ROOT_DIR = Path(__file__).resolve().parent.parent
+for ruta in (ROOT_DIR, ROOT_DIR / "src"):
+    if str(ruta) not in sys.path:
+        sys.path.insert(0, str(ruta))
+
+import crud_libros
+import crud_usuarios
+from database import PREFIJO_MEMORIA
+
+#********************************************************************************
+#   COMUN - Utilidades compartidas por los benchmarks: cada corrida usa su
+#           propia base de datos, nunca data/biblioteca.db
+#********************************************************************************
+
+BACKENDS = ("archivo", "memoria")
+
+def agregar_backend(parser):
+    parser.add_argument(
+        "--backend", choices=BACKENDS, default="archivo",
+        help="archivo: SQLite temporal en disco; memoria: SQLite en memoria",
+    )
+
+def preparar_destino(backend, nombre):
+
+    """
+    Crea una base de datos vacía para el benchmark, apunta los CRUD a ella y
+    aplica el esquema. Devuelve el destino (ruta o "memoria:<nombre>").
+    """
+    if backend == "memoria":
+        destino = PREFIJO_MEMORIA + nombre
+    else:
+        destino = Path(tempfile.mkdtemp(prefix=f"{nombre}_")) / "bench.db"
+    # Las funciones CRUD leen DB_PATH en cada llamada
+    crud_libros.DB_PATH = destino
+    crud_usuarios.DB_PATH = destino
+    crud_libros.init_db()
+    return destino
+
+def percentil(valores, p):
+    """Percentil `p` (0-1) por rango más cercano; valores no vacíos."""
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+def rss_pico_mb():
+    """Memoria residente máxima del proceso hasta ahora (None fuera de Unix)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo reporta en KiB, macOS en bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
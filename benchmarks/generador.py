@@ -0,0 +1,134 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import random
+from itertools import accumulate
+
+from pathlib import Path
+import sys
+
+# Ruta absoluta a la raíz del proyecto y a src/
+ROOT_DIR = Path(__file__).resolve().parent.parent
+for ruta in (ROOT_DIR, ROOT_DIR / "src"):
+    if str(ruta) not in sys.path:
+        sys.path.insert(0, str(ruta))
+
+from isbn import _digito_control_13
+
+#********************************************************************************
+#   GENERADOR - Catálogo sintético en español, determinista por semilla:
+#               misma semilla y mismo n -> exactamente los mismos libros
+#********************************************************************************
+
+_NOMBRES = (
+    "Gabriel", "Isabel", "Mario", "Julio", "Laura", "Carmen", "José", "Pablo", "Elena",
+    "Rosa", "Javier", "Lucía", "Miguel", "Ana", "Jorge", "Marta", "Luis", "Teresa",
+    "Rafael", "Pilar", "Antonio", "Sofía", "Fernando", "Clara", "Manuel", "Inés",
+    "Alejandro", "Beatriz", "Ricardo", "Victoria", "Andrés", "Mercedes", "Álvaro",
+)
+_APELLIDOS = (
+    "García", "Martínez", "López", "Sánchez", "González", "Pérez", "Rodríguez",
+    "Fernández", "Gómez", "Díaz", "Moreno", "Muñoz", "Álvarez", "Romero", "Ruiz",
+    "Hernández", "Jiménez", "Navarro", "Torres", "Domínguez", "Vázquez", "Ramos",
+    "Gil", "Serrano", "Blanco", "Molina", "Castro", "Ortega", "Rubio", "Marín",
+    "Sanz", "Iglesias", "Núñez", "Medina", "Garrido", "Cortés", "Castillo", "Lozano",
+    "Guerrero", "Cano", "Prieto", "Méndez", "Cruz", "Calvo", "Gallego", "Vidal",
+    "León", "Herrera", "Márquez", "Peña", "Flores", "Cabrera", "Campos", "Vega",
+    "Fuentes", "Carrasco", "Diez", "Caballero", "Reyes", "Nieto", "Aguilar", "Pascual",
+)
+_EDITORIALES = (
+    "Planeta", "Alfaguara", "Anagrama", "Tusquets", "Seix Barral", "Cátedra", "Destino",
+    "Siruela", "Debolsillo", "Alianza", "Salamandra", "Lumen", "Random House",
+    "Espasa", "Crítica", "Acantilado", "Impedimenta", "Nórdica", "Periférica",
+    "Blackie Books", "Sexto Piso", "Fondo de Cultura Económica", "Sudamericana",
+    "Era", "Almadía", "Edhasa", "Akal", "Ariel", "Paidós", "Gredos", "Castalia",
+    "Visor", "Hiperión", "Pre-Textos", "Valdemar", "Minotauro", "Nova", "Gigamesh",
+)
+# Sustantivo y género, para concordar artículo y adjetivo
+_SUSTANTIVOS = (
+    ("amor", "m"), ("sombra", "f"), ("ciudad", "f"), ("noche", "f"), ("río", "m"),
+    ("tiempo", "m"), ("guerra", "f"), ("mar", "m"), ("sol", "m"), ("luna", "f"),
+    ("árbol", "m"), ("camino", "m"), ("casa", "f"), ("fuego", "m"), ("viento", "m"),
+    ("piedra", "f"), ("jardín", "m"), ("historia", "f"), ("memoria", "f"),
+    ("silencio", "m"), ("sueño", "m"), ("montaña", "f"), ("perro", "m"), ("libro", "m"),
+    ("canción", "f"), ("invierno", "m"), ("verano", "m"), ("isla", "f"), ("puerta", "f"),
+    ("espejo", "m"), ("laberinto", "m"), ("ceniza", "f"), ("frontera", "f"),
+    ("desierto", "m"), ("bosque", "m"), ("tormenta", "f"), ("huella", "f"), ("voz", "f"),
+    ("rostro", "m"), ("secreto", "m"), ("herencia", "f"), ("promesa", "f"),
+    ("ausencia", "f"), ("regreso", "m"), ("viaje", "m"), ("olvido", "m"), ("destino", "m"),
+    ("lluvia", "f"), ("naufragio", "m"), ("cosecha", "f"), ("tierra", "f"), ("cielo", "m"),
+)
+# En masculino; los terminados en "o" se cambian a "a" para el femenino
+_ADJETIVOS = (
+    "perdido", "oscuro", "último", "rojo", "negro", "blanco", "secreto", "eterno",
+    "salvaje", "callado", "lejano", "roto", "dormido", "infinito", "antiguo", "nuevo",
+    "breve", "amargo", "dulce", "extraño", "azul", "invisible",
+)
+_PLANTILLAS = (
+    "{el} {s} {a}",
+    "{S} de {n}",
+    "{S} y {s2}",
+    "Cien años de {s}",
+    "Crónica de {un} {s} {a}",
+    "Los días de {el} {s}",
+    "Historia de {el} {s} {a}",
+    "{S}",
+    "Cartas desde {el} {s}",
+    "Bajo {el} {s} {a}",
+    "Donde termina {el} {s}",
+    "{El} {s} de {n}",
+)
+
+def _titulo(azar):
+    s, genero = azar.choice(_SUSTANTIVOS)
+    adjetivo = azar.choice(_ADJETIVOS)
+    if genero == "f" and adjetivo.endswith("o"):
+        adjetivo = adjetivo[:-1] + "a"
+    el = "la" if genero == "f" else "el"
+    titulo = azar.choice(_PLANTILLAS).format(
+        s=s, S=s.capitalize(), s2=azar.choice(_SUSTANTIVOS)[0], a=adjetivo,
+        n=azar.choice(_NOMBRES), el=el, El=el.capitalize(),
+        un="una" if genero == "f" else "un",
+    )
+    titulo = titulo.replace(" de el ", " del ")
+    return titulo[0].upper() + titulo[1:]
+
+def _zipf(n, exponente=1.1):
+    # Pesos acumulados 1/rango^s: pocos autores/editoriales concentran muchos libros
+    return list(accumulate(1 / (rango ** exponente) for rango in range(1, n + 1)))
+
+def isbn_sintetico(n):
+    """ISBN-13 válido y único para cada n (prefijo 978-84, España)."""
+    base = f"97884{n:07d}"
+    return base + _digito_control_13(base)
+
+def generar_libros(n, semilla=42, inicio=0):
+
+    """
+    Genera `n` tuplas (isbn, titulo, autor, anio, editorial). `inicio`
+    desplaza la numeración de ISBN para producir libros nuevos que no chocan
+    con los ya generados (p. ej. para medir inserciones).
+    """
+    azar = random.Random(f"{semilla}:{inicio}")
+
+    # Un "universo" de autores fijo por semilla, con popularidad Zipf
+    universo = random.Random(semilla)
+    autores = [
+        f"{universo.choice(_NOMBRES)} {universo.choice(_APELLIDOS)} {universo.choice(_APELLIDOS)}"
+        for _ in range(20000)
+    ]
+    pesos_autor = _zipf(len(autores))
+    pesos_editorial = _zipf(len(_EDITORIALES), 1.3)
+
+    for i in range(inicio, inicio + n):
+        titulo = _titulo(azar)
+        # Años sesgados a lo reciente
+        anio = 2025 - int(azar.expovariate(1 / 15)) % 125
+        yield (
+            isbn_sintetico(i),
+            titulo,
+            azar.choices(autores, cum_weights=pesos_autor)[0],
+            anio,
+            azar.choices(_EDITORIALES, cum_weights=pesos_editorial)[0],
+        )
@@ -1,7 +1,98 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent
-DB_PATH = BASE_DIR / "data" / "biblioteca.db"
+
+# Motor de almacenamiento (ver src/database.py):
+#   BIBLIO_DB_BACKEND=archivo  -> SQLite en BIBLIO_DB_PATH (por defecto data/biblioteca.db)
+#   BIBLIO_DB_BACKEND=memoria  -> SQLite en memoria llamada BIBLIO_DB_PATH (pruebas, benchmarks)
+DB_BACKEND = os.getenv("BIBLIO_DB_BACKEND", "archivo")
+if DB_BACKEND not in ("archivo", "memoria"):
+    raise ValueError(f"BIBLIO_DB_BACKEND desconocido: {DB_BACKEND!r} (usa 'archivo' o 'memoria')")
+if DB_BACKEND == "memoria":
+    DB_PATH = "memoria:" + os.getenv("BIBLIO_DB_PATH", "biblioteca")
+else:
+    DB_PATH = Path(os.getenv("BIBLIO_DB_PATH") or BASE_DIR / "data" / "biblioteca.db")
+
+# Pool de conexiones SQLite (ver src/database.py)
+DB_POOL_SIZE = 8                    # Conexiones máximas abiertas por base de datos
+DB_POOL_TIMEOUT = 10.0              # Segundos que se espera por una conexión libre
+DB_CACHE_KB = 16384                 # PRAGMA cache_size (en KiB) por conexión
+DB_MMAP_BYTES = 128 * 1024 * 1024   # PRAGMA mmap_size
+DB_BUSY_TIMEOUT_MS = 5000           # PRAGMA busy_timeout
+
+# Caché de búsquedas por ISBN (ver src/cache.py)
+CACHE_LIBROS_MAX = 10000            # Entradas máximas (LRU)
+CACHE_LIBROS_TTL = 300.0            # Segundos de vida de cada entrada
+
+# Catálogo columnar en memoria compartido por las sesiones (ver src/catalogo_memoria.py)
+CATALOGO_MEMORIA_MAX = 250000       # Con más libros se vuelve a paginar sobre la BD
+
+# Registro de cambios de libros (tabla cambios_libros)
+CDC_RETENCION_DIAS = 7              # compactar_cambios borra lo más viejo que esto
+
+# Acceso asíncrono (ver src/acceso_async.py)
+ASYNC_LECTORES = 4                  # Hilos lectores
+ASYNC_ESCRITORES = 16               # Escrituras esperando a la vez en la cola de escritura:
+                                    # con uno solo, cada commit llevaría una sola escritura
+ASYNC_TIMEOUT_S = 30.0              # Tiempo máximo por llamada (None = sin límite)
+
+# Cola de escritura de libros con commits agrupados (ver crud_libros.ColaEscritura)
+ESCRITURA_AGRUPADA = True           # False: cada llamada abre y confirma su propia transacción
+ESCRITURA_VENTANA_MS = 0.0          # Espera extra para juntar escrituras (0 = solo lo que llegó
+                                    # durante el commit anterior; subir en discos lentos)
+ESCRITURA_LOTE_MAX = 200            # Escrituras máximas por commit
+ESCRITURA_TIMEOUT_S = 30.0          # Tiempo máximo que un llamador espera su resultado
+
+# Autocompletado de títulos y autores (ver src/autocompletar.py)
+AUTOCOMPLETAR_SUGERENCIAS = 8       # Sugerencias que se muestran mientras se escribe
+
+# Detección de libros duplicados (ver src/duplicados.py)
+UMBRAL_DUPLICADO = 0.8              # Similitud mínima (0-1) para avisar o reportar
+
+# Instrumentación de consultas SQL (ver src/instrumentacion.py)
+# Apagada por defecto (BIBLIO_INSTRUMENTAR=1 la activa): medir cada sentencia
+# hace ~45 % más lenta una lectura corta como buscar_libro
+INSTRUMENTAR_CONSULTAS = os.getenv("BIBLIO_INSTRUMENTAR", "0") == "1"
+CONSULTA_LENTA_MS = 100.0           # Desde aquí una sentencia va a la bitácora con su plan
+CONSULTAS_LENTAS_LOG = BASE_DIR / "data" / "consultas_lentas.log"   # None = solo en memoria
+CONSULTAS_LENTAS_MAX = 200          # Consultas lentas recientes que se guardan en memoria
+
+# Préstamos (ver src/crud_prestamos.py)
+PRESTAMO_DIAS = 14                  # Plazo de cada préstamo
+PRESTAMOS_POR_USUARIO = 5           # Préstamos activos máximos por usuario
+
+# Contraseñas (ver src/crud_usuarios.py)
+BCRYPT_ROUNDS = int(os.getenv("BIBLIO_BCRYPT_ROUNDS", "12"))   # Costo de bcrypt; los hashes con
+                                    # otro costo se rehacen al iniciar sesión
+HASH_HILOS = max(1, (os.cpu_count() or 2) // 2)     # Hashes bcrypt simultáneos como máximo
+HASH_COLA_TIMEOUT_S = 10.0          # Espera máxima por un turno para hashear
+
+# Límite de intentos de inicio de sesión (ver src/limitador.py); se aplica antes de hashear
+LOGIN_INTENTOS_USUARIO = 5          # Intentos seguidos por usuario
+LOGIN_RECARGA_USUARIO_S = 30.0      # Segundos para recuperar un intento
+LOGIN_FALLOS_USUARIO = 5            # Fallos seguidos que bloquean al usuario
+LOGIN_INTENTOS_CLIENTE = 30         # Por cliente (IP): varias personas pueden compartirla,
+LOGIN_RECARGA_CLIENTE_S = 2.0       # p. ej. la red de la biblioteca al abrir
+LOGIN_FALLOS_CLIENTE = 20
+LOGIN_BLOQUEO_BASE_S = 30.0         # Primer bloqueo; se duplica con cada fallo extra
+LOGIN_BLOQUEO_MAX_S = 3600.0
+LOGIN_CONFIAR_PROXY = os.getenv("BIBLIO_CONFIAR_PROXY", "0") == "1"   # Solo detrás de un proxy
+                                    # propio: el cliente sale del último salto de X-Forwarded-For
+
+# Sesiones persistentes, "Mantener sesión iniciada" (ver crud_usuarios.crear_sesion)
+SESION_DIAS = 30                    # Vida de cada sesión
+SESION_COOKIE = "biblio_sesion"      # Cookie del navegador con el token (ver src/sesion_navegador.py)
+SESION_SECRETO = os.getenv("BIBLIO_SESION_SECRETO")     # None = se genera y guarda en la BD
+SESION_CACHE_MAX = 10000            # Sesiones validadas que se recuerdan en memoria
+SESION_CACHE_TTL = 60.0             # Segundos; una revocación desde otro proceso tarda esto
+
+# Caché persistente de consultas a Google Books (ver src/cache_google_books.py)
+GOOGLE_CACHE_TTL_S = 30 * 86400     # Vida de una respuesta con resultados
+GOOGLE_CACHE_TTL_NEGATIVO_S = 86400 # Vida de "no se encontró nada"
+GOOGLE_CACHE_OBSOLETO_S = 7 * 86400 # Ya vencida, se sigue sirviendo este tiempo mientras
+                                    # se actualiza en segundo plano
+GOOGLE_CACHE_MAX = 20000            # Entradas máximas; se desalojan las menos usadas
 
 def asset_path(*parts: str) -> Path:
     return BASE_DIR.joinpath("assets", *parts)
@@ -0,0 +1,141 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pathlib import Path
+import sys
+
+# Ruta absoluta a la raíz del proyecto (donde está config.py)
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Aseguramos que la raíz esté en sys.path
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from config import ASYNC_ESCRITORES, ASYNC_LECTORES, ASYNC_TIMEOUT_S
+from database import Llamada, registrar_llamada
+import crud_libros
+import crud_usuarios
+
+#********************************************************************************
+#   ACCESO_ASYNC - Versión asyncio de las funciones CRUD para front ends
+#                  asíncronos (FastAPI, aiohttp) o procesos por lotes
+#********************************************************************************
+
+class AccesoAsync:
+
+    """
+    Ejecuta las funciones CRUD síncronas en dos ejecutores acotados:
+      - `escritores` hilos que entregan las escrituras de libros a la cola de
+        escritura de crud_libros y esperan su resultado. Son varios para que
+        la cola reciba varias escrituras a la vez y las junte en un commit;
+        el único que escribe en SQLite sigue siendo el hilo de la cola;
+      - `lectores` hilos para consultas, cada uno con su conexión del pool.
+
+    Cada llamada acepta `timeout` (segundos). Si vence, o si la tarea que
+    espera se cancela, la llamada se retira de la cola del ejecutor o, si ya
+    corría, se interrumpen las consultas SQLite que esa llamada tiene en
+    curso (las conexiones que ella misma tomó del pool, ver database.Llamada).
+
+    Una escritura de libros que ya llegó a la cola de escritura no se puede
+    cancelar: la conexión la tiene el hilo de la cola, no la llamada. El
+    timeout solo deja de esperar el resultado y la escritura puede
+    confirmarse de todos modos.
+    """
+
+    def __init__(self, lectores=ASYNC_LECTORES, timeout=ASYNC_TIMEOUT_S, escritores=ASYNC_ESCRITORES):
+        self.timeout = timeout
+        self._escritor = ThreadPoolExecutor(max_workers=escritores, thread_name_prefix="biblio-escritor")
+        self._lectores = ThreadPoolExecutor(max_workers=lectores, thread_name_prefix="biblio-lector")
+
+    async def _ejecutar(self, ejecutor, funcion, *args, timeout=None, **kwargs):
+        loop = asyncio.get_running_loop()
+        llamada = Llamada()
+
+        def tarea():
+            with registrar_llamada(llamada):
+                return funcion(*args, **kwargs)
+
+        futuro = loop.run_in_executor(ejecutor, tarea)
+        try:
+            return await asyncio.wait_for(futuro, timeout if timeout is not None else self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # wait_for ya canceló el futuro; si la tarea alcanzó a arrancar,
+            # detenemos sus consultas para liberar el hilo y la conexión
+            llamada.interrumpir()
+            raise
+
+    def _leer(self, funcion, *args, **kwargs):
+        return self._ejecutar(self._lectores, funcion, *args, **kwargs)
+
+    def _escribir(self, funcion, *args, **kwargs):
+        return self._ejecutar(self._escritor, funcion, *args, **kwargs)
+
+    # ---------------- Libros ----------------
+
+    def buscar_libro(self, isbn, timeout=None):
+        return self._leer(crud_libros.buscar_libro, isbn, timeout=timeout)
+
+    def buscar_texto(self, query, limit=20, timeout=None):
+        return self._leer(crud_libros.buscar_texto, query, limit, timeout=timeout)
+
+    def obtener_todos(self, timeout=None):
+        return self._leer(crud_libros.obtener_todos, timeout=timeout)
+
+    def obtener_pagina(self, tamano=50, despues=None, antes=None, timeout=None):
+        return self._leer(crud_libros.obtener_pagina, tamano, despues, antes, timeout=timeout)
+
+    def filtrar_libros(self, timeout=None, **filtros):
+        return self._leer(crud_libros.filtrar_libros, timeout=timeout, **filtros)
+
+    def insertar_libro(self, isbn, titulo, autor, anio, editorial,
+                       permitir_duplicado=True, timeout=None):
+        return self._escribir(
+            crud_libros.insertar_libro, isbn, titulo, autor, anio, editorial,
+            permitir_duplicado, timeout=timeout
+        )
+
+    def actualizar_libro(self, isbn, titulo, autor, anio, editorial, timeout=None):
+        return self._escribir(
+            crud_libros.actualizar_libro, isbn, titulo, autor, anio, editorial, timeout=timeout
+        )
+
+    def eliminar_libro(self, isbn, timeout=None):
+        return self._escribir(crud_libros.eliminar_libro, isbn, timeout=timeout)
+
+    def insertar_libros_batch(self, filas, tamano_lote=1000, upsert=False, timeout=None):
+        return self._escribir(
+            crud_libros.insertar_libros_batch, filas, tamano_lote, upsert, timeout=timeout
+        )
+
+    # ---------------- Usuarios ----------------
+
+    def verify_user(self, username, password, cliente=None, timeout=None):
+        # bcrypt libera el GIL: varios logins pueden verificarse en paralelo
+        return self._leer(crud_usuarios.verify_user, username, password, cliente, timeout=timeout)
+
+    def create_user(self, username, password, timeout=None):
+        return self._escribir(crud_usuarios.create_user, username, password, timeout=timeout)
+
+    def cerrar(self):
+        self._escritor.shutdown(wait=True, cancel_futures=True)
+        self._lectores.shutdown(wait=True, cancel_futures=True)
+
+#********************************************************************************
+#   OBTENER_ACCESO_ASYNC - Instancia compartida por proceso
+#********************************************************************************
+
+_acceso = None
+_acceso_lock = threading.Lock()
+
+def obtener_acceso_async():
+    global _acceso
+    if _acceso is None:
+        with _acceso_lock:
+            if _acceso is None:
+                _acceso = AccesoAsync()
+    return _acceso
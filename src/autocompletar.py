@@ -0,0 +1,286 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from heapq import merge
+
+from pathlib import Path
+import sys
+
+# Ruta absoluta a la raíz del proyecto (donde está config.py)
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Aseguramos que la raíz esté en sys.path
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from config import AUTOCOMPLETAR_SUGERENCIAS
+import crud_libros
+
+#********************************************************************************
+#   NORMALIZAR - Minúsculas y sin acentos: "Gabriel García" -> "gabriel garcia"
+#********************************************************************************
+
+def normalizar(texto) -> str:
+    texto = str(texto or "")
+    if texto.isascii():
+        return texto.casefold()
+    texto = unicodedata.normalize("NFKD", texto)
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return texto.casefold()
+
+def _palabras(texto):
+    return re.findall(r"\w+", normalizar(texto))
+
+#********************************************************************************
+#   INDICE_AUTOCOMPLETAR - Sugerencias de títulos y autores mientras se escribe
+#********************************************************************************
+
+TIPOS = ("titulo", "autor")
+
+class IndiceAutocompletar:
+
+    """
+    Cada título y cada autor distinto es una "sugerencia" con un id. Para
+    buscar por prefijo se guarda:
+      - `_vocabulario`: lista ordenada de palabras normalizadas; bisect da el
+        rango de palabras que empiezan con lo escrito;
+      - `_postings`: palabra -> array de ids de sugerencias que la contienen,
+        en orden de id.
+
+    Los ids se asignan al cargar en orden de popularidad (cuántos libros tienen
+    ese título o autor), así recorrer los postings en orden ya entrega primero
+    las mejores sugerencias y basta con tomar las k primeras que coincidan.
+    Las sugerencias nuevas van al final hasta la siguiente recarga completa.
+
+    Se carga la primera vez que se consulta y después se actualiza solo con los
+    ISBN que registra cambios_libros (crud_libros.SeguidorCambios).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._seguidor = crud_libros.SeguidorCambios()
+
+        # Contadores
+        self._recargas = 0
+        self._cambios_aplicados = 0
+        self._segundos_ultima_recarga = 0.0
+
+        self._vaciar()
+
+    def _vaciar(self):
+        self._texto = []            # id -> texto a mostrar
+        self._normal = []           # id -> texto normalizado
+        self._tipo = array("b")     # id -> índice en TIPOS
+        self._libros = array("i")   # id -> libros con ese título/autor (0 = ya no existe)
+        self._ids = {}              # (tipo, normalizado) -> id
+        self._postings = {}         # palabra -> array("i") de ids
+        self._vocabulario = []      # palabras ordenadas
+        self._por_isbn = {}         # isbn -> (id_titulo, id_autor) para descontar al cambiar
+        self._consultas = {}        # caché de consultas amplias (prefijos cortos)
+
+    # ---------------- Construcción ----------------
+
+    def _nueva_sugerencia(self, tipo, texto, normal):
+        sid = len(self._texto)
+        self._ids[(tipo, normal)] = sid
+        self._texto.append(texto)
+        self._normal.append(normal)
+        self._tipo.append(tipo)
+        self._libros.append(0)
+        for palabra in set(re.findall(r"\w+", normal)):
+            postings = self._postings.get(palabra)
+            if postings is None:
+                postings = self._postings[palabra] = array("i")
+                insort(self._vocabulario, palabra)
+            postings.append(sid)
+        return sid
+
+    def _sumar(self, tipo, texto, cantidad):
+        normal = normalizar(texto).strip()
+        if not normal:
+            return -1
+        sid = self._ids.get((tipo, normal))
+        if sid is None:
+            if cantidad <= 0:
+                return -1
+            sid = self._nueva_sugerencia(tipo, texto.strip(), normal)
+        self._libros[sid] = max(self._libros[sid] + cantidad, 0)
+        return sid
+
+    def _cargar_todo(self):
+        inicio = time.perf_counter()
+        self._vaciar()
+
+        # Primero contamos libros por título y autor para numerar por popularidad
+        conteos = {}
+        libros = []
+        for isbn, titulo, autor, _, _ in crud_libros.iterar_libros(tamano_lote=5000):
+            claves = []
+            for tipo, texto in enumerate((titulo, autor)):
+                normal = normalizar(texto).strip()
+                if normal:
+                    clave = (tipo, normal)
+                    conteo = conteos.get(clave)
+                    conteos[clave] = (conteo[0] + 1, conteo[1]) if conteo else (1, texto.strip())
+                    claves.append(clave)
+                else:
+                    claves.append(None)
+            libros.append((isbn, claves[0], claves[1]))
+
+        orden = sorted(conteos.items(), key=lambda item: (-item[1][0], item[0][1]))
+        palabras = {}
+        for sid, ((tipo, normal), (cantidad, texto)) in enumerate(orden):
+            self._ids[(tipo, normal)] = sid
+            self._texto.append(texto)
+            self._normal.append(normal)
+            self._tipo.append(tipo)
+            self._libros.append(cantidad)
+            for palabra in set(re.findall(r"\w+", normal)):
+                postings = palabras.get(palabra)
+                if postings is None:
+                    postings = palabras[palabra] = array("i")
+                postings.append(sid)
+        self._postings = palabras
+        self._vocabulario = sorted(palabras)
+
+        ids = self._ids
+        for isbn, clave_titulo, clave_autor in libros:
+            self._por_isbn[isbn] = (
+                ids[clave_titulo] if clave_titulo else -1,
+                ids[clave_autor] if clave_autor else -1,
+            )
+
+        self._recargas += 1
+        self._segundos_ultima_recarga = time.perf_counter() - inicio
+
+    def _aplicar_cambios(self, isbns):
+        isbns = list(isbns)
+        for i in range(0, len(isbns), 500):
+            lote = isbns[i:i + 500]
+            marcas = ", ".join("?" * len(lote))
+            with crud_libros.get_connection() as conn:
+                filas = conn.execute(
+                    f"SELECT isbn, titulo, autor FROM libros WHERE isbn IN ({marcas})",
+                    lote,
+                ).fetchall()
+            vigentes = {fila[0]: fila for fila in filas}
+            for isbn in lote:
+                # Descontamos lo que aportaba antes y sumamos lo que aporta ahora
+                for sid in self._por_isbn.pop(isbn, ()):
+                    if sid >= 0:
+                        self._libros[sid] = max(self._libros[sid] - 1, 0)
+                fila = vigentes.get(isbn)
+                if fila is not None:
+                    self._por_isbn[isbn] = (
+                        self._sumar(0, fila[1], 1),
+                        self._sumar(1, fila[2], 1),
+                    )
+        self._cambios_aplicados += len(isbns)
+        self._consultas.clear()
+
+    def _sincronizar(self):
+        cambios = self._seguidor.sincronizar()
+        if cambios is None:
+            self._cargar_todo()
+        elif cambios:
+            self._aplicar_cambios(cambios)
+
+    # ---------------- Consulta ----------------
+
+    def _candidatos(self, prefijo):
+        inicio = bisect_left(self._vocabulario, prefijo)
+        fin = bisect_left(self._vocabulario, prefijo + "\uffff", inicio)
+        listas = [self._postings[p] for p in self._vocabulario[inicio:fin]]
+        if len(listas) == 1:
+            return iter(listas[0]), 1
+        return merge(*listas), len(listas)
+
+    def sugerir(self, texto, k=AUTOCOMPLETAR_SUGERENCIAS, tipo=None):
+
+        """
+        Devuelve hasta `k` tuplas (texto, tipo, libros) cuyos títulos o autores
+        tienen una palabra que empieza con cada palabra escrita, sin distinguir
+        mayúsculas ni acentos: "garcia ma" sugiere "Gabriel García Márquez".
+        `tipo` limita a "titulo" o "autor".
+        """
+        palabras = _palabras(texto)
+        if not palabras or k <= 0:
+            return []
+        filtro_tipo = TIPOS.index(tipo) if tipo else None
+
+        with self._lock:
+            self._sincronizar()
+            clave = (tuple(palabras), k, filtro_tipo)
+            if clave in self._consultas:
+                return self._consultas[clave]
+
+            # La palabra más larga suele ser la más selectiva: guía el recorrido
+            guia = max(palabras, key=len)
+            resto = list(palabras)
+            resto.remove(guia)
+            candidatos, amplitud = self._candidatos(guia)
+
+            resultado = []
+            anterior = -1
+            for sid in candidatos:
+                if sid == anterior:
+                    continue    # La sugerencia tiene varias palabras con ese prefijo
+                anterior = sid
+                if self._libros[sid] <= 0:
+                    continue
+                if filtro_tipo is not None and self._tipo[sid] != filtro_tipo:
+                    continue
+                if resto:
+                    suyas = re.findall(r"\w+", self._normal[sid])
+                    if not all(any(p.startswith(q) for p in suyas) for q in resto):
+                        continue
+                resultado.append((self._texto[sid], TIPOS[self._tipo[sid]], self._libros[sid]))
+                if len(resultado) >= k:
+                    break
+
+            # Prefijos cortos abarcan miles de palabras; guardamos el resultado
+            # hasta el siguiente cambio en el catálogo
+            if amplitud > 64:
+                if len(self._consultas) >= 1000:
+                    self._consultas.clear()
+                self._consultas[clave] = resultado
+            return resultado
+
+    # ---------------- Métricas ----------------
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "sugerencias": sum(1 for n in self._libros if n > 0),
+                "palabras": len(self._vocabulario),
+                "libros": len(self._por_isbn),
+                "recargas": self._recargas,
+                "segundos_ultima_recarga": self._segundos_ultima_recarga,
+                "cambios_aplicados": self._cambios_aplicados,
+                "consultas_en_cache": len(self._consultas),
+            }
+
+#********************************************************************************
+#   OBTENER_INDICE - Instancia única por proceso
+#********************************************************************************
+
+_indice = None
+_indice_lock = threading.Lock()
+
+def obtener_indice():
+    global _indice
+    if _indice is None:
+        with _indice_lock:
+            if _indice is None:
+                _indice = IndiceAutocompletar()
+    return _indice
+
+def sugerir(texto, k=AUTOCOMPLETAR_SUGERENCIAS, tipo=None):
+    return obtener_indice().sugerir(texto, k, tipo)
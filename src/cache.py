@@ -0,0 +1,103 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import threading
+import time
+from collections import OrderedDict
+
+#********************************************************************************
+#   CACHE_LRU - Caché acotada en memoria con expiración (TTL), segura entre hilos
+#********************************************************************************
+
+class CacheLRU:
+
+    """
+    Guarda hasta `max_entradas` valores; al llenarse descarta el menos usado.
+    Cada entrada expira `ttl` segundos después de guardarse (None = nunca).
+    Se puede guardar None como valor para recordar búsquedas sin resultado.
+    """
+
+    def __init__(self, max_entradas=1000, ttl=None):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()     # clave -> (valor, expira_en)
+        self._lock = threading.Lock()
+        self._generacion = 0
+
+        # Contadores
+        self._aciertos = 0
+        self._aciertos_negativos = 0
+        self._fallos = 0
+        self._desalojos = 0
+        self._expiradas = 0
+        self._invalidaciones = 0
+        self._vaciados = 0
+
+    def obtener(self, clave):
+        """Devuelve (encontrado, valor)."""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self._fallos += 1
+                return False, None
+            valor, expira_en = entrada
+            if expira_en is not None and time.monotonic() >= expira_en:
+                del self._datos[clave]
+                self._expiradas += 1
+                self._fallos += 1
+                return False, None
+            self._datos.move_to_end(clave)
+            self._aciertos += 1
+            if valor is None:
+                self._aciertos_negativos += 1
+            return True, valor
+
+    def generacion(self):
+        """Marca a pasar a guardar() para descartar lecturas que una escritura dejó viejas."""
+        return self._generacion
+
+    def guardar(self, clave, valor, generacion=None):
+        with self._lock:
+            # Si hubo una invalidación mientras se leía la BD, el valor ya no es confiable
+            if generacion is not None and generacion != self._generacion:
+                return
+            expira_en = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._datos[clave] = (valor, expira_en)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self._desalojos += 1
+
+    def invalidar(self, *claves):
+        with self._lock:
+            self._generacion += 1
+            for clave in claves:
+                if self._datos.pop(clave, None) is not None:
+                    self._invalidaciones += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._generacion += 1
+            self._datos.clear()
+            self._vaciados += 1
+
+    def __len__(self):
+        return len(self._datos)
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self._aciertos + self._fallos
+            return {
+                "entradas": len(self._datos),
+                "max_entradas": self.max_entradas,
+                "ttl_s": self.ttl,
+                "aciertos": self._aciertos,
+                "aciertos_negativos": self._aciertos_negativos,
+                "fallos": self._fallos,
+                "tasa_aciertos": (self._aciertos / consultas) if consultas else 0.0,
+                "desalojos": self._desalojos,
+                "expiradas": self._expiradas,
+                "invalidaciones": self._invalidaciones,
+                "vaciados": self._vaciados,
+            }
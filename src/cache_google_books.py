@@ -0,0 +1,274 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import json
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+from pathlib import Path
+import sys
+
+# Ruta absoluta a la raíz del proyecto (donde está config.py)
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Aseguramos que la raíz esté en sys.path
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from config import (
+    DB_PATH,
+    GOOGLE_CACHE_TTL_S,
+    GOOGLE_CACHE_TTL_NEGATIVO_S,
+    GOOGLE_CACHE_OBSOLETO_S,
+    GOOGLE_CACHE_MAX,
+)
+from database import obtener_pool
+from esquema import asegurar_esquema
+from isbn import normalizar_isbn
+
+#********************************************************************************
+#   CLAVE_CONSULTA - La misma búsqueda escrita distinto da la misma clave:
+#                    "isbn:<isbn13>" o 'intitle:"..." inauthor:"..."' normalizado
+#********************************************************************************
+
+def _normalizar(texto):
+    texto = unicodedata.normalize("NFKD", str(texto or ""))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", texto).strip().casefold()
+
+def clave_consulta(isbn=None, titulo=None, autor=None):
+    if isbn:
+        return "isbn:" + (normalizar_isbn(isbn) or re.sub(r"[^0-9X]", "", str(isbn).upper()))
+    if titulo and autor:
+        return f'intitle:"{_normalizar(titulo)}" inauthor:"{_normalizar(autor)}"'
+    if titulo:
+        return f'intitle:"{_normalizar(titulo)}"'
+    return None
+
+#********************************************************************************
+#   CACHE_GOOGLE_BOOKS - Respuestas guardadas en SQLite: sobreviven reinicios y
+#                        las comparten todos los procesos
+#********************************************************************************
+
+class CacheGoogleBooks:
+
+    """
+    obtener(clave, consultar) devuelve la respuesta guardada o llama a
+    `consultar()` (la petición HTTP) y guarda lo que devuelva:
+      - respuesta con datos: vale `ttl` segundos;
+      - None (no se encontró el libro): vale `ttl_negativo` segundos;
+      - si `consultar` lanza una excepción (red caída, cuota) no se guarda
+        nada y, si había una respuesta vieja, se usa esa.
+
+    Vencida hace menos de `obsoleto` segundos, la respuesta se entrega de
+    inmediato y se actualiza en un hilo aparte (stale-while-revalidate).
+    Con más de `max_entradas` se borran las menos usadas.
+
+    Las entradas no se cuentan en cada escritura: se lleva una cota (lo
+    contado la última vez más cada escritura, aunque sea una actualización)
+    y solo cuando pasa de `max_entradas` se hace el COUNT(*) de verdad. Lo
+    que escriben otros procesos se ve en ese conteo.
+    """
+
+    USO_MINIMO_S = 3600     # `usada` se actualiza a lo más una vez por hora por entrada
+    HILOS_REVALIDACION = 4  # Un escaneo de entradas vencidas no abre un hilo por libro
+
+    def __init__(self, ttl=GOOGLE_CACHE_TTL_S, ttl_negativo=GOOGLE_CACHE_TTL_NEGATIVO_S,
+                 obsoleto=GOOGLE_CACHE_OBSOLETO_S, max_entradas=GOOGLE_CACHE_MAX):
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self.obsoleto = obsoleto
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._revalidando = set()
+        self._ejecutor = None
+        self._cota_entradas = None      # None = sin contar todavía
+
+        # Contadores
+        self._aciertos = 0
+        self._aciertos_negativos = 0
+        self._aciertos_obsoletos = 0
+        self._fallos = 0
+        self._consultas_red = 0
+        self._errores_red = 0
+        self._revalidaciones = 0
+        self._desalojos = 0
+        self._ms_red = 0.0
+        self._ms_ahorrados = 0.0
+
+    def _conexion(self):
+        asegurar_esquema(DB_PATH)
+        return obtener_pool(DB_PATH).conexion()
+
+    def _contar(self, **sumas):
+        with self._lock:
+            for nombre, valor in sumas.items():
+                setattr(self, nombre, getattr(self, nombre) + valor)
+
+    # ---------------- Lectura ----------------
+
+    def _leer(self, clave):
+        with self._conexion() as conn:
+            return conn.execute(
+                "SELECT respuesta, expira, usada, ms_consulta FROM cache_google_books WHERE clave = ?",
+                (clave,),
+            ).fetchone()
+
+    def obtener(self, clave, consultar):
+        ahora = time.time()
+        fila = self._leer(clave)
+        if fila is None:
+            self._contar(_fallos=1)
+            return self._consultar(clave, consultar)
+
+        respuesta, expira, usada, ms_consulta = fila
+        valor = json.loads(respuesta) if respuesta is not None else None
+        if ahora >= expira + self.obsoleto:
+            # Demasiado vieja para servirla sin más: se consulta, y solo si
+            # la red falla se usa lo que había
+            self._contar(_fallos=1)
+            return self._consultar(clave, consultar, anterior=valor)
+
+        self._contar(
+            _aciertos=1,
+            _aciertos_negativos=int(valor is None),
+            _aciertos_obsoletos=int(ahora >= expira),
+            _ms_ahorrados=ms_consulta,
+        )
+        if ahora >= expira:
+            self._revalidar(clave, consultar)
+        elif ahora - usada > self.USO_MINIMO_S:
+            with self._conexion() as conn:
+                conn.execute("UPDATE cache_google_books SET usada = ? WHERE clave = ?", (ahora, clave))
+                conn.commit()
+        return valor
+
+    # ---------------- Escritura ----------------
+
+    def _consultar(self, clave, consultar, anterior=None):
+        inicio = time.perf_counter()
+        try:
+            valor = consultar()
+        except Exception:
+            self._contar(_consultas_red=1, _errores_red=1)
+            return anterior
+        ms = (time.perf_counter() - inicio) * 1000
+        self._contar(_consultas_red=1, _ms_red=ms)
+        self.guardar(clave, valor, ms)
+        return valor
+
+    def guardar(self, clave, valor, ms_consulta=0.0):
+        ahora = time.time()
+        vida = self.ttl if valor is not None else self.ttl_negativo
+        with self._conexion() as conn:
+            conn.execute(
+                """
+                INSERT INTO cache_google_books (clave, respuesta, guardada, expira, usada, ms_consulta)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (clave) DO UPDATE SET
+                    respuesta = excluded.respuesta, guardada = excluded.guardada,
+                    expira = excluded.expira, usada = excluded.usada,
+                    ms_consulta = excluded.ms_consulta
+                """,
+                (
+                    clave, json.dumps(valor, ensure_ascii=False) if valor is not None else None,
+                    ahora, ahora + vida, ahora, ms_consulta,
+                ),
+            )
+            with self._lock:
+                if self._cota_entradas is not None:
+                    self._cota_entradas += 1
+                contar = self._cota_entradas is None or self._cota_entradas > self.max_entradas
+            if contar:
+                self._desalojar(conn)
+            conn.commit()
+
+    def _contar_entradas(self, conn):
+        return conn.execute("SELECT COUNT(*) FROM cache_google_books").fetchone()[0]
+
+    def _desalojar(self, conn):
+        entradas = self._contar_entradas(conn)
+        sobrantes = entradas - self.max_entradas
+        if sobrantes > 0:
+            # Se libera un 10 % extra para no desalojar en cada inserción
+            sobrantes += self.max_entradas // 10
+            borradas = conn.execute(
+                """
+                DELETE FROM cache_google_books WHERE clave IN (
+                    SELECT clave FROM cache_google_books ORDER BY usada LIMIT ?
+                )
+                """,
+                (sobrantes,),
+            ).rowcount
+            entradas -= borradas
+            self._contar(_desalojos=borradas)
+        with self._lock:
+            self._cota_entradas = entradas
+
+    def _revalidar(self, clave, consultar):
+        # Una sola actualización en curso por clave
+        with self._lock:
+            if clave in self._revalidando:
+                return
+            self._revalidando.add(clave)
+
+        def actualizar():
+            try:
+                self._consultar(clave, consultar)
+                self._contar(_revalidaciones=1)
+            finally:
+                with self._lock:
+                    self._revalidando.discard(clave)
+
+        with self._lock:
+            if self._ejecutor is None:
+                self._ejecutor = ThreadPoolExecutor(
+                    max_workers=self.HILOS_REVALIDACION, thread_name_prefix="biblio-google-books"
+                )
+        self._ejecutor.submit(actualizar)
+
+    # ---------------- Mantenimiento y métricas ----------------
+
+    def limpiar(self):
+        with self._conexion() as conn:
+            conn.execute("DELETE FROM cache_google_books")
+            conn.commit()
+        with self._lock:
+            self._cota_entradas = 0
+
+    def estadisticas(self):
+        with self._conexion() as conn:
+            entradas = conn.execute("SELECT COUNT(*) FROM cache_google_books").fetchone()[0]
+        with self._lock:
+            consultas = self._aciertos + self._fallos
+            return {
+                "entradas": entradas,
+                "max_entradas": self.max_entradas,
+                "aciertos": self._aciertos,
+                "aciertos_negativos": self._aciertos_negativos,
+                "aciertos_obsoletos": self._aciertos_obsoletos,
+                "fallos": self._fallos,
+                "tasa_aciertos": (self._aciertos / consultas) if consultas else 0.0,
+                "consultas_red": self._consultas_red,
+                "errores_red": self._errores_red,
+                "revalidaciones": self._revalidaciones,
+                "desalojos": self._desalojos,
+                "ms_por_consulta_red": (self._ms_red / self._consultas_red) if self._consultas_red else 0.0,
+                "segundos_ahorrados": self._ms_ahorrados / 1000,
+            }
+
+#********************************************************************************
+#   OBTENER_CACHE - Instancia única por proceso
+#********************************************************************************
+
+_cache = CacheGoogleBooks()
+
+def obtener_cache():
+    return _cache
+
+def estadisticas_cache_google_books():
+    return _cache.estadisticas()
@@ -0,0 +1,273 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import sys
+import threading
+import time
+from array import array
+
+from pathlib import Path
+
+# Ruta absoluta a la raíz del proyecto (donde está config.py)
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Aseguramos que la raíz esté en sys.path
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from config import CATALOGO_MEMORIA_MAX
+import crud_libros
+
+#********************************************************************************
+#   CATALOGO_COLUMNAR - Copia del catálogo en memoria, una lista por columna,
+#                       compartida por todas las sesiones de Streamlit
+#********************************************************************************
+
+ORDENES = ("titulo", "autor", "anio", "editorial", "isbn")
+
+class CatalogoColumnar:
+
+    """
+    Guarda los libros por columnas en lugar de una tupla por libro:
+      - autor, editorial y título se "internan" (sys.intern), así los valores
+        repetidos comparten un solo objeto str;
+      - los años van en un array('i') de 4 bytes por libro.
+
+    Se carga una vez y luego se actualiza solo con los ISBN que registra
+    cambios_libros (crud_libros.SeguidorCambios), vengan de este proceso o de
+    otro. Si el catálogo supera `max_libros` se descarta y `disponible()`
+    devuelve False para que la vista pagine sobre la BD.
+    """
+
+    def __init__(self, max_libros=CATALOGO_MEMORIA_MAX):
+        self.max_libros = max_libros
+        self._lock = threading.RLock()
+        self._seguidor = crud_libros.SeguidorCambios(max_cambios=max(max_libros // 10, 1000))
+        self._pendientes = set()
+        self._desbordado = False
+
+        # Contadores
+        self._recargas = 0
+        self._cambios_aplicados = 0
+        self._segundos_ultima_recarga = 0.0
+
+        self._vaciar()
+
+    def _vaciar(self):
+        self.isbn = []
+        self.titulo = []
+        self.autor = []
+        self.editorial = []
+        self.anio = array("i")
+        self._pos = {}          # isbn -> posición en las columnas
+        self._ordenes = {}      # (columna, descendente) -> array de posiciones
+        self._consulta = None   # (clave, posiciones) de la última consulta filtrada
+
+    # ---------------- Escritura de columnas ----------------
+
+    def _agregar(self, fila):
+        isbn, titulo, autor, anio, editorial = fila
+        self._pos[isbn] = len(self.isbn)
+        self.isbn.append(isbn)
+        self.titulo.append(sys.intern(titulo or ""))
+        self.autor.append(sys.intern(autor or ""))
+        self.anio.append(int(anio or 0))
+        self.editorial.append(sys.intern(editorial or ""))
+
+    def _reemplazar(self, i, fila):
+        _, titulo, autor, anio, editorial = fila
+        self.titulo[i] = sys.intern(titulo or "")
+        self.autor[i] = sys.intern(autor or "")
+        self.anio[i] = int(anio or 0)
+        self.editorial[i] = sys.intern(editorial or "")
+
+    def _quitar(self, isbn):
+        # Movemos el último libro al hueco para no desplazar las columnas
+        i = self._pos.pop(isbn)
+        ultimo = len(self.isbn) - 1
+        if i != ultimo:
+            for columna in (self.isbn, self.titulo, self.autor, self.anio, self.editorial):
+                columna[i] = columna[ultimo]
+            self._pos[self.isbn[i]] = i
+        for columna in (self.isbn, self.titulo, self.autor, self.anio, self.editorial):
+            columna.pop()
+
+    # ---------------- Sincronización con la BD ----------------
+
+    def _cargar_todo(self):
+        inicio = time.perf_counter()
+        self._vaciar()
+        self._pendientes.clear()
+        self._desbordado = False
+        for fila in crud_libros.iterar_libros(tamano_lote=5000):
+            if len(self.isbn) >= self.max_libros:
+                self._desbordado = True
+                self._vaciar()
+                break
+            self._agregar(fila)
+        self._recargas += 1
+        self._segundos_ultima_recarga = time.perf_counter() - inicio
+
+    def _aplicar_pendientes(self):
+        isbns = list(self._pendientes)
+        self._pendientes.clear()
+        for i in range(0, len(isbns), 500):
+            lote = isbns[i:i + 500]
+            marcas = ", ".join("?" * len(lote))
+            with crud_libros.get_connection() as conn:
+                filas = conn.execute(
+                    "SELECT isbn, titulo, autor, anio, editorial FROM libros "
+                    f"WHERE isbn IN ({marcas})",
+                    lote,
+                ).fetchall()
+            vigentes = {fila[0]: fila for fila in filas}
+            for isbn in lote:
+                fila = vigentes.get(isbn)
+                if fila is None:
+                    if isbn in self._pos:
+                        self._quitar(isbn)
+                elif isbn in self._pos:
+                    self._reemplazar(self._pos[isbn], fila)
+                else:
+                    self._agregar(fila)
+        self._cambios_aplicados += len(isbns)
+        self._ordenes.clear()
+        self._consulta = None
+        if len(self.isbn) > self.max_libros:
+            self._desbordado = True
+            self._vaciar()
+
+    def _sincronizar(self):
+        cambios = self._seguidor.sincronizar()
+        if cambios is None:
+            self._cargar_todo()
+        elif cambios and self._desbordado:
+            # Sin copia que actualizar: si el catálogo volvió a caber se
+            # recarga (y _cargar_todo limpia el desborde); si no, sigue en la BD
+            if self._total_libros() <= self.max_libros:
+                self._cargar_todo()
+        elif cambios:
+            self._pendientes.update(cambios)
+            self._aplicar_pendientes()
+
+    def _total_libros(self):
+        with crud_libros.get_connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM libros").fetchone()[0]
+
+    # ---------------- Lectura ----------------
+
+    def disponible(self):
+        with self._lock:
+            self._sincronizar()
+            return not self._desbordado
+
+    def __len__(self):
+        return len(self.isbn)
+
+    def _orden(self, columna, descendente):
+        clave = (columna, descendente)
+        orden = self._ordenes.get(clave)
+        if orden is None:
+            isbn = self.isbn
+            if columna == "anio":
+                valores, titulos = self.anio, self.titulo
+                llave = lambda i: (valores[i], titulos[i].casefold(), isbn[i])
+            elif columna == "isbn":
+                llave = lambda i: isbn[i]
+            else:
+                valores = getattr(self, columna)
+                llave = lambda i: (valores[i].casefold(), isbn[i])
+            orden = array("i", sorted(range(len(isbn)), key=llave, reverse=descendente))
+            self._ordenes[clave] = orden
+        return orden
+
+    def consultar(self, orden="titulo", descendente=False, texto="",
+                  anio_desde=None, anio_hasta=None, pagina=1, tamano=50):
+
+        """
+        Devuelve (filas, total): la página `pagina` (desde 1) de los libros que
+        contienen `texto` en título, autor o editorial y caen en el rango de
+        años, ordenados por `orden`.
+        """
+        if orden not in ORDENES:
+            raise ValueError(f"Orden no soportado: {orden!r}")
+        with self._lock:
+            self._sincronizar()
+            posiciones = self._orden(orden, descendente)
+
+            texto = (texto or "").strip().casefold()
+            if texto or anio_desde is not None or anio_hasta is not None:
+                clave = (orden, descendente, texto, anio_desde, anio_hasta)
+                if self._consulta is None or self._consulta[0] != clave:
+                    titulo, autor, editorial, anio = self.titulo, self.autor, self.editorial, self.anio
+                    filtradas = array("i")
+                    for i in posiciones:
+                        if anio_desde is not None and anio[i] < anio_desde:
+                            continue
+                        if anio_hasta is not None and anio[i] > anio_hasta:
+                            continue
+                        if texto and not (
+                            texto in titulo[i].casefold()
+                            or texto in autor[i].casefold()
+                            or texto in editorial[i].casefold()
+                        ):
+                            continue
+                        filtradas.append(i)
+                    self._consulta = (clave, filtradas)
+                posiciones = self._consulta[1]
+
+            inicio = (max(int(pagina), 1) - 1) * tamano
+            filas = [
+                (self.isbn[i], self.titulo[i], self.autor[i], self.anio[i], self.editorial[i])
+                for i in posiciones[inicio:inicio + tamano]
+            ]
+            return filas, len(posiciones)
+
+    # ---------------- Métricas ----------------
+
+    def memoria_bytes(self):
+        """Tamaño aproximado: columnas, índice por ISBN y cada str distinto una vez."""
+        with self._lock:
+            total = sum(
+                sys.getsizeof(columna)
+                for columna in (self.isbn, self.titulo, self.autor, self.editorial, self.anio, self._pos)
+            )
+            total += sum(sys.getsizeof(orden) for orden in self._ordenes.values())
+            vistos = set()
+            for columna in (self.isbn, self.titulo, self.autor, self.editorial):
+                for valor in columna:
+                    if id(valor) not in vistos:
+                        vistos.add(id(valor))
+                        total += sys.getsizeof(valor)
+            return total
+
+    def estadisticas(self):
+        memoria = self.memoria_bytes()
+        with self._lock:
+            libros = len(self.isbn)
+            return {
+                "libros": libros,
+                "max_libros": self.max_libros,
+                "desbordado": self._desbordado,
+                "memoria_bytes": memoria,
+                "bytes_por_100k_libros": int(memoria / libros * 100000) if libros else 0,
+                "recargas": self._recargas,
+                "segundos_ultima_recarga": self._segundos_ultima_recarga,
+                "cambios_aplicados": self._cambios_aplicados,
+            }
+
+#********************************************************************************
+#   OBTENER_CATALOGO - Instancia única por proceso
+#********************************************************************************
+
+_catalogo = None
+_catalogo_lock = threading.Lock()
+
+def obtener_catalogo():
+    global _catalogo
+    if _catalogo is None:
+        with _catalogo_lock:
+            if _catalogo is None:
+                _catalogo = CatalogoColumnar()
+    return _catalogo
@@ -3,7 +3,18 @@
 #********************************************************************************
 
 import os
+import io
+import re
+import csv
+import json
+import time
+import logging
+import zlib
+import queue
+import threading
 import sqlite3
+from concurrent.futures import Future, TimeoutError as FuturoVencido
+from itertools import islice
 
 from pathlib import Path
 import sys
@@ -16,88 +27,409 @@ if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
 
-from config import asset_path, DB_PATH
+from config import (
+    asset_path,
+    DB_PATH,
+    CACHE_LIBROS_MAX,
+    CACHE_LIBROS_TTL,
+    CDC_RETENCION_DIAS,
+    ESCRITURA_AGRUPADA,
+    ESCRITURA_VENTANA_MS,
+    ESCRITURA_LOTE_MAX,
+    ESCRITURA_TIMEOUT_S,
+)
+from database import obtener_pool
+from cache import CacheLRU
+from isbn import normalizar_isbn, clave_isbn
+from esquema import asegurar_esquema, canonicalizar_isbns
 
 # Cargamos automáticamente el archivo .env con las variables de entorno, para Streamlit Cloud se carga como una variable SECRETA
 # from dotenv import load_dotenv # type: ignore
 # load_dotenv()  
 
-# BIBLIO_DB_PATH Tiene la ruta a la DB y esta en el archivo .env, si no la encuentra crea/usa biblioteca_db.db)
-# DB_PATH = os.getenv("BIBLIO_DB_PATH", "data/biblioteca_db.db")
-print(DB_PATH)
+# BIBLIO_DB_PATH / BIBLIO_DB_BACKEND (ver config.py) eligen la base de datos
 
 #********************************************************************************
-#   GET_CONNECTION - Conexión con la base de datos, si no existe la crea
-#                    SQLite3 ya viene instalado por default
+#   GET_CONNECTION - Presta una conexión del pool compartido (database.py),
+#                    se usa como `with get_connection() as conn:`
 #********************************************************************************
 
 def get_connection():
-    print(DB_PATH)
-    return sqlite3.connect(str(DB_PATH))
+    return obtener_pool(DB_PATH).conexion()
 
 #********************************************************************************
-#   INIT_DB - Crea la tabla Libros
+#   SEGUIDOR_CAMBIOS - Consumidor del registro de cambios (cambios_libros): dice
+#                      qué ISBN cambiaron desde la última vez que se preguntó
+#********************************************************************************
+
+class SeguidorCambios:
+
+    """
+    Cada copia derivada del catálogo (caché, catálogo en memoria, índices)
+    tiene su propio seguidor. sincronizar() devuelve:
+      - set() si no hubo commits (solo cuesta un PRAGMA data_version);
+      - el conjunto de ISBN que cambiaron, leído de cambios_libros;
+      - None si hay que recargar todo: primera llamada, demasiados cambios
+        o el registro ya fue compactado más allá de lo que este seguidor vio.
+    """
+
+    def __init__(self, max_cambios=50000):
+        self.max_cambios = max_cambios
+        self.seq = None
+        self._version = None
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _reiniciar(self, version, pool):
+        self.seq = ultimo_seq()
+        self._version = version
+        self._pool = pool
+        return None
+
+    def sincronizar(self):
+        with self._lock:
+            pool = obtener_pool(DB_PATH)
+            version = pool.version_datos()
+            # Otra base de datos (p. ej. el motor en memoria se recreó): todo de nuevo
+            if self.seq is None or pool is not self._pool:
+                return self._reiniciar(version, pool)
+            if version == self._version:
+                return set()
+
+            isbns = set()
+            while True:
+                cambios = cambios_desde(self.seq, limit=5000)
+                if not cambios:
+                    if ultimo_seq() != self.seq:
+                        return self._reiniciar(version, pool)   # Compactado
+                    break
+                if cambios[0][0] != self.seq + 1:
+                    return self._reiniciar(version, pool)       # Hueco: compactado
+                isbns.update(cambio[2] for cambio in cambios)
+                self.seq = cambios[-1][0]
+                if len(isbns) > self.max_cambios:
+                    return self._reiniciar(version, pool)
+            self._version = version
+            return isbns
+
+#********************************************************************************
+#   CACHE DE LIBROS - LRU compartida por todas las sesiones delante de buscar_libro
+#********************************************************************************
+
+_cache_libros = CacheLRU(max_entradas=CACHE_LIBROS_MAX, ttl=CACHE_LIBROS_TTL)
+_seguidor_cache = SeguidorCambios()
+
+def _validar_cache_libros():
+    # Commits de otras conexiones u otros procesos: invalidamos exactamente los
+    # ISBN que registró cambios_libros (o todo, si el seguidor lo pide).
+    cambios = _seguidor_cache.sincronizar()
+    if cambios is None:
+        _cache_libros.limpiar()
+    elif cambios:
+        _cache_libros.invalidar(*cambios)
+
+def estadisticas_cache_libros():
+    return _cache_libros.estadisticas()
+
+#********************************************************************************
+#   DESPUES_DE_ESCRIBIR - Invalida en la caché los ISBN que este proceso acaba
+#                         de escribir. Las demás copias del catálogo (catálogo
+#                         en memoria, autocompletado) se enteran por
+#                         cambios_libros con su propio SeguidorCambios.
+#********************************************************************************
+
+_log = logging.getLogger("biblioteca.crud_libros")
+
+def _despues_de_escribir(isbns):
+    if isbns is None:
+        _cache_libros.limpiar()
+        return
+    isbns = set(isbns)
+    if isbns:
+        _cache_libros.invalidar(*isbns)
+
+def _despues_del_commit(isbns):
+    # Los datos ya están confirmados: un error aquí se registra, no se propaga
+    # (ni mata al hilo escritor ni convierte en fallo una escritura exitosa)
+    try:
+        _despues_de_escribir(isbns)
+    except Exception:
+        _log.exception("Error al actualizar la caché tras una escritura")
+
+#********************************************************************************
+#   COLA_ESCRITURA - Un solo hilo escritor que junta las escrituras de todas las
+#                    sesiones y las confirma en commits agrupados
+#********************************************************************************
+
+class ColaEscritura:
+
+    """
+    SQLite admite un escritor a la vez: si varios bibliotecarios registran
+    libros al mismo tiempo, las transacciones compiten por el bloqueo y pagan
+    un commit cada una. Aquí todas las escrituras pasan por un hilo que:
+      - espera hasta `ventana_ms` a que lleguen más solicitudes (máx. `lote_max`);
+      - las ejecuta en una sola transacción, cada una dentro de su SAVEPOINT,
+        así el error de una no deshace a las demás;
+      - hace un único commit y entrega a cada llamador su propio (ok, msg).
+
+    Cada operación es `operacion(cursor, *args) -> ((ok, msg), isbns_tocados)`.
+    """
+
+    def __init__(self, ventana_ms=ESCRITURA_VENTANA_MS, lote_max=ESCRITURA_LOTE_MAX):
+        self.ventana = ventana_ms / 1000
+        self.lote_max = lote_max
+        self._solicitudes = queue.Queue()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+        # Contadores
+        self._commits = 0
+        self._escrituras = 0
+        self._lote_mayor = 0
+        self._errores_commit = 0
+
+    def _arrancar(self):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(
+                    target=self._bucle, name="biblio-cola-escritura", daemon=True
+                )
+                self._hilo.start()
+
+    def enviar(self, operacion, *args, timeout=ESCRITURA_TIMEOUT_S):
+        # Una escritura hecha desde el propio hilo escritor (una operación que
+        # llama a otra función de escritura)
+        # no puede esperar a la cola: se ejecuta directo
+        if self._hilo is not None and threading.current_thread() is self._hilo:
+            return _escribir_directo(operacion, *args)
+        self._arrancar()
+        futuro = Future()
+        self._solicitudes.put((operacion, args, futuro))
+        try:
+            return futuro.result(timeout=timeout)
+        except FuturoVencido:
+            return False, "La escritura no se confirmó a tiempo; puede aplicarse más tarde."
+
+    def _bucle(self):
+        while True:
+            lote = [self._solicitudes.get()]
+            # Lo que se acumuló mientras confirmábamos el lote anterior entra
+            # sin esperar. Solo si hay concurrencia (más de una solicitud)
+            # esperamos la ventana por más; un llamador solo no paga latencia.
+            limite = time.perf_counter() + self.ventana
+            while len(lote) < self.lote_max:
+                try:
+                    lote.append(self._solicitudes.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                restante = limite - time.perf_counter()
+                if len(lote) == 1 or restante <= 0:
+                    break
+                try:
+                    lote.append(self._solicitudes.get(timeout=restante))
+                except queue.Empty:
+                    break
+            try:
+                self._confirmar(lote)
+            except BaseException as error:
+                # Nunca dejamos a un llamador esperando hasta su timeout
+                for _, _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(error)
+                _log.exception("Error inesperado en la cola de escritura")
+
+    def _confirmar(self, lote):
+        resultados = []
+        tocados = set()
+        try:
+            with get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                for operacion, args, futuro in lote:
+                    cursor.execute("SAVEPOINT escritura")
+                    try:
+                        resultado, isbns = operacion(cursor, *args)
+                        cursor.execute("RELEASE escritura")
+                    except Exception as error:
+                        cursor.execute("ROLLBACK TO escritura")
+                        cursor.execute("RELEASE escritura")
+                        resultados.append((futuro, None, error))
+                        continue
+                    tocados.update(isbns)
+                    resultados.append((futuro, resultado, None))
+                conn.commit()
+        except sqlite3.Error:
+            # No se pudo tomar el bloqueo o confirmar: nada del lote quedó escrito
+            with self._lock:
+                self._errores_commit += 1
+            for _, _, futuro in lote:
+                futuro.set_result(
+                    (False, "La base de datos está ocupada. Intenta de nuevo en unos segundos.")
+                )
+            return
+
+        try:
+            with self._lock:
+                self._commits += 1
+                self._escrituras += len(lote)
+                self._lote_mayor = max(self._lote_mayor, len(lote))
+            _despues_del_commit(tocados)
+        finally:
+            for futuro, resultado, error in resultados:
+                if error is not None:
+                    futuro.set_exception(error)
+                else:
+                    futuro.set_result(resultado)
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "commits": self._commits,
+                "escrituras": self._escrituras,
+                "escrituras_por_commit": (self._escrituras / self._commits) if self._commits else 0.0,
+                "lote_mayor": self._lote_mayor,
+                "errores_commit": self._errores_commit,
+                "pendientes": self._solicitudes.qsize(),
+            }
+
+_cola_escritura = ColaEscritura()
+
+def _escribir_directo(operacion, *args):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        # El bloqueo de escritura se toma antes de leer: una transacción
+        # diferida que lee y luego escribe falla (SQLITE_BUSY_SNAPSHOT) si
+        # otro commit llega en medio, y busy_timeout no la reintenta
+        cursor.execute("BEGIN IMMEDIATE")
+        resultado, isbns = operacion(cursor, *args)
+        conn.commit()
+    _despues_del_commit(isbns)
+    return resultado
+
+#********************************************************************************
+#   ESCRIBIR - Punto de entrada de toda escritura del catálogo y de los módulos
+#              que comparten la base (préstamos): pasa por la cola de escritura
+#              o, con ESCRITURA_AGRUPADA apagada, hace su propio commit
+#********************************************************************************
+
+def escribir(operacion, *args, timeout=ESCRITURA_TIMEOUT_S):
+
+    """
+    `operacion(cursor, *args)` devuelve (resultado, isbns_tocados): corre en
+    su SAVEPOINT y los ISBN tocados se invalidan en la caché tras el commit.
+    Devuelve el resultado de la operación (normalmente (ok, msg)), o
+    (False, msg) si no se pudo confirmar o no se confirmó en `timeout`
+    segundos (None = esperar lo que haga falta).
+    """
+    if ESCRITURA_AGRUPADA:
+        return _cola_escritura.enviar(operacion, *args, timeout=timeout)
+    return _escribir_directo(operacion, *args)
+
+def estadisticas_escritura():
+    return _cola_escritura.estadisticas()
+
+#********************************************************************************
+#   INIT_DB - Deja la base de datos en la última versión del esquema (esquema.py);
+#             solo trabaja la primera vez que se llama en el proceso
 #********************************************************************************
 
 def init_db():
-    print(DB_PATH)
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS libros (
-            isbn TEXT PRIMARY KEY,
-            titulo TEXT NOT NULL,
-            autor TEXT,
-            anio INTEGER,
-            editorial TEXT
-        );
-        """
-    )
-    conn.commit()
-    conn.close()
+    asegurar_esquema(DB_PATH)
 
 #********************************************************************************
 #   INSERTAR_LIBRO - Registra un nuevo libro
 #********************************************************************************
 
-def insertar_libro(isbn, titulo, autor, anio, editorial):
-    conn = get_connection()
-    cursor = conn.cursor()
+def insertar_libro(isbn, titulo, autor, anio, editorial, permitir_duplicado=True):
+    # Siempre se guarda el ISBN-13 canónico (ISBN-10 y guiones se convierten)
+    isbn = normalizar_isbn(isbn)
+    if not isbn:
+        return False, "ISBN inválido. Verifica los dígitos del ISBN-10 o ISBN-13."
+    if not permitir_duplicado:
+        # Import diferido: duplicados.py importa este módulo
+        from duplicados import posibles_duplicados
+
+        parecidos = posibles_duplicados(titulo, autor, isbn=isbn, limite=3)
+        if parecidos:
+            lista = "; ".join(f"{libro[1]} ({libro[0]})" for _, libro in parecidos)
+            return False, f"Posible duplicado de: {lista}."
+    return escribir(_op_insertar, isbn, titulo, autor, anio, editorial)
+
+def _op_insertar(cursor, isbn, titulo, autor, anio, editorial):
     try:
         cursor.execute(
             "INSERT INTO libros (isbn, titulo, autor, anio, editorial) VALUES (?, ?, ?, ?, ?)",
             (isbn, titulo, autor, anio, editorial),
         )
-        conn.commit()
-        return True, "Libro registrado correctamente."
     except sqlite3.IntegrityError:
-        return False, "Ya existe un libro con ese ISBN."
-    finally:
-        conn.close()
+        return (False, "Ya existe un libro con ese ISBN."), ()
+    return (True, "Libro registrado correctamente."), (isbn,)
 
 #********************************************************************************
 #   BUSCAR_LIBRO - Busca un libro por ISBN
 #********************************************************************************
 
 def buscar_libro(isbn):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT isbn, titulo, autor, anio, editorial FROM libros WHERE isbn = ?",
-        (isbn,),
-    )
-    libro = cursor.fetchone()
-    conn.close()
+    # Cualquier forma del ISBN (10, 13, con guiones) resuelve a la misma clave
+    isbn = clave_isbn(isbn)
+    _validar_cache_libros()
+    encontrado, libro = _cache_libros.obtener(isbn)
+    if encontrado:
+        return libro
+
+    generacion = _cache_libros.generacion()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT isbn, titulo, autor, anio, editorial FROM libros WHERE isbn = ?",
+            (isbn,),
+        )
+        libro = cursor.fetchone()
+    # También se guarda None: un ISBN inexistente no vuelve a consultar la BD
+    _cache_libros.guardar(isbn, libro, generacion)
     return libro
 
+#********************************************************************************
+#   BUSCAR_TEXTO - Búsqueda por palabras en título, autor o editorial (FTS5),
+#                  ordenada por relevancia
+#********************************************************************************
+
+def buscar_texto(query, limit=20):
+
+    """
+    Cada palabra se busca como prefijo ("cien sol" encuentra "Cien años de
+    soledad") y sin distinguir mayúsculas ni acentos. Las coincidencias en el
+    título pesan más que en el autor, y éstas más que en la editorial.
+    """
+    palabras = re.findall(r"\w+", query or "")
+    if not palabras:
+        return []
+    expresion = " ".join(f'"{p}"*' for p in palabras)
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT l.isbn, l.titulo, l.autor, l.anio, l.editorial
+            FROM libros_fts
+            JOIN libros l ON l.id = libros_fts.rowid
+            WHERE libros_fts MATCH ?
+            ORDER BY bm25(libros_fts, 10.0, 5.0, 1.0)
+            LIMIT ?
+            """,
+            (expresion, limit),
+        )
+        return cursor.fetchall()
+
 #********************************************************************************
 #   ACTUALIZAR_LIBRO - Actualiza los datos de un libro por ISBN
 #********************************************************************************
 
 def actualizar_libro(isbn, titulo, autor, anio, editorial):
-    conn = get_connection()
-    cursor = conn.cursor()
+    return escribir(_op_actualizar, clave_isbn(isbn), titulo, autor, anio, editorial)
+
+def _op_actualizar(cursor, isbn, titulo, autor, anio, editorial):
     cursor.execute(
         """
         UPDATE libros
@@ -106,38 +438,774 @@ def actualizar_libro(isbn, titulo, autor, anio, editorial):
         """,
         (titulo, autor, anio, editorial, isbn),
     )
-    conn.commit()
-    cambios = cursor.rowcount
-    conn.close()
-    if cambios == 0:
-        return False, "No se encontró un libro con ese ISBN."
-    return True, "Libro actualizado correctamente."
+    if cursor.rowcount == 0:
+        return (False, "No se encontró un libro con ese ISBN."), ()
+    return (True, "Libro actualizado correctamente."), (isbn,)
 
 #********************************************************************************
 #   ELIMINAR_LIBRO - Elimina un libro por ISBN
 #********************************************************************************
 
 def eliminar_libro(isbn):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM libros WHERE isbn = ?", (isbn,))
-    conn.commit()
-    cambios = cursor.rowcount
-    conn.close()
-    if cambios == 0:
-        return False, "No se encontró un libro con ese ISBN."
-    return True, "Libro eliminado correctamente."
+    return escribir(_op_eliminar, clave_isbn(isbn))
+
+def _op_eliminar(cursor, isbn):
+    try:
+        cursor.execute("DELETE FROM libros WHERE isbn = ?", (isbn,))
+    except sqlite3.IntegrityError:
+        return (False, "El libro tiene ejemplares registrados; no se puede eliminar."), ()
+    if cursor.rowcount == 0:
+        return (False, "No se encontró un libro con ese ISBN."), ()
+    return (True, "Libro eliminado correctamente."), (isbn,)
 
 #********************************************************************************
 #   OBTENER_TODOS - Obtiene toda la colección de libros registrados
 #********************************************************************************
 
 def obtener_todos():
-    conn = get_connection()
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT isbn, titulo, autor, anio, editorial FROM libros ORDER BY titulo ASC"
+        )
+        return cursor.fetchall()
+
+
+#********************************************************************************
+#   OBTENER_PAGINA - Página del catálogo ordenada por (titulo, isbn) usando
+#                    paginación por cursor: el costo no depende de la página
+#********************************************************************************
+
+def obtener_pagina(tamano=50, despues=None, antes=None):
+
+    """
+    Devuelve (filas, cursor_siguiente, cursor_anterior).
+
+    `despues` y `antes` son cursores (titulo, isbn) devueltos por una llamada
+    previa; sin ninguno de los dos se obtiene la primera página. Un cursor
+    en None indica que no hay más páginas en esa dirección.
+    """
+    columnas = "SELECT isbn, titulo, autor, anio, editorial FROM libros"
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        if antes is not None:
+            cursor.execute(
+                columnas + " WHERE (titulo, isbn) < (?, ?)"
+                " ORDER BY titulo DESC, isbn DESC LIMIT ?",
+                (antes[0], antes[1], tamano + 1),
+            )
+            filas = cursor.fetchall()
+            hay_anteriores = len(filas) > tamano
+            filas = filas[:tamano][::-1]
+            hay_siguientes = True
+        elif despues is not None:
+            cursor.execute(
+                columnas + " WHERE (titulo, isbn) > (?, ?)"
+                " ORDER BY titulo, isbn LIMIT ?",
+                (despues[0], despues[1], tamano + 1),
+            )
+            filas = cursor.fetchall()
+            hay_siguientes = len(filas) > tamano
+            filas = filas[:tamano]
+            hay_anteriores = True
+        else:
+            cursor.execute(
+                columnas + " ORDER BY titulo, isbn LIMIT ?", (tamano + 1,)
+            )
+            filas = cursor.fetchall()
+            hay_siguientes = len(filas) > tamano
+            filas = filas[:tamano]
+            hay_anteriores = False
+
+    if not filas:
+        return [], None, None
+    siguiente = (filas[-1][1], filas[-1][0]) if hay_siguientes else None
+    anterior = (filas[0][1], filas[0][0]) if hay_anteriores else None
+    return filas, siguiente, anterior
+
+#********************************************************************************
+#   ITERAR_LIBROS - Recorre todo el catálogo página a página (para exportar)
+#********************************************************************************
+
+def iterar_libros(tamano_lote=1000):
+
+    """Generador perezoso: nunca mantiene en memoria más de un lote."""
+    despues = None
+    while True:
+        filas, despues, _ = obtener_pagina(tamano_lote, despues=despues)
+        yield from filas
+        if despues is None:
+            break
+
+#********************************************************************************
+#   FILTRAR_LIBROS - Filtra por autor, rango de años y editorial, paginado
+#
+#   Cada forma de filtro tiene su índice (migración 11); tests/test_planes_filtros.py
+#   revisa el plan de cada una:
+#     - autor / editorial: (autor|editorial, titulo, isbn) entrega las filas
+#       ya en orden de título;
+#     - solo años, con pocos libros en el rango: se recorre el rango en
+#       idx_libros_anio_editorial y se ordena únicamente lo que cae en él;
+#     - solo años, con muchos: el recorrido por título encuentra la página
+#       enseguida (más barato que ordenar todo el rango);
+#     - sin filtros: el recorrido de idx_libros_titulo_isbn se detiene en la
+#       página pedida; con `despues` (cursor) salta directo a ella.
+#********************************************************************************
+
+FILTRO_ANIO_MAX_ORDENAR = 2000      # Libros del rango que vale la pena ordenar aparte
+
+def _condiciones_filtro(autor=None, anio_desde=None, anio_hasta=None, editorial=None):
+
+    """Arma el WHERE; autor y editorial se comparan sin distinguir mayúsculas."""
+    condiciones, params = [], []
+    if autor:
+        condiciones.append("autor = ? COLLATE NOCASE")
+        params.append(autor.strip())
+    if editorial:
+        condiciones.append("editorial = ? COLLATE NOCASE")
+        params.append(editorial.strip())
+    if anio_desde is not None:
+        condiciones.append("anio >= ?")
+        params.append(int(anio_desde))
+    if anio_hasta is not None:
+        condiciones.append("anio <= ?")
+        params.append(int(anio_hasta))
+    return condiciones, params
+
+def _solo_anios(autor, anio_desde, anio_hasta, editorial):
+    return not autor and not editorial and (anio_desde is not None or anio_hasta is not None)
+
+def _rango_acotado(cursor, anio_desde, anio_hasta):
+    # Cuenta (hasta el tope) los libros del rango leyendo solo el índice por año
+    condiciones, params = _condiciones_filtro(anio_desde=anio_desde, anio_hasta=anio_hasta)
     cursor.execute(
-        "SELECT isbn, titulo, autor, anio, editorial FROM libros ORDER BY titulo ASC"
+        "SELECT COUNT(*) FROM (SELECT 1 FROM libros INDEXED BY idx_libros_anio_editorial"
+        + _where(condiciones) + " LIMIT ?)",
+        params + [FILTRO_ANIO_MAX_ORDENAR],
+    )
+    return cursor.fetchone()[0] < FILTRO_ANIO_MAX_ORDENAR
+
+def _where(condiciones):
+    return (" WHERE " + " AND ".join(condiciones)) if condiciones else ""
+
+def _sql_filtrar(autor=None, anio_desde=None, anio_hasta=None, editorial=None,
+                 page=1, tamano=50, despues=None, por_anio=False):
+    condiciones, params = _condiciones_filtro(autor, anio_desde, anio_hasta, editorial)
+    if despues is not None:
+        condiciones.append("(titulo, isbn) > (?, ?)")
+        params.extend(despues)
+        offset = 0
+    else:
+        offset = (max(int(page), 1) - 1) * tamano
+    # Sin estadísticas, SQLite elige por su cuenta entre el índice por título y
+    # el de años; aquí se le indica cuál según el conteo de _rango_acotado
+    indice = " INDEXED BY " + ("idx_libros_anio_editorial" if por_anio else "idx_libros_titulo_isbn")
+    sql = (
+        "SELECT isbn, titulo, autor, anio, editorial FROM libros"
+        + (indice if _solo_anios(autor, anio_desde, anio_hasta, editorial) else "")
+        + _where(condiciones)
+        + " ORDER BY titulo, isbn LIMIT ? OFFSET ?"
+    )
+    return sql, params + [tamano, offset]
+
+def filtrar_libros(autor=None, anio_desde=None, anio_hasta=None, editorial=None,
+                   page=1, tamano=50, despues=None):
+
+    """
+    Devuelve la página `page` (desde 1) de los libros que cumplen los filtros.
+    Con `despues` = (titulo, isbn) de la última fila de la página anterior se
+    obtiene la siguiente sin recorrer las previas (se ignora `page`).
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        por_anio = _solo_anios(autor, anio_desde, anio_hasta, editorial) and _rango_acotado(
+            cursor, anio_desde, anio_hasta
+        )
+        sql, params = _sql_filtrar(
+            autor, anio_desde, anio_hasta, editorial, page, tamano, despues, por_anio
+        )
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+#********************************************************************************
+#   FACETAS_LIBROS - Conteos por año y por editorial en una sola consulta
+#********************************************************************************
+
+def _sql_facetas(autor=None, anio_desde=None, anio_hasta=None, editorial=None):
+    condiciones, params = _condiciones_filtro(autor, anio_desde, anio_hasta, editorial)
+    where = _where(condiciones)
+    # Con solo años, las editoriales salen del índice (anio, editorial)
+    # sin tocar la tabla, en lugar de recorrer todas por editorial
+    indice = ""
+    if _solo_anios(autor, anio_desde, anio_hasta, editorial):
+        indice = " INDEXED BY idx_libros_anio_editorial"
+    sql = (
+        "SELECT 'anio', anio, COUNT(*) FROM libros" + where + " GROUP BY anio"
+        " UNION ALL "
+        "SELECT 'editorial', editorial, COUNT(*) FROM libros" + indice + where
+        + " GROUP BY editorial COLLATE NOCASE"
+    )
+    return sql, params + params
+
+def facetas_libros(autor=None, anio_desde=None, anio_hasta=None, editorial=None):
+
+    """
+    Devuelve {"anio": [(anio, total)], "editorial": [(editorial, total)]}
+    para los libros que cumplen los mismos filtros que filtrar_libros.
+    """
+    sql, params = _sql_facetas(autor, anio_desde, anio_hasta, editorial)
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        facetas = {"anio": [], "editorial": []}
+        for faceta, valor, total in cursor.fetchall():
+            facetas[faceta].append((valor, total))
+    return facetas
+
+#********************************************************************************
+#   INSERTAR_LIBROS_BATCH - Registra libros en bloque, un lote por operación de
+#                           la cola de escritura
+#********************************************************************************
+
+CAMPOS_LIBRO = ("isbn", "titulo", "autor", "anio", "editorial")
+
+SQL_INSERTAR = (
+    "INSERT INTO libros (isbn, titulo, autor, anio, editorial) VALUES (?, ?, ?, ?, ?)"
+)
+SQL_UPSERT = (
+    "INSERT INTO libros (isbn, titulo, autor, anio, editorial) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT(isbn) DO UPDATE SET "
+    "titulo = excluded.titulo, autor = excluded.autor, "
+    "anio = excluded.anio, editorial = excluded.editorial"
+)
+
+def _normalizar_fila(fila, normalizar=normalizar_isbn):
+
+    """Convierte un dict o una tupla en (isbn, titulo, autor, anio, editorial)."""
+    if isinstance(fila, dict):
+        fila = tuple(fila.get(campo) for campo in CAMPOS_LIBRO)
+    if len(fila) != len(CAMPOS_LIBRO):
+        raise ValueError(f"Se esperaban {len(CAMPOS_LIBRO)} campos y la fila trae {len(fila)}.")
+    isbn, titulo, autor, anio, editorial = fila
+    if not str(isbn or "").strip():
+        raise ValueError("El ISBN es obligatorio.")
+    isbn = normalizar(isbn)
+    titulo = str(titulo or "").strip()
+    if not isbn:
+        raise ValueError("ISBN inválido.")
+    if not titulo:
+        raise ValueError("El título es obligatorio.")
+    try:
+        anio = int(anio or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"Año inválido: {anio!r}")
+    return (
+        isbn,
+        titulo,
+        str(autor or "").strip(),
+        anio,
+        str(editorial or "").strip(),
     )
-    data = cursor.fetchall()
-    conn.close()
-    return data
+
+def _isbn_de(fila):
+    # Para reportar una fila rechazada aunque venga vacía o mal formada
+    if isinstance(fila, dict):
+        return fila.get("isbn")
+    try:
+        return fila[0]
+    except (IndexError, KeyError, TypeError):
+        return None
+
+def insertar_libros_batch(filas, tamano_lote=1000, upsert=False):
+
+    """
+    Inserta libros desde cualquier iterable (lista, generador, lector CSV/JSONL)
+    sin cargarlo completo en memoria: consume `tamano_lote` filas y las envía
+    a la cola de escritura como una sola operación (executemany), así cada
+    lote se confirma en la transacción del hilo escritor.
+
+    Con upsert=True los ISBN existentes se actualizan en lugar de rechazarse.
+    Las filas inválidas o con ISBN duplicado se reportan en "conflictos"
+    como (numero_fila, isbn, motivo) sin abortar el resto del lote.
+    """
+    sql = SQL_UPSERT if upsert else SQL_INSERTAR
+    resultado = {"escritos": 0, "conflictos": [], "lotes": 0, "segundos": 0.0}
+    inicio = time.perf_counter()
+
+    filas = iter(filas)
+    numero = 0
+    while True:
+        crudas = list(islice(filas, tamano_lote))
+        if not crudas:
+            break
+
+        lote = []   # (numero_fila, fila_normalizada)
+        for cruda in crudas:
+            numero += 1
+            try:
+                lote.append((numero, _normalizar_fila(cruda)))
+            except (ValueError, TypeError) as e:
+                resultado["conflictos"].append((numero, _isbn_de(cruda), str(e)))
+
+        # Sin timeout: un lote que se devuelve como fallido no puede quedar
+        # aplicándose después
+        escrito = escribir(_op_insertar_lote, sql, lote, timeout=None) if lote else (0, [])
+        if isinstance(escrito[0], bool):
+            # (False, msg): el lote entero no se confirmó
+            resultado["conflictos"].extend((n, fila[0], escrito[1]) for n, fila in lote)
+        else:
+            resultado["escritos"] += escrito[0]
+            resultado["conflictos"].extend(escrito[1])
+        resultado["lotes"] += 1
+
+    resultado["conflictos"].sort(key=lambda conflicto: conflicto[0])
+    resultado["segundos"] = time.perf_counter() - inicio
+    return resultado
+
+def _op_insertar_lote(cursor, sql, lote):
+    cursor.execute("SAVEPOINT lote")
+    try:
+        cursor.executemany(sql, (fila for _, fila in lote))
+        cursor.execute("RELEASE lote")
+        return (len(lote), []), [fila[0] for _, fila in lote]
+    except sqlite3.IntegrityError:
+        # Algún ISBN del lote ya existe: repetimos fila por fila para
+        # aislar los conflictos
+        cursor.execute("ROLLBACK TO lote")
+        cursor.execute("RELEASE lote")
+
+    escritos, conflictos, isbns = 0, [], []
+    for n, fila in lote:
+        try:
+            cursor.execute(sql, fila)
+            escritos += 1
+            isbns.append(fila[0])
+        except sqlite3.IntegrityError:
+            conflictos.append((n, fila[0], "Ya existe un libro con ese ISBN."))
+    return (escritos, conflictos), isbns
+
+#********************************************************************************
+#   ACTUALIZAR_LIBROS_BATCH / ELIMINAR_LIBROS_BATCH - Cambios masivos por lista
+#   de ISBN, cada lote en una sola operación de la cola de escritura
+#********************************************************************************
+
+CAMPOS_EDITABLES = ("titulo", "autor", "anio", "editorial")
+
+def _cargar_lote_isbn(cursor, isbns):
+
+    """
+    Carga los ISBN en una tabla temporal de la conexión y devuelve el conjunto
+    de los que existen en `libros` (un solo JOIN en lugar de N consultas).
+    """
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS _lote_isbn (isbn TEXT PRIMARY KEY)")
+    cursor.execute("DELETE FROM _lote_isbn")
+    cursor.executemany(
+        "INSERT OR IGNORE INTO _lote_isbn (isbn) VALUES (?)", ((i,) for i in isbns)
+    )
+    cursor.execute("SELECT t.isbn FROM _lote_isbn t JOIN libros l ON l.isbn = t.isbn")
+    return {fila[0] for fila in cursor.fetchall()}
+
+def _validar_cambios(cambios):
+    cambios = dict(cambios)
+    desconocidos = set(cambios) - set(CAMPOS_EDITABLES)
+    if desconocidos:
+        raise ValueError(f"Campos no editables: {', '.join(sorted(desconocidos))}")
+    if not cambios:
+        raise ValueError("No se indicaron cambios.")
+    if "titulo" in cambios:
+        cambios["titulo"] = str(cambios["titulo"] or "").strip()
+        if not cambios["titulo"]:
+            raise ValueError("El título es obligatorio.")
+    for campo in ("autor", "editorial"):
+        if campo in cambios:
+            cambios[campo] = str(cambios[campo] or "").strip()
+    if "anio" in cambios:
+        cambios["anio"] = int(cambios["anio"] or 0)
+    return cambios
+
+def actualizar_libros_batch(datos, cambios=None):
+
+    """
+    Dos modos:
+      - actualizar_libros_batch(filas): cada fila trae sus propios valores
+        (isbn, titulo, autor, anio, editorial), como tupla o dict.
+      - actualizar_libros_batch(isbns, cambios={"editorial": "Anagrama"}):
+        aplica el mismo parche a todos los ISBN de la lista.
+
+    Todo el lote es una sola operación de la cola de escritura. Devuelve
+    {isbn: (ok, mensaje)} con el resultado de cada ISBN.
+    """
+    resultados = {}
+    if cambios is not None:
+        cambios = _validar_cambios(cambios)
+        isbns = [clave_isbn(i) for i in datos]
+        filas = []
+    else:
+        filas = []
+        for fila in datos:
+            try:
+                filas.append(_normalizar_fila(fila, normalizar=clave_isbn))
+            except (ValueError, TypeError) as e:
+                resultados[str(_isbn_de(fila))] = (False, str(e))
+        isbns = [fila[0] for fila in filas]
+
+    resultados.update(_por_isbn(isbns, escribir(_op_actualizar_lote, isbns, filas, cambios, timeout=None)))
+    return resultados
+
+def _op_actualizar_lote(cursor, isbns, filas, cambios):
+    existentes = _cargar_lote_isbn(cursor, isbns)
+    if cambios is not None:
+        asignaciones = ", ".join(f"{campo} = ?" for campo in cambios)
+        cursor.execute(
+            f"UPDATE libros SET {asignaciones} "
+            "WHERE isbn IN (SELECT isbn FROM _lote_isbn)",
+            list(cambios.values()),
+        )
+    else:
+        cursor.executemany(
+            "UPDATE libros SET titulo = ?, autor = ?, anio = ?, editorial = ? WHERE isbn = ?",
+            (fila[1:] + fila[:1] for fila in filas if fila[0] in existentes),
+        )
+    cursor.execute("DELETE FROM _lote_isbn")
+
+    resultados = {}
+    for isbn in isbns:
+        if isbn in existentes:
+            resultados[isbn] = (True, "Libro actualizado correctamente.")
+        else:
+            resultados[isbn] = (False, "No se encontró un libro con ese ISBN.")
+    return resultados, existentes
+
+def eliminar_libros_batch(isbns):
+
+    """
+    Elimina todos los ISBN de la lista en una sola operación de la cola de
+    escritura. Devuelve {isbn: (ok, mensaje)}.
+    """
+    isbns = [clave_isbn(i) for i in isbns]
+    return _por_isbn(isbns, escribir(_op_eliminar_lote, isbns, timeout=None))
+
+def _op_eliminar_lote(cursor, isbns):
+    existentes = _cargar_lote_isbn(cursor, isbns)
+    # Los libros con ejemplares se conservan (la clave foránea lo exige)
+    cursor.execute(
+        "SELECT DISTINCT e.isbn FROM _lote_isbn t JOIN ejemplares e ON e.isbn = t.isbn"
+    )
+    con_ejemplares = {fila[0] for fila in cursor.fetchall()}
+    cursor.execute(
+        """
+        DELETE FROM libros WHERE isbn IN (SELECT isbn FROM _lote_isbn)
+        AND isbn NOT IN (SELECT isbn FROM ejemplares)
+        """
+    )
+    cursor.execute("DELETE FROM _lote_isbn")
+
+    eliminados = existentes - con_ejemplares
+    resultados = {}
+    for isbn in isbns:
+        if isbn in eliminados:
+            resultados[isbn] = (True, "Libro eliminado correctamente.")
+        elif isbn in con_ejemplares:
+            resultados[isbn] = (False, "El libro tiene ejemplares registrados; no se puede eliminar.")
+        else:
+            resultados[isbn] = (False, "No se encontró un libro con ese ISBN.")
+    return resultados, eliminados
+
+def _por_isbn(isbns, resultado):
+    # Un (False, msg) de la cola (lote no confirmado) vale para todos los ISBN
+    if isinstance(resultado, dict):
+        return resultado
+    return {isbn: resultado for isbn in isbns}
+
+#********************************************************************************
+#   LEER_CSV / LEER_JSONL - Lectores en streaming para alimentar la carga masiva
+#********************************************************************************
+
+def _abrir_texto(origen, encoding):
+    # Acepta una ruta o un archivo ya abierto (p. ej. el de st.file_uploader)
+    if isinstance(origen, (str, Path)):
+        return open(origen, "r", encoding=encoding, newline=""), True
+    if hasattr(origen, "mode") and "b" in getattr(origen, "mode", ""):
+        return io.TextIOWrapper(origen, encoding=encoding, newline=""), False
+    return origen, False
+
+def leer_csv(origen, delimitador=","):
+
+    """Genera un dict por fila; la primera línea debe traer los nombres de campo."""
+    archivo, propio = _abrir_texto(origen, "utf-8-sig")
+    try:
+        for fila in csv.DictReader(archivo, delimiter=delimitador):
+            yield {(k or "").strip().lower(): v for k, v in fila.items()}
+    finally:
+        if propio:
+            archivo.close()
+
+def leer_jsonl(origen):
+
+    """Genera un dict por cada línea JSON no vacía."""
+    archivo, propio = _abrir_texto(origen, "utf-8")
+    try:
+        for linea in archivo:
+            linea = linea.strip()
+            if linea:
+                yield json.loads(linea)
+    finally:
+        if propio:
+            archivo.close()
+
+#********************************************************************************
+#   CAMBIOS_DESDE - Lee el registro de cambios (insert/update/delete) que los
+#                   triggers de `libros` mantienen en cambios_libros
+#********************************************************************************
+
+def cambios_desde(seq=0, limit=1000):
+
+    """
+    Devuelve hasta `limit` cambios con número de secuencia mayor que `seq`,
+    en orden: [(seq, operacion, isbn, momento)], operacion en 'I', 'U', 'D'.
+    Para seguir el catálogo se guarda el último seq recibido y se vuelve a
+    llamar con él.
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT seq, operacion, isbn, momento FROM cambios_libros "
+            "WHERE seq > ? ORDER BY seq LIMIT ?",
+            (seq, limit),
+        )
+        return cursor.fetchall()
+
+def ultimo_seq():
+
+    """Último número de secuencia asignado (no se reutiliza aunque se compacte)."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'cambios_libros'")
+        fila = cursor.fetchone()
+        return fila[0] if fila else 0
+
+#********************************************************************************
+#   COMPACTAR_CAMBIOS - Borra del registro los cambios más viejos que la
+#                       ventana de retención, por lotes
+#********************************************************************************
+
+def compactar_cambios(retencion_dias=CDC_RETENCION_DIAS, lote=5000):
+
+    """
+    Devuelve cuántos registros se borraron. Cada lote es una transacción corta
+    para no bloquear a los escritores durante mucho tiempo.
+    """
+    borrados = 0
+    while True:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                DELETE FROM cambios_libros WHERE seq IN (
+                    SELECT seq FROM cambios_libros
+                    WHERE momento < strftime('%Y-%m-%dT%H:%M:%fZ', 'now', ?)
+                    ORDER BY seq LIMIT ?
+                )
+                """,
+                (f"-{float(retencion_dias)} days", lote),
+            )
+            conn.commit()
+            n = cursor.rowcount
+        borrados += n
+        if n < lote:
+            return borrados
+
+#********************************************************************************
+#   MIGRAR_ISBN_CANONICO - Convierte los ISBN guardados a su forma ISBN-13
+#                          canónica y reporta colisiones. El esquema ya lo aplica
+#                          una vez (migración 5); esto permite repetirlo a mano
+#********************************************************************************
+
+def migrar_isbn_canonico():
+
+    """
+    Reescribe cada `libros.isbn` como ISBN-13 canónico. La clave primaria sobre
+    `isbn` es el índice único que garantiza una sola fila por libro.
+
+    Devuelve un reporte con:
+      - "convertidos": [(isbn_original, isbn13)]
+      - "colisiones":  [(isbn_original, isbn13)] filas cuyo ISBN-13 ya existe
+                       (el mismo libro registrado dos veces); no se tocan
+      - "invalidos":   [isbn_original] valores que no son un ISBN válido
+    """
+    with get_connection() as conn:
+        reporte = canonicalizar_isbns(conn.cursor())
+        conn.commit()
+
+    _despues_del_commit(None)
+    return reporte
+
+#********************************************************************************
+#   EXPORTAR_LIBROS - Exporta el catálogo a CSV o JSONL (opcionalmente gzip)
+#                     en bloques, sin cargar la tabla completa en memoria
+#********************************************************************************
+
+FORMATOS_EXPORTACION = ("csv", "jsonl")
+
+def exportar_libros(formato="csv", comprimir=False, tamano_lote=1000):
+
+    """
+    Generador de bloques `bytes` listos para escribir a un archivo, a stdout o
+    para servirse como descarga. Recorre un único cursor con fetchmany, así que
+    la memoria usada no depende del tamaño del catálogo, y todo el recorrido ve
+    una misma versión consistente de la tabla.
+
+    La conexión del pool se devuelve cuando el generador termina o se cierra.
+    """
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato no soportado: {formato!r}")
+
+    # wbits=31 -> flujo con cabecera gzip, compatible con `gunzip`
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31) if comprimir else None
+
+    def _codificar(texto):
+        datos = texto.encode("utf-8")
+        return compresor.compress(datos) if compresor else datos
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT isbn, titulo, autor, anio, editorial FROM libros ORDER BY titulo, isbn"
+        )
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer, lineterminator="\n")
+        if formato == "csv":
+            escritor.writerow(CAMPOS_LIBRO)
+
+        while True:
+            filas = cursor.fetchmany(tamano_lote)
+            if not filas:
+                break
+            if formato == "csv":
+                escritor.writerows(filas)
+            else:
+                for fila in filas:
+                    buffer.write(json.dumps(dict(zip(CAMPOS_LIBRO, fila)), ensure_ascii=False))
+                    buffer.write("\n")
+            bloque = _codificar(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+            if bloque:
+                yield bloque
+
+        resto = buffer.getvalue()
+        if resto:
+            yield _codificar(resto)
+    if compresor:
+        yield compresor.flush()
+
+def exportar_a_archivo(destino, formato=None, comprimir=None, tamano_lote=1000):
+
+    """
+    Escribe la exportación en `destino` (ruta o archivo binario abierto).
+    Si no se indican, el formato y la compresión se deducen de la extensión
+    (catalogo.csv, catalogo.jsonl.gz, ...). Devuelve los bytes escritos.
+    """
+    nombre = str(destino).lower() if isinstance(destino, (str, Path)) else ""
+    if comprimir is None:
+        comprimir = nombre.endswith(".gz")
+    if formato is None:
+        formato = "jsonl" if nombre.removesuffix(".gz").endswith((".jsonl", ".ndjson")) else "csv"
+
+    escritos = 0
+    archivo = open(destino, "wb") if nombre else destino
+    try:
+        for bloque in exportar_libros(formato, comprimir, tamano_lote):
+            archivo.write(bloque)
+            escritos += len(bloque)
+    finally:
+        if nombre:
+            archivo.close()
+    return escritos
+
+#********************************************************************************
+#   LINEA DE COMANDOS - python src/crud_libros.py importar catalogo.csv
+#********************************************************************************
+
+def _main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Utilidades del catálogo de libros")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    imp = sub.add_parser("importar", help="Importa libros desde CSV o JSONL")
+    imp.add_argument("archivo")
+    imp.add_argument("--upsert", action="store_true", help="Actualiza los ISBN existentes")
+    imp.add_argument("--lote", type=int, default=1000)
+
+    sub.add_parser("migrar-isbn", help="Convierte los ISBN guardados a ISBN-13")
+
+    comp = sub.add_parser("compactar-cambios", help="Poda el registro de cambios")
+    comp.add_argument("--dias", type=float, default=CDC_RETENCION_DIAS)
+
+    exp = sub.add_parser("exportar", help="Exporta el catálogo a CSV o JSONL")
+    exp.add_argument("archivo", help="Ruta de salida, o '-' para stdout")
+    exp.add_argument("--formato", choices=FORMATOS_EXPORTACION)
+    exp.add_argument("--gzip", action="store_true", default=None)
+
+    dup = sub.add_parser("duplicados", help="Reporte CSV de libros probablemente repetidos")
+    dup.add_argument("archivo")
+    dup.add_argument("--umbral", type=float, default=None)
+
+    args = parser.parse_args(argv)
+
+    if args.comando == "importar":
+        init_db()
+        if args.archivo.lower().endswith((".jsonl", ".ndjson")):
+            filas = leer_jsonl(args.archivo)
+        else:
+            filas = leer_csv(args.archivo)
+        r = insertar_libros_batch(filas, tamano_lote=args.lote, upsert=args.upsert)
+        for n, isbn, motivo in r["conflictos"]:
+            print(f"Fila {n} ({isbn}): {motivo}")
+        print(
+            f"{r['escritos']} libros escritos, {len(r['conflictos'])} conflictos, "
+            f"{r['lotes']} lotes en {r['segundos']:.2f} s."
+        )
+
+    elif args.comando == "migrar-isbn":
+        init_db()
+        r = migrar_isbn_canonico()
+        for original, canonico in r["colisiones"]:
+            print(f"Colisión: {original} -> {canonico} (ya existe, no se modificó)")
+        for original in r["invalidos"]:
+            print(f"ISBN inválido: {original!r}")
+        print(
+            f"{len(r['convertidos'])} convertidos, {len(r['colisiones'])} colisiones, "
+            f"{len(r['invalidos'])} inválidos."
+        )
+
+    elif args.comando == "compactar-cambios":
+        init_db()
+        n = compactar_cambios(args.dias)
+        print(f"{n} cambios anteriores a {args.dias} días eliminados.")
+
+    elif args.comando == "exportar":
+        init_db()
+        if args.archivo == "-":
+            exportar_a_archivo(
+                sys.stdout.buffer, args.formato or "csv", bool(args.gzip)
+            )
+        else:
+            n = exportar_a_archivo(args.archivo, args.formato, args.gzip)
+            print(f"{n} bytes escritos en {args.archivo}.", file=sys.stderr)
+
+    elif args.comando == "duplicados":
+        from duplicados import reporte_duplicados
+
+        init_db()
+        kwargs = {"umbral": args.umbral} if args.umbral is not None else {}
+        r = reporte_duplicados(args.archivo, **kwargs)
+        print(
+            f"{len(r['grupos'])} grupos ({len(r['pares'])} pares) entre {r['libros']} libros; "
+            f"{r['comparaciones']} comparaciones, {r['cubetas_omitidas']} cubetas omitidas, "
+            f"{r['segundos']:.2f} s. Reporte en {args.archivo}."
+        )
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,266 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+from datetime import datetime, timedelta
+
+from pathlib import Path
+import sys
+
+# Ruta absoluta a la raíz del proyecto (donde está config.py)
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Aseguramos que la raíz esté en sys.path
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from config import PRESTAMO_DIAS, PRESTAMOS_POR_USUARIO
+from isbn import clave_isbn
+import crud_libros
+from crud_libros import get_connection
+
+#********************************************************************************
+#   PRESTAMOS - Ejemplares físicos de cada libro y su circulación.
+#
+#   Las escrituras pasan por crud_libros.escribir (la cola de escritura): cada
+#   préstamo o devolución es una operación corta dentro de su SAVEPOINT, en una
+#   transacción BEGIN IMMEDIATE compartida con las demás escrituras del momento.
+#   Las operaciones verifican todo antes de escribir, así un (False, msg) nunca
+#   deja cambios a medias.
+#
+#   Fechas en UTC, ISO sin microsegundos: se comparan como texto en los índices.
+#********************************************************************************
+
+def _ahora():
+    return datetime.utcnow().replace(microsecond=0)
+
+def _id_usuario(cursor, usuario):
+    # Acepta el id o el nombre de usuario
+    if isinstance(usuario, int):
+        cursor.execute("SELECT id FROM usuarios WHERE id = ?", (usuario,))
+    else:
+        cursor.execute(
+            "SELECT id FROM usuarios WHERE username = ?", ((usuario or "").strip().lower(),)
+        )
+    fila = cursor.fetchone()
+    return fila[0] if fila else None
+
+#********************************************************************************
+#   AGREGAR_EJEMPLARES / DAR_DE_BAJA - Alta y retiro de copias físicas
+#********************************************************************************
+
+def agregar_ejemplares(isbn, cantidad=1):
+    if cantidad < 1:
+        return False, "La cantidad debe ser al menos 1."
+    return crud_libros.escribir(_op_agregar_ejemplares, clave_isbn(isbn), int(cantidad))
+
+def _op_agregar_ejemplares(cursor, isbn, cantidad):
+    cursor.execute("SELECT 1 FROM libros WHERE isbn = ?", (isbn,))
+    if cursor.fetchone() is None:
+        return (False, "No se encontró un libro con ese ISBN."), ()
+    alta = _ahora().isoformat()
+    cursor.executemany(
+        "INSERT INTO ejemplares (isbn, estado, alta) VALUES (?, 'disponible', ?)",
+        [(isbn, alta)] * cantidad,
+    )
+    return (True, f"{cantidad} ejemplar(es) agregado(s)."), ()
+
+def dar_de_baja(ejemplar_id):
+    return crud_libros.escribir(_op_dar_de_baja, int(ejemplar_id))
+
+def _op_dar_de_baja(cursor, ejemplar_id):
+    # Se conserva la fila: el historial de préstamos la referencia
+    cursor.execute(
+        "UPDATE ejemplares SET estado = 'baja' WHERE id = ? AND estado = 'disponible'",
+        (ejemplar_id,),
+    )
+    if cursor.rowcount == 0:
+        return (False, "El ejemplar no existe, está prestado o ya fue dado de baja."), ()
+    return (True, "Ejemplar dado de baja."), ()
+
+#********************************************************************************
+#   DISPONIBILIDAD - Ejemplares por estado de un ISBN (solo lee el índice
+#                    idx_ejemplares_isbn_estado)
+#********************************************************************************
+
+def disponibilidad(isbn):
+    with get_connection() as conn:
+        filas = conn.execute(
+            "SELECT estado, COUNT(*) FROM ejemplares WHERE isbn = ? GROUP BY estado",
+            (clave_isbn(isbn),),
+        ).fetchall()
+    conteos = {"disponible": 0, "prestado": 0, "baja": 0}
+    conteos.update(filas)
+    return {
+        "disponibles": conteos["disponible"],
+        "prestados": conteos["prestado"],
+        "baja": conteos["baja"],
+        "total": sum(conteos.values()),
+    }
+
+def ejemplares_de(isbn):
+    """[(id, estado, alta)] de todos los ejemplares del ISBN."""
+    with get_connection() as conn:
+        return conn.execute(
+            "SELECT id, estado, alta FROM ejemplares WHERE isbn = ? ORDER BY id",
+            (clave_isbn(isbn),),
+        ).fetchall()
+
+#********************************************************************************
+#   PRESTAR - Presta un ejemplar libre del ISBN (o uno en particular) a un usuario
+#********************************************************************************
+
+def prestar(usuario, isbn=None, ejemplar_id=None, dias=PRESTAMO_DIAS):
+
+    """
+    Con `isbn` se toma cualquier ejemplar disponible; con `ejemplar_id` (la
+    copia que trae el lector al mostrador) se presta esa, y si además viene
+    `isbn` tiene que ser un ejemplar de ese libro. Falla si el usuario no
+    existe, ya tiene PRESTAMOS_POR_USUARIO activos o no hay ejemplar libre.
+    """
+    if ejemplar_id is None and not isbn:
+        return False, "Indica el ISBN o el número de ejemplar."
+    isbn = clave_isbn(isbn) if isbn else None
+    ejemplar_id = int(ejemplar_id) if ejemplar_id is not None else None
+    return crud_libros.escribir(_op_prestar, usuario, isbn, ejemplar_id, dias)
+
+def _op_prestar(cursor, usuario, isbn, ejemplar_id, dias):
+    usuario_id = _id_usuario(cursor, usuario)
+    if usuario_id is None:
+        return (False, "No existe ese usuario."), ()
+
+    cursor.execute(
+        "SELECT COUNT(*) FROM prestamos WHERE usuario_id = ? AND devuelto_en IS NULL",
+        (usuario_id,),
+    )
+    if cursor.fetchone()[0] >= PRESTAMOS_POR_USUARIO:
+        return (False, f"El usuario ya tiene {PRESTAMOS_POR_USUARIO} préstamos activos."), ()
+
+    if ejemplar_id is None:
+        cursor.execute(
+            "SELECT id FROM ejemplares WHERE isbn = ? AND estado = 'disponible' LIMIT 1",
+            (isbn,),
+        )
+        fila = cursor.fetchone()
+        if fila is None:
+            return (False, "No hay ejemplares disponibles de ese libro."), ()
+        ejemplar_id = fila[0]
+    elif isbn is not None:
+        cursor.execute("SELECT isbn FROM ejemplares WHERE id = ?", (ejemplar_id,))
+        fila = cursor.fetchone()
+        if fila is None:
+            return (False, "No existe ese ejemplar."), ()
+        if fila[0] != isbn:
+            return (False, f"El ejemplar {ejemplar_id} no es de ese libro."), ()
+
+    # La condición sobre el estado hace segura la reserva aunque la transacción
+    # no se haya abierto con BEGIN IMMEDIATE (escritura directa)
+    cursor.execute(
+        "UPDATE ejemplares SET estado = 'prestado' WHERE id = ? AND estado = 'disponible'",
+        (ejemplar_id,),
+    )
+    if cursor.rowcount == 0:
+        return (False, "Ese ejemplar no está disponible."), ()
+
+    prestado_en = _ahora()
+    vence = prestado_en + timedelta(days=dias)
+    cursor.execute(
+        """
+        INSERT INTO prestamos (ejemplar_id, usuario_id, prestado_en, vence)
+        VALUES (?, ?, ?, ?)
+        """,
+        (ejemplar_id, usuario_id, prestado_en.isoformat(), vence.isoformat()),
+    )
+    return (True, f"Ejemplar {ejemplar_id} prestado hasta el {vence.date().isoformat()}."), ()
+
+#********************************************************************************
+#   DEVOLVER - Cierra el préstamo activo del ejemplar y lo deja disponible
+#********************************************************************************
+
+def devolver(ejemplar_id):
+    return crud_libros.escribir(_op_devolver, int(ejemplar_id))
+
+def _op_devolver(cursor, ejemplar_id):
+    cursor.execute(
+        "SELECT id, vence FROM prestamos WHERE ejemplar_id = ? AND devuelto_en IS NULL",
+        (ejemplar_id,),
+    )
+    fila = cursor.fetchone()
+    if fila is None:
+        return (False, "Ese ejemplar no tiene un préstamo activo."), ()
+
+    ahora = _ahora()
+    cursor.execute("UPDATE prestamos SET devuelto_en = ? WHERE id = ?", (ahora.isoformat(), fila[0]))
+    cursor.execute("UPDATE ejemplares SET estado = 'disponible' WHERE id = ?", (ejemplar_id,))
+
+    retraso = (ahora - datetime.fromisoformat(fila[1])).days
+    if retraso > 0:
+        return (True, f"Ejemplar {ejemplar_id} devuelto con {retraso} día(s) de retraso."), ()
+    return (True, f"Ejemplar {ejemplar_id} devuelto."), ()
+
+#********************************************************************************
+#   CONSULTAS - Préstamos activos de un usuario y revisión de vencidos
+#********************************************************************************
+
+def prestamos_de_usuario(usuario):
+    """[(ejemplar_id, isbn, titulo, prestado_en, vence)] activos, del que vence antes."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        usuario_id = _id_usuario(cursor, usuario)
+        if usuario_id is None:
+            return []
+        cursor.execute(
+            """
+            SELECT p.ejemplar_id, e.isbn, l.titulo, p.prestado_en, p.vence
+            FROM prestamos p
+            JOIN ejemplares e ON e.id = p.ejemplar_id
+            JOIN libros l ON l.isbn = e.isbn
+            WHERE p.usuario_id = ? AND p.devuelto_en IS NULL
+            ORDER BY p.vence
+            """,
+            (usuario_id,),
+        )
+        return cursor.fetchall()
+
+def _fecha(al):
+    if al is None:
+        al = _ahora()
+    return al if isinstance(al, str) else al.replace(microsecond=0).isoformat()
+
+def prestamos_vencidos(al=None, limite=None, despues=None):
+
+    """
+    Préstamos activos con `vence` anterior a `al` (por defecto, ahora), del
+    más atrasado al más reciente: [(vence, ejemplar_id, username, isbn,
+    titulo)]. El recorrido sale en orden del índice parcial
+    idx_prestamos_vencidos; usuario y libro se buscan por clave.
+
+    Para la revisión nocturna por lotes: pasar como `despues` el par
+    (vence, ejemplar_id) de la última fila del lote anterior.
+    """
+    condiciones = ["p.devuelto_en IS NULL", "p.vence < ?"]
+    params = [_fecha(al)]
+    if despues is not None:
+        condiciones.append("(p.vence, p.ejemplar_id) > (?, ?)")
+        params.extend(despues)
+    sql = f"""
+        SELECT p.vence, p.ejemplar_id, u.username, e.isbn, l.titulo
+        FROM prestamos p
+        JOIN usuarios u ON u.id = p.usuario_id
+        JOIN ejemplares e ON e.id = p.ejemplar_id
+        JOIN libros l ON l.isbn = e.isbn
+        WHERE {" AND ".join(condiciones)}
+        ORDER BY p.vence, p.ejemplar_id
+    """
+    if limite is not None:
+        sql += " LIMIT ?"
+        params.append(int(limite))
+    with get_connection() as conn:
+        return conn.execute(sql, params).fetchall()
+
+def contar_vencidos(al=None):
+    with get_connection() as conn:
+        return conn.execute(
+            "SELECT COUNT(*) FROM prestamos WHERE devuelto_en IS NULL AND vence < ?",
+            (_fecha(al),),
+        ).fetchone()[0]
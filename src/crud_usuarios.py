@@ -3,8 +3,18 @@
 #********************************************************************************
 
 import os
+import io
+import csv
+import hmac
+import math
+import hashlib
+import secrets
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturoVencido
+from datetime import datetime, timedelta
+from itertools import islice
 import bcrypt   # type: ignore
 
 from pathlib import Path
@@ -17,124 +27,604 @@ ROOT_DIR = Path(__file__).resolve().parent.parent
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from config import asset_path, DB_PATH
+from config import (
+    asset_path,
+    DB_PATH,
+    BCRYPT_ROUNDS,
+    HASH_HILOS,
+    HASH_COLA_TIMEOUT_S,
+    LOGIN_INTENTOS_USUARIO,
+    LOGIN_RECARGA_USUARIO_S,
+    LOGIN_FALLOS_USUARIO,
+    LOGIN_INTENTOS_CLIENTE,
+    LOGIN_RECARGA_CLIENTE_S,
+    LOGIN_FALLOS_CLIENTE,
+    LOGIN_BLOQUEO_BASE_S,
+    LOGIN_BLOQUEO_MAX_S,
+    LOGIN_CONFIAR_PROXY,
+    SESION_DIAS,
+    SESION_SECRETO,
+    SESION_CACHE_MAX,
+    SESION_CACHE_TTL,
+)
+from database import obtener_pool
+from esquema import asegurar_esquema
+from cache import CacheLRU
+from limitador import LimitadorIntentos
 
 
 # Cargamos automáticamente el archivo .env con las variables de entorno, para Streamlit Cloud se carga como una variable SECRETA
 # from dotenv import load_dotenv # type: ignore
 # load_dotenv()  
 
-# BIBLIO_DB_PATH Tiene la ruta a la DB y esta en el archivo .env, si no la encuentra crea/usa biblioteca_db.db)
-# DB_PATH = os.getenv("BIBLIO_DB_PATH", "data/biblioteca_db.db")
-print(DB_PATH)
+# BIBLIO_DB_PATH / BIBLIO_DB_BACKEND (ver config.py) eligen la base de datos
 
 #********************************************************************************
-#   GET_CONNECTION - Conexión con la base de datos, si no existe la crea
-#                    SQLite3 ya viene instalado por default
+#   GET_CONNECTION - Presta una conexión del pool compartido (database.py),
+#                    se usa como `with get_connection() as conn:`
 #********************************************************************************
 
 def get_connection():
-    return sqlite3.connect(DB_PATH) # Usamos SQLITE3 para base de datos
+    return obtener_pool(DB_PATH).conexion() # Usamos SQLITE3 para base de datos
 
 #********************************************************************************
-#   INIT_USERS_TABLE - Crea tabla Usuarios y un Admin por defecto
+#   HASHING - bcrypt en un pool acotado de hilos, fuera del hilo del script.
+#             bcrypt libera el GIL mientras calcula: con HASH_HILOS hilos una
+#             ráfaga de logins usa a lo más esa cantidad de núcleos y el resto
+#             sigue atendiendo páginas.
 #********************************************************************************
 
-def init_users_table():
-
-    """Crea la tabla de usuarios si no existe"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS usuarios (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at TEXT NOT NULL
-        );
-        """
+MENSAJE_OCUPADO = "Hay muchos inicios de sesión en curso. Intenta de nuevo en unos segundos."
+
+_ejecutor_hash = None
+_ejecutor_lock = threading.Lock()
+_contadores_hash = {"hashes": 0, "segundos": 0.0, "rechazados": 0, "rehashes": 0}
+
+def _ejecutor():
+    global _ejecutor_hash
+    if _ejecutor_hash is None:
+        with _ejecutor_lock:
+            if _ejecutor_hash is None:
+                _ejecutor_hash = ThreadPoolExecutor(
+                    max_workers=HASH_HILOS, thread_name_prefix="biblio-hash"
+                )
+    return _ejecutor_hash
+
+def _medido(funcion, *args):
+    inicio = time.perf_counter()
+    try:
+        return funcion(*args)
+    finally:
+        with _ejecutor_lock:
+            _contadores_hash["hashes"] += 1
+            _contadores_hash["segundos"] += time.perf_counter() - inicio
+
+def _en_pool_hash(funcion, *args):
+
+    """
+    Ejecuta `funcion` en el pool y espera el resultado. Si en
+    HASH_COLA_TIMEOUT_S no consiguió turno, se retira de la cola y devuelve
+    None (si ya había empezado, se espera a que termine: dura un hash).
+    """
+    futuro = _ejecutor().submit(_medido, funcion, *args)
+    try:
+        return futuro.result(timeout=HASH_COLA_TIMEOUT_S)
+    except FuturoVencido:
+        if futuro.cancel():
+            with _ejecutor_lock:
+                _contadores_hash["rechazados"] += 1
+            return None
+        return futuro.result()
+
+def _hashear(password):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(BCRYPT_ROUNDS)).decode("utf-8")
+
+def _verificar(password, password_hash):
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+    except ValueError:
+        # Contraseña de más de 72 bytes o hash mal formado: no coincide
+        return False
+
+def costo_hash(password_hash):
+    # "$2b$12$..." -> 12
+    try:
+        return int(password_hash.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+def estadisticas_hash():
+    with _ejecutor_lock:
+        contadores = dict(_contadores_hash)
+    contadores["hilos"] = HASH_HILOS
+    contadores["rondas"] = BCRYPT_ROUNDS
+    contadores["ms_por_hash"] = (
+        contadores["segundos"] * 1000 / contadores["hashes"] if contadores["hashes"] else 0.0
     )
-    conn.commit()
-
-    """Crea usuario admin por defecto si no hay usuarios"""
-    cursor.execute("SELECT COUNT(*) FROM usuarios")
-    count = cursor.fetchone()[0]
-    if count == 0:
-        password = "admin123"
-        password_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
-        cursor.execute(
-            "INSERT INTO usuarios (username, password_hash, created_at) VALUES (?, ?, ?)",
-            ("admin", password_hash.decode("utf-8"), datetime.utcnow().isoformat()),
-        )
-        conn.commit()
+    return contadores
+
+_senuelo = {}           # costo -> hash de una contraseña al azar
+_senuelo_lock = threading.Lock()
+
+def _hash_senuelo():
+    # Para usuarios inexistentes se verifica contra este hash: cuesta lo mismo
+    # que un usuario real y el tiempo de respuesta no revela qué cuentas existen
+    senuelo = _senuelo.get(BCRYPT_ROUNDS)
+    if senuelo is None:
+        with _senuelo_lock:
+            senuelo = _senuelo.get(BCRYPT_ROUNDS)
+            if senuelo is None:
+                senuelo = _en_pool_hash(_hashear, os.urandom(16).hex())
+                if senuelo is not None:
+                    _senuelo[BCRYPT_ROUNDS] = senuelo
+    return senuelo
 
-    conn.close()
+#********************************************************************************
+#   LIMITE DE INTENTOS - Por usuario y por cliente, antes de cualquier hash: un
+#                        script que prueba contraseñas se frena sin gastar CPU
+#********************************************************************************
+
+_limite_usuario = LimitadorIntentos(
+    LOGIN_INTENTOS_USUARIO, LOGIN_RECARGA_USUARIO_S,
+    LOGIN_FALLOS_USUARIO, LOGIN_BLOQUEO_BASE_S, LOGIN_BLOQUEO_MAX_S,
+)
+_limite_cliente = LimitadorIntentos(
+    LOGIN_INTENTOS_CLIENTE, LOGIN_RECARGA_CLIENTE_S,
+    LOGIN_FALLOS_CLIENTE, LOGIN_BLOQUEO_BASE_S, LOGIN_BLOQUEO_MAX_S,
+)
+
+def _limitar_login(username, cliente):
+    # Se revisan ambas claves antes de gastar fichas, así un rechazo por
+    # cliente no le cuesta intentos al usuario (ni al revés)
+    claves = [(_limite_usuario, username)]
+    if cliente:
+        claves.append((_limite_cliente, cliente))
+    espera = max(limite.espera(clave) for limite, clave in claves)
+    if espera:
+        return espera
+    # Entre la revisión y el gasto otro hilo pudo agotar una de las dos: lo
+    # ya gastado en las anteriores se devuelve
+    for i, (limite, clave) in enumerate(claves):
+        espera = limite.consumir(clave)
+        if espera:
+            for anterior, clave_anterior in claves[:i]:
+                anterior.devolver(clave_anterior)
+            return espera
+    return 0.0
+
+def clave_cliente(ip, reenviado_por=None):
+
+    """
+    Clave del límite por cliente. X-Forwarded-For lo escribe el cliente:
+    solo se usa con LOGIN_CONFIAR_PROXY, y entonces vale el último salto (el
+    que agregó nuestro proxy), nunca los anteriores.
+    """
+    if LOGIN_CONFIAR_PROXY and reenviado_por:
+        ultimo = reenviado_por.split(",")[-1].strip()
+        if ultimo:
+            return ultimo
+    return ip or None
+
+def estadisticas_login():
+    """Contadores de los limitadores y las claves bloqueadas en este momento."""
+    return {
+        "usuarios": _limite_usuario.estadisticas(),
+        "clientes": _limite_cliente.estadisticas(),
+        "bloqueados": (
+            [("usuario", clave, restante, fallos) for clave, restante, fallos in _limite_usuario.bloqueadas()]
+            + [("cliente", clave, restante, fallos) for clave, restante, fallos in _limite_cliente.bloqueadas()]
+        ),
+    }
+
+def reiniciar_limites_login():
+    """Desbloquea a todos: usuarios y clientes vuelven a tener todos sus intentos."""
+    _limite_usuario.limpiar()
+    _limite_cliente.limpiar()
 
 #********************************************************************************
-#   CREATE_USER - Crea Usuario en el sistema, modulo de Registro 
+#   INIT_USERS_TABLE - Tabla Usuarios y un Admin por defecto; ahora es parte de
+#                      las migraciones de esquema.py (se aplica una sola vez)
 #********************************************************************************
 
-def create_user(username: str, password: str):
+def init_users_table():
+    asegurar_esquema(DB_PATH)
 
-    """Registra un nuevo usuario con password hasheado."""
+#********************************************************************************
+#   CREATE_USER - Crea Usuario en el sistema, modulo de Registro 
+#********************************************************************************
+
+def _validar_alta(username, password):
+    # Devuelve (username, password, None) normalizados o (.., .., mensaje de error)
     username = (username or "").strip().lower()
     password = (password or "").strip()
 
     if not username or not password:
-        return False, "Usuario y contraseña son obligatorios."
+        return username, password, "Usuario y contraseña son obligatorios."
 
     if len(username) < 3:
-        return False, "El usuario debe tener al menos 3 caracteres."
+        return username, password, "El usuario debe tener al menos 3 caracteres."
 
     if len(password) < 6:
-        return False, "La contraseña debe tener al menos 6 caracteres."
+        return username, password, "La contraseña debe tener al menos 6 caracteres."
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    if len(password.encode("utf-8")) > 72:
+        # bcrypt solo usa los primeros 72 bytes (las versiones nuevas lo rechazan)
+        return username, password, "La contraseña no puede superar los 72 bytes."
 
-    # Verificar si ya existe el usuario que se esta intentando crear
-    cursor.execute("SELECT 1 FROM usuarios WHERE username = ?", (username,))
-    if cursor.fetchone():
-        conn.close()
-        return False, "El usuario ya existe."
+    return username, password, None
 
-    password_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+def create_user(username: str, password: str):
 
-    cursor.execute(
-        "INSERT INTO usuarios (username, password_hash, created_at) VALUES (?, ?, ?)",
-        (username, password_hash.decode("utf-8"), datetime.utcnow().isoformat()),
-    )
-    conn.commit()
-    conn.close()
+    """Registra un nuevo usuario con password hasheado."""
+    username, password, error = _validar_alta(username, password)
+    if error:
+        return False, error
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        # Solo para no gastar un hash en un nombre ya tomado; la garantía la
+        # da la restricción UNIQUE al insertar
+        cursor.execute("SELECT 1 FROM usuarios WHERE username = ?", (username,))
+        if cursor.fetchone():
+            return False, "El usuario ya existe."
+
+    # El hash se calcula sin retener una conexión del pool
+    password_hash = _en_pool_hash(_hashear, password)
+    if password_hash is None:
+        return False, MENSAJE_OCUPADO
+
+    with get_connection() as conn:
+        try:
+            conn.execute(
+                "INSERT INTO usuarios (username, password_hash, created_at) VALUES (?, ?, ?)",
+                (username, password_hash, datetime.utcnow().isoformat()),
+            )
+        except sqlite3.IntegrityError:
+            # Otro registro con el mismo nombre ganó mientras hasheábamos
+            return False, "El usuario ya existe."
+        conn.commit()
     return True, "Usuario registrado correctamente."
 
+#********************************************************************************
+#   CREAR_USUARIOS_BATCH - Alta masiva (p. ej. los alumnos de una escuela) con
+#                          los hashes repartidos en varios procesos
+#********************************************************************************
+
+def _hashear_lote(passwords, rondas):
+    # Corre en un proceso hijo: debe ser una función de módulo (se serializa)
+    return [
+        bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rondas)).decode("utf-8")
+        for password in passwords
+    ]
+
+def _fila_usuario(fila):
+    if isinstance(fila, dict):
+        return fila.get("username") or fila.get("usuario"), fila.get("password") or fila.get("contrasena")
+    return fila[0], fila[1]
+
+def crear_usuarios_batch(filas, tamano_lote=500, procesos=None, rondas=None):
+
+    """
+    Crea usuarios desde cualquier iterable de filas (dicts con "username" y
+    "password", o tuplas (username, password)), p. ej. leer_csv_usuarios().
+
+    Los hashes se calculan en un ProcessPoolExecutor (`procesos`, por defecto
+    uno por núcleo) mientras se inserta el lote anterior. Los procesos se
+    crean con "spawn": un fork copiaría el servidor con sus hilos y sus
+    locks (pool, cola de escritura, limitadores) tomados a medias. Cada lote se inserta
+    en una transacción y los nombres repetidos los detecta la restricción
+    UNIQUE, sin consultas previas.
+
+    Devuelve {"creados", "resultados": [(numero_fila, username, ok, mensaje)],
+    "lotes", "segundos", "por_segundo"}.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    rondas = rondas or BCRYPT_ROUNDS
+    procesos = procesos or os.cpu_count() or 1
+    resultado = {"creados": 0, "resultados": [], "lotes": 0, "segundos": 0.0, "por_segundo": 0.0}
+    inicio = time.perf_counter()
+    vistos = set()
+
+    def preparar(crudas, primera):
+        # Valida el lote y reparte sus contraseñas entre los procesos
+        validas = []
+        for numero, cruda in enumerate(crudas, start=primera):
+            try:
+                username, password = _fila_usuario(cruda)
+            except (IndexError, KeyError, TypeError):
+                resultado["resultados"].append((numero, None, False, "Fila sin usuario y contraseña."))
+                continue
+            username, password, error = _validar_alta(username, password)
+            if not error and username in vistos:
+                error = "Usuario repetido en el archivo."
+            if error:
+                resultado["resultados"].append((numero, username, False, error))
+                continue
+            vistos.add(username)
+            validas.append((numero, username, password))
+        porcion = max(1, -(-len(validas) // procesos))
+        futuros = [
+            ejecutor.submit(_hashear_lote, [v[2] for v in validas[i:i + porcion]], rondas)
+            for i in range(0, len(validas), porcion)
+        ]
+        return validas, futuros
+
+    def insertar(validas, futuros):
+        hashes = [h for futuro in futuros for h in futuro.result()]
+        creado = datetime.utcnow().isoformat()
+        with get_connection() as conn:
+            for (numero, username, _), password_hash in zip(validas, hashes):
+                try:
+                    conn.execute(
+                        "INSERT INTO usuarios (username, password_hash, created_at) VALUES (?, ?, ?)",
+                        (username, password_hash, creado),
+                    )
+                except sqlite3.IntegrityError:
+                    resultado["resultados"].append((numero, username, False, "El usuario ya existe."))
+                    continue
+                resultado["creados"] += 1
+                resultado["resultados"].append((numero, username, True, "Usuario registrado correctamente."))
+            conn.commit()
+        resultado["lotes"] += 1
+
+    filas = iter(filas)
+    numero = 1
+    pendiente = None
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as ejecutor:
+        while True:
+            crudas = list(islice(filas, tamano_lote))
+            if not crudas:
+                break
+            # El lote nuevo se hashea mientras se inserta el anterior
+            siguiente = preparar(crudas, numero)
+            numero += len(crudas)
+            if pendiente is not None:
+                insertar(*pendiente)
+            pendiente = siguiente
+        if pendiente is not None:
+            insertar(*pendiente)
+
+    resultado["resultados"].sort(key=lambda r: r[0])
+    resultado["segundos"] = time.perf_counter() - inicio
+    if resultado["segundos"]:
+        resultado["por_segundo"] = resultado["creados"] / resultado["segundos"]
+    return resultado
+
+def leer_csv_usuarios(origen, delimitador=","):
+
+    """
+    Genera un dict por fila de un CSV con encabezado "username,password"
+    (ruta o archivo abierto, p. ej. el de st.file_uploader).
+    """
+    if isinstance(origen, (str, Path)):
+        archivo, propio = open(origen, "r", encoding="utf-8-sig", newline=""), True
+    elif isinstance(origen, io.TextIOBase):
+        archivo, propio = origen, False
+    else:
+        archivo, propio = io.TextIOWrapper(origen, encoding="utf-8-sig", newline=""), False
+    try:
+        for fila in csv.DictReader(archivo, delimiter=delimitador):
+            yield {(k or "").strip().lower(): v for k, v in fila.items()}
+    finally:
+        if propio:
+            archivo.close()
+
 #********************************************************************************
 #   VERIFY_USER - Verifica credenciales 
 #********************************************************************************
 
-def verify_user(username: str, password: str):
+def verify_user(username: str, password: str, cliente=None):
 
-    """Valida credenciales contra la BD."""
+    """
+    Valida credenciales contra la BD. `cliente` (p. ej. la IP) suma un límite
+    de intentos por origen al límite por usuario.
+    """
     username = (username or "").strip().lower()
     password = (password or "").strip()
 
     if not username or not password:
         return False, "Usuario o contraseña incorrectos."
 
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT password_hash FROM usuarios WHERE username = ?", (username,)
-    )
-    row = cursor.fetchone()
-    conn.close()
+    espera = _limitar_login(username, cliente)
+    if espera:
+        return False, f"Demasiados intentos. Intenta de nuevo en {math.ceil(espera)} s."
 
-    if not row:
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id, password_hash FROM usuarios WHERE username = ?", (username,)
+        )
+        row = cursor.fetchone()
+
+    usuario_id, stored_hash = row if row else (None, _hash_senuelo())
+    if stored_hash is None:
+        return False, MENSAJE_OCUPADO
+    valido = _en_pool_hash(_verificar, password, stored_hash)
+    if valido is None:
+        return False, MENSAJE_OCUPADO
+    if not valido or row is None:
+        _limite_usuario.fallo(username)
+        if cliente:
+            _limite_cliente.fallo(cliente)
         return False, "Usuario o contraseña incorrectos."
 
-    stored_hash = row[0].encode("utf-8")
-    if bcrypt.checkpw(password.encode("utf-8"), stored_hash):
-        return True, "OK"
+    _limite_usuario.exito(username)
+    if costo_hash(stored_hash) != BCRYPT_ROUNDS:
+        _rehashear(usuario_id, password, stored_hash)
+    return True, "OK"
+
+def _rehashear(usuario_id, password, anterior):
+    # Hash con otro costo (p. ej. se subió BCRYPT_ROUNDS): se rehace ahora que
+    # tenemos la contraseña en claro. Si falla, el login sigue siendo válido.
+    nuevo = _en_pool_hash(_hashear, password)
+    if nuevo is None:
+        return
+    with get_connection() as conn:
+        # Solo si nadie cambió el hash mientras tanto
+        conn.execute(
+            "UPDATE usuarios SET password_hash = ? WHERE id = ? AND password_hash = ?",
+            (nuevo, usuario_id, anterior),
+        )
+        conn.commit()
+    with _ejecutor_lock:
+        _contadores_hash["rehashes"] += 1
+
+#********************************************************************************
+#   SESIONES - "Mantener sesión iniciada" sin volver a pasar por bcrypt.
+#
+#   El navegador guarda "selector.validador" (dos valores al azar). En la BD
+#   queda el selector como clave y HMAC-SHA256(secreto, validador): validar
+#   es una búsqueda por clave primaria más un HMAC, y quien lea la tabla no
+#   puede reconstruir un token. Una CacheLRU evita incluso esa búsqueda.
+#********************************************************************************
+
+_secretos = {}                  # base de datos -> secreto con que se firman sus sesiones
+_cache_sesiones = CacheLRU(max_entradas=SESION_CACHE_MAX, ttl=SESION_CACHE_TTL)
+_ultimo_barrido = [0.0]
+BARRIDO_CADA_S = 3600           # crear_sesion barre las vencidas como mucho una vez por hora
+
+def _secreto():
+    clave = str(DB_PATH)
+    secreto = _secretos.get(clave)
+    if secreto is None:
+        if SESION_SECRETO:
+            secreto = SESION_SECRETO
+        else:
+            # El primer proceso que llega lo genera; los demás leen el mismo
+            with get_connection() as conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO ajustes (clave, valor) VALUES ('sesion_secreto', ?)",
+                    (secrets.token_hex(32),),
+                )
+                conn.commit()
+                secreto = conn.execute(
+                    "SELECT valor FROM ajustes WHERE clave = 'sesion_secreto'"
+                ).fetchone()[0]
+        secreto = _secretos[clave] = secreto.encode("utf-8")
+    return secreto
+
+def _firmar(validador):
+    return hmac.new(_secreto(), validador.encode("utf-8"), hashlib.sha256).hexdigest()
+
+def crear_sesion(username, dias=SESION_DIAS):
+
+    """
+    Crea una sesión para un usuario ya autenticado y devuelve el token a
+    guardar en el navegador (None si el usuario no existe).
+    """
+    username = (username or "").strip().lower()
+    selector = secrets.token_urlsafe(12)
+    validador = secrets.token_urlsafe(24)
+    ahora = datetime.utcnow().replace(microsecond=0)
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO sesiones (selector, usuario_id, validador_hmac, creada, expira)
+            SELECT ?, id, ?, ?, ? FROM usuarios WHERE username = ?
+            """,
+            (
+                selector, _firmar(validador), ahora.isoformat(),
+                (ahora + timedelta(days=dias)).isoformat(), username,
+            ),
+        )
+        conn.commit()
+        if cursor.rowcount == 0:
+            return None
+
+    if time.monotonic() - _ultimo_barrido[0] > BARRIDO_CADA_S:
+        _ultimo_barrido[0] = time.monotonic()
+        barrer_sesiones()
+    return f"{selector}.{validador}"
+
+def validar_sesion(token):
+    """Devuelve el username dueño del token, o None si no es válido o venció."""
+    selector, _, validador = (token or "").partition(".")
+    if not selector or not validador:
+        return None
+
+    generacion = _cache_sesiones.generacion()
+    encontrado, sesion = _cache_sesiones.obtener(selector)
+    if not encontrado:
+        with get_connection() as conn:
+            sesion = conn.execute(
+                """
+                SELECT u.username, s.validador_hmac, s.expira
+                FROM sesiones s JOIN usuarios u ON u.id = s.usuario_id
+                WHERE s.selector = ?
+                """,
+                (selector,),
+            ).fetchone()
+        _cache_sesiones.guardar(selector, sesion, generacion)
+
+    if sesion is None:
+        return None
+    username, firma, expira = sesion
+    if not hmac.compare_digest(firma, _firmar(validador)):
+        return None
+    if expira <= datetime.utcnow().isoformat():
+        return None
+    return username
+
+def revocar_sesion(token):
+    selector = (token or "").partition(".")[0]
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM sesiones WHERE selector = ?", (selector,))
+        conn.commit()
+    _cache_sesiones.invalidar(selector)
+    return cursor.rowcount > 0
 
-    return False, "Usuario o contraseña incorrectos."
+def revocar_sesiones_usuario(username):
+    """Cierra todas las sesiones guardadas del usuario (p. ej. al cambiar la contraseña)."""
+    username = (username or "").strip().lower()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT selector FROM sesiones WHERE usuario_id = (SELECT id FROM usuarios WHERE username = ?)",
+            (username,),
+        )
+        selectores = [fila[0] for fila in cursor.fetchall()]
+        cursor.execute(
+            "DELETE FROM sesiones WHERE usuario_id = (SELECT id FROM usuarios WHERE username = ?)",
+            (username,),
+        )
+        conn.commit()
+    _cache_sesiones.invalidar(*selectores)
+    return len(selectores)
+
+def barrer_sesiones(lote=1000):
+
+    """
+    Borra las sesiones vencidas y devuelve cuántas. Cada lote es una
+    transacción corta para no bloquear a los escritores.
+    """
+    ahora = datetime.utcnow().isoformat()
+    borradas = 0
+    while True:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                DELETE FROM sesiones WHERE selector IN (
+                    SELECT selector FROM sesiones WHERE expira < ? LIMIT ?
+                )
+                """,
+                (ahora, lote),
+            )
+            conn.commit()
+            n = cursor.rowcount
+        borradas += n
+        if n < lote:
+            return borradas
+
+def estadisticas_sesiones():
+    with get_connection() as conn:
+        activas = conn.execute(
+            "SELECT COUNT(*) FROM sesiones WHERE expira > ?", (datetime.utcnow().isoformat(),)
+        ).fetchone()[0]
+    return {"activas": activas, "cache": _cache_sesiones.estadisticas()}
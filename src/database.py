@@ -0,0 +1,354 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from pathlib import Path
+import sys
+
+# Ruta absoluta a la raíz del proyecto (donde está config.py)
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Aseguramos que la raíz esté en sys.path
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from config import (
+    DB_PATH,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_CACHE_KB,
+    DB_MMAP_BYTES,
+    DB_BUSY_TIMEOUT_MS,
+    INSTRUMENTAR_CONSULTAS,
+)
+from instrumentacion import ConexionInstrumentada
+
+# Con la instrumentación activa, cada conexión mide sus sentencias (instrumentacion.py)
+_FABRICA_CONEXION = ConexionInstrumentada if INSTRUMENTAR_CONSULTAS else sqlite3.Connection
+
+#********************************************************************************
+#   ABRIR_CONEXION - Abre una conexión SQLite ya afinada para uso concurrente
+#********************************************************************************
+
+def abrir_conexion(ruta):
+
+    """Abre una conexión con WAL, synchronous=NORMAL, caché, mmap y claves foráneas."""
+    conn = sqlite3.connect(
+        str(ruta),
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,    # La conexión viaja entre hilos a través del pool
+        factory=_FABRICA_CONEXION,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_KB)}")
+    conn.execute(f"PRAGMA mmap_size={int(DB_MMAP_BYTES)}")
+    conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA foreign_keys=ON")     # ejemplares -> libros, prestamos -> usuarios
+    return conn
+
+#********************************************************************************
+#   MOTORES - Dónde viven los datos. Los CRUD solo piden conexiones SQLite al
+#             pool; el motor decide si son de un archivo o de memoria.
+#
+#   El destino (config.DB_PATH) elige el motor:
+#     - una ruta de archivo                -> MotorArchivo
+#     - "memoria:<nombre>"                 -> MotorMemoria
+#********************************************************************************
+
+PREFIJO_MEMORIA = "memoria:"
+
+class MotorArchivo:
+
+    """Base de datos SQLite en disco (la de producción)."""
+
+    def __init__(self, ruta):
+        self.ruta = str(ruta)
+
+    def abrir(self):
+        return abrir_conexion(self.ruta)
+
+    def cerrar(self):
+        pass
+
+class MotorMemoria:
+
+    """
+    Base de datos SQLite en memoria, compartida por todas las conexiones del
+    proceso que usen el mismo nombre (VFS memdb). Mismo SQL, FTS5 y triggers
+    que el motor de archivo, pero nada toca el disco: pensado para pruebas y
+    benchmarks. Los datos viven mientras el motor tenga abierta su conexión
+    ancla; cerrar() los descarta.
+    """
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self._uri = f"file:/{nombre}?vfs=memdb"
+        self._ancla = self.abrir()
+
+    def abrir(self):
+        conn = sqlite3.connect(
+            self._uri,
+            uri=True,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            factory=_FABRICA_CONEXION,
+        )
+        conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_KB)}")
+        conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def cerrar(self):
+        if self._ancla is not None:
+            self._ancla.close()
+            self._ancla = None
+
+def crear_motor(destino):
+    destino = str(destino)
+    if destino.startswith(PREFIJO_MEMORIA):
+        return MotorMemoria(destino[len(PREFIJO_MEMORIA):] or "biblioteca")
+    return MotorArchivo(destino)
+
+#********************************************************************************
+#   LLAMADA - Conexiones que una llamada tiene prestadas en este momento, para
+#             poder interrumpir sus consultas (timeout o cancelación) sin tocar
+#             las de nadie más
+#********************************************************************************
+
+_hilo_local = threading.local()
+
+class Llamada:
+
+    """
+    Mientras el hilo que ejecuta la llamada está dentro de `registrar_llamada`,
+    cada conexión que presta el pool queda anotada aquí hasta que se devuelve.
+    interrumpir() solo actúa sobre esas conexiones y solo mientras la llamada
+    sigue activa: una conexión ya devuelta, o el hilo reutilizado por otra
+    llamada, nunca se interrumpe. Una llamada interrumpida no puede tomar más
+    conexiones.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conexiones = []
+        self.activa = True
+        self.interrumpida = False
+
+    def _tomar(self, conn):
+        with self._lock:
+            if self.interrumpida:
+                raise sqlite3.OperationalError("interrupted")
+            self._conexiones.append(conn)
+
+    def _soltar(self, conn):
+        with self._lock:
+            if conn in self._conexiones:
+                self._conexiones.remove(conn)
+
+    def terminar(self):
+        with self._lock:
+            self.activa = False
+            self._conexiones.clear()
+
+    def interrumpir(self):
+        """Aborta las consultas en curso de la llamada; True si había alguna conexión prestada."""
+        with self._lock:
+            if not self.activa:
+                return False
+            self.interrumpida = True
+            for conn in self._conexiones:
+                conn.interrupt()
+            return bool(self._conexiones)
+
+@contextmanager
+def registrar_llamada(llamada):
+    anterior = getattr(_hilo_local, "llamada", None)
+    _hilo_local.llamada = llamada
+    try:
+        yield llamada
+    finally:
+        _hilo_local.llamada = anterior
+        llamada.terminar()
+
+#********************************************************************************
+#   POOL_CONEXIONES - Pool acotado de conexiones persistentes a una base de datos
+#********************************************************************************
+
+class PoolConexiones:
+
+    """
+    Mantiene hasta `tamano` conexiones abiertas y las reparte entre hilos.
+    Las conexiones se abren una sola vez y se reutilizan entre llamadas.
+    """
+
+    def __init__(self, ruta, tamano=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT):
+        self.ruta = ruta
+        self.motor = crear_motor(ruta)
+        self.tamano = tamano
+        self.timeout = timeout
+        self._libres = queue.LifoQueue()    # LIFO: la conexión más "caliente" primero
+        self._lock = threading.Lock()
+        self._creadas = 0
+        self._cerrado = False
+        self._vigia = None                  # Conexión propia para PRAGMA data_version
+        self._vigia_lock = threading.Lock()
+
+        # Contadores
+        self._aciertos = 0          # Conexión reutilizada del pool
+        self._fallos = 0            # Hubo que abrir una conexión nueva
+        self._esperas = 0           # El pool estaba agotado y hubo que esperar
+        self._tiempo_espera = 0.0   # Segundos acumulados esperando
+        self._espera_maxima = 0.0
+
+    def _adquirir(self):
+        try:
+            conn = self._libres.get_nowait()
+            with self._lock:
+                self._aciertos += 1
+            return conn
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            crear = self._creadas < self.tamano
+            if crear:
+                self._creadas += 1
+                self._fallos += 1
+
+        if crear:
+            try:
+                return self.motor.abrir()
+            except Exception:
+                with self._lock:
+                    self._creadas -= 1
+                raise
+
+        # Pool agotado: esperamos a que otro hilo devuelva una conexión
+        inicio = time.perf_counter()
+        try:
+            conn = self._libres.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"No hay conexiones disponibles en el pool tras {self.timeout} s."
+            )
+        espera = time.perf_counter() - inicio
+        with self._lock:
+            self._aciertos += 1
+            self._esperas += 1
+            self._tiempo_espera += espera
+            self._espera_maxima = max(self._espera_maxima, espera)
+        return conn
+
+    def _liberar(self, conn):
+        # Nunca devolvemos al pool una transacción a medias
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            with self._lock:
+                self._creadas -= 1
+            return
+
+        if self._cerrado:
+            conn.close()
+            with self._lock:
+                self._creadas -= 1
+            return
+        self._libres.put(conn)
+
+    @contextmanager
+    def conexion(self):
+        """Presta una conexión del pool durante el bloque `with`."""
+        conn = self._adquirir()
+        llamada = getattr(_hilo_local, "llamada", None)
+        try:
+            if llamada is not None:
+                llamada._tomar(conn)
+            try:
+                yield conn
+            finally:
+                if llamada is not None:
+                    llamada._soltar(conn)
+        finally:
+            self._liberar(conn)
+
+    def version_datos(self):
+        """
+        PRAGMA data_version leído desde una conexión que nunca escribe: cambia
+        cada vez que cualquier otra conexión (de este u otro proceso) hace commit.
+        """
+        with self._vigia_lock:
+            if self._vigia is None:
+                self._vigia = self.motor.abrir()
+            return self._vigia.execute("PRAGMA data_version").fetchone()[0]
+
+    def estadisticas(self):
+        with self._lock:
+            total = self._aciertos + self._fallos
+            return {
+                "ruta": str(self.ruta),
+                "motor": type(self.motor).__name__,
+                "tamano": self.tamano,
+                "abiertas": self._creadas,
+                "libres": self._libres.qsize(),
+                "aciertos": self._aciertos,
+                "fallos": self._fallos,
+                "tasa_aciertos": (self._aciertos / total) if total else 0.0,
+                "esperas": self._esperas,
+                "tiempo_espera_s": self._tiempo_espera,
+                "espera_maxima_s": self._espera_maxima,
+            }
+
+    def cerrar(self):
+        """Cierra las conexiones libres; las prestadas se cierran al devolverse."""
+        self._cerrado = True
+        while True:
+            try:
+                conn = self._libres.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._creadas -= 1
+        with self._vigia_lock:
+            if self._vigia is not None:
+                self._vigia.close()
+                self._vigia = None
+        self.motor.cerrar()
+
+#********************************************************************************
+#   OBTENER_POOL - Un pool compartido por proceso para cada base de datos
+#********************************************************************************
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def obtener_pool(ruta=None):
+    ruta = str(ruta or DB_PATH)
+    pool = _pools.get(ruta)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(ruta)
+            if pool is None:
+                pool = PoolConexiones(ruta)
+                _pools[ruta] = pool
+    return pool
+
+def estadisticas_pools():
+    return {ruta: pool.estadisticas() for ruta, pool in list(_pools.items())}
+
+def cerrar_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.cerrar()
+        _pools.clear()
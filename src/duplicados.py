@@ -0,0 +1,275 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import csv
+import hashlib
+import re
+import struct
+import time
+
+from pathlib import Path
+import sys
+
+# Ruta absoluta a la raíz del proyecto (donde está config.py)
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Aseguramos que la raíz esté en sys.path
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from config import UMBRAL_DUPLICADO
+from autocompletar import normalizar
+import crud_libros
+
+#********************************************************************************
+#   NORMALIZACION - Título y autor comparables entre ediciones y capturas
+#********************************************************************************
+
+# Palabras que no distinguen una obra de otra
+_VACIAS = {
+    "el", "la", "los", "las", "un", "una", "unos", "unas", "de", "del", "y", "e",
+    "the", "a", "an", "of", "and",
+}
+# Marcas de edición que se suelen agregar al título al escanear
+_EDICION = {
+    "edicion", "ed", "conmemorativa", "especial", "ilustrada", "revisada",
+    "bolsillo", "tapa", "blanda", "dura", "nueva", "reedicion", "spanish", "edition",
+}
+
+def limpiar_titulo(titulo) -> str:
+
+    """
+    "Cien Años De Soledad (Edición conmemorativa)" -> "cien anos soledad":
+    sin acentos ni mayúsculas, sin lo que va entre paréntesis o corchetes, sin
+    subtítulo (después de ":") y sin artículos ni marcas de edición.
+    """
+    texto = normalizar(titulo)
+    texto = re.sub(r"[\(\[\{].*?[\)\]\}]", " ", texto)
+    texto = texto.split(":")[0]
+    palabras = [
+        p for p in re.findall(r"\w+", texto)
+        if p not in _VACIAS and p not in _EDICION
+    ]
+    return " ".join(palabras)
+
+def palabras_autor(autor) -> frozenset:
+    # "García Márquez, Gabriel" y "Gabriel García Márquez" dan lo mismo;
+    # las iniciales ("G.") no cuentan
+    return frozenset(p for p in re.findall(r"\w+", normalizar(autor)) if len(p) > 1)
+
+def _tejas(titulo_limpio):
+    # Trigramas de caracteres (shingles) del título limpio
+    texto = f" {titulo_limpio} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+def _jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def similitud(titulo_a, autor_a, titulo_b, autor_b) -> float:
+
+    """
+    Puntaje de 0 a 1: Jaccard de trigramas del título limpio (75 %) y de las
+    palabras del autor (25 %). Si a alguno le falta el autor, cuenta solo el
+    título.
+    """
+    return _puntaje(_rasgos(titulo_a, autor_a), _rasgos(titulo_b, autor_b))
+
+def _rasgos(titulo, autor):
+    return _tejas(limpiar_titulo(titulo)), palabras_autor(autor)
+
+def _puntaje(rasgos_a, rasgos_b):
+    t = _jaccard(rasgos_a[0], rasgos_b[0])
+    aa, ab = rasgos_a[1], rasgos_b[1]
+    if not aa or not ab:
+        return t
+    return 0.75 * t + 0.25 * _jaccard(aa, ab)
+
+#********************************************************************************
+#   MINHASH / LSH - Firma de 32 valores por título; los títulos parecidos
+#                   coinciden en alguna banda y caen en la misma cubeta
+#********************************************************************************
+
+PERMUTACIONES = 32
+BANDAS = 8                      # 8 bandas de 4 filas: similitud ~0.6 ya suele coincidir
+FILAS = PERMUTACIONES // BANDAS
+MAX_CUBETA = 200                # Cubetas más grandes se omiten (títulos muy comunes)
+
+_hashes_teja = {}               # trigrama -> sus 32 valores (hay pocos trigramas distintos)
+
+def _hashes(teja):
+    # Un blake2b de 64 bytes da las 32 "permutaciones" de 16 bits de una vez
+    valores = _hashes_teja.get(teja)
+    if valores is None:
+        digest = hashlib.blake2b(teja.encode("utf-8"), digest_size=64).digest()
+        valores = _hashes_teja[teja] = struct.unpack("<32H", digest)
+    return valores
+
+def firma_minhash(tejas):
+    if not tejas:
+        return None
+    return list(map(min, zip(*[_hashes(t) for t in tejas])))
+
+def _bandas(firma):
+    return [tuple(firma[i:i + FILAS]) for i in range(0, PERMUTACIONES, FILAS)]
+
+#********************************************************************************
+#   BUSCAR_DUPLICADOS - Pares y grupos de libros probablemente repetidos en todo
+#                       el catálogo, sin comparar todos contra todos
+#********************************************************************************
+
+def buscar_duplicados(umbral=UMBRAL_DUPLICADO, libros=None):
+
+    """
+    Recorre el catálogo (o `libros`, tuplas (isbn, titulo, autor, anio,
+    editorial)) en una pasada y arma cubetas por:
+      - clave de bloque exacta: título limpio + palabra más larga del autor;
+        los libros de un mismo bloque se encadenan sin compararlos todos;
+      - cada banda de la firma MinHash del título.
+    Solo se comparan los pares que comparten cubeta.
+
+    Devuelve {"pares": [(similitud, isbn_a, isbn_b)], "grupos": [[isbn, ...]],
+    "libros", "comparaciones", "cubetas_omitidas", "segundos"}.
+    """
+    inicio = time.perf_counter()
+    if libros is None:
+        libros = crud_libros.iterar_libros(tamano_lote=5000)
+
+    filas = []              # índice -> (isbn, titulo, autor)
+    bloques = {}            # clave exacta -> último índice visto
+    cubetas = {}            # (banda, valores) -> [índices]
+    candidatos = set()
+    for fila in libros:
+        isbn, titulo, autor = fila[0], fila[1], fila[2]
+        i = len(filas)
+        filas.append((isbn, titulo, autor))
+        limpio = limpiar_titulo(titulo)
+
+        autor_clave = max(palabras_autor(autor), key=len, default="")
+        clave = (limpio, autor_clave)
+        if limpio and clave in bloques:
+            candidatos.add((bloques[clave], i))
+        bloques[clave] = i
+
+        firma = firma_minhash(_tejas(limpio))
+        if firma is None:
+            continue
+        for banda, valores in enumerate(_bandas(firma)):
+            cubetas.setdefault((banda, valores), []).append(i)
+
+    omitidas = 0
+    for miembros in cubetas.values():
+        if len(miembros) < 2:
+            continue
+        if len(miembros) > MAX_CUBETA:
+            omitidas += 1
+            continue
+        for x in range(len(miembros)):
+            for y in range(x + 1, len(miembros)):
+                candidatos.add((miembros[x], miembros[y]))
+    del cubetas, bloques
+
+    # Verificación de candidatos y agrupación (union-find)
+    padre = {}
+
+    def raiz(i):
+        while padre.get(i, i) != i:
+            padre[i] = padre.get(padre[i], padre[i])
+            i = padre[i]
+        return i
+
+    rasgos = {}             # Solo de los libros que aparecen en algún candidato
+
+    def rasgos_de(i):
+        r = rasgos.get(i)
+        if r is None:
+            r = rasgos[i] = _rasgos(filas[i][1], filas[i][2])
+        return r
+
+    pares = []
+    for i, j in candidatos:
+        puntaje = _puntaje(rasgos_de(i), rasgos_de(j))
+        if puntaje >= umbral:
+            pares.append((round(puntaje, 3), filas[i][0], filas[j][0]))
+            ri, rj = raiz(i), raiz(j)
+            if ri != rj:
+                padre[max(ri, rj)] = min(ri, rj)
+
+    grupos = {}
+    for i in padre:
+        grupos.setdefault(raiz(i), set()).add(i)
+    for i in list(grupos):
+        grupos[i].add(i)
+
+    pares.sort(key=lambda par: (-par[0], par[1], par[2]))
+    return {
+        "pares": pares,
+        "grupos": [[filas[i][0] for i in sorted(miembros)] for _, miembros in sorted(grupos.items())],
+        "libros": len(filas),
+        "comparaciones": len(candidatos),
+        "cubetas_omitidas": omitidas,
+        "segundos": time.perf_counter() - inicio,
+    }
+
+#********************************************************************************
+#   REPORTE_DUPLICADOS - CSV para revisión manual: un renglón por libro,
+#                        agrupado, con la similitud contra el primero del grupo
+#********************************************************************************
+
+def reporte_duplicados(destino, umbral=UMBRAL_DUPLICADO):
+    resultado = buscar_duplicados(umbral)
+    with open(destino, "w", newline="", encoding="utf-8") as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(["grupo", "isbn", "titulo", "autor", "anio", "editorial", "similitud"])
+        for n, grupo in enumerate(resultado["grupos"], start=1):
+            libros = [crud_libros.buscar_libro(isbn) for isbn in grupo]
+            libros = [libro for libro in libros if libro]
+            if len(libros) < 2:
+                continue
+            base = libros[0]
+            for libro in libros:
+                puntaje = 1.0 if libro is base else similitud(base[1], base[2], libro[1], libro[2])
+                escritor.writerow([n, *libro, f"{puntaje:.3f}"])
+    return resultado
+
+#********************************************************************************
+#   POSIBLES_DUPLICADOS - Antes de registrar un libro: ¿ya está en el catálogo
+#                         con otro ISBN o con el título escrito distinto?
+#********************************************************************************
+
+def posibles_duplicados(titulo, autor="", isbn=None, umbral=UMBRAL_DUPLICADO, limite=5):
+
+    """
+    Busca candidatos con el índice de texto completo (cualquier palabra del
+    título) y devuelve hasta `limite` tuplas (similitud, libro) ordenadas de
+    mayor a menor. `isbn` excluye al propio libro (p. ej. al actualizarlo).
+    """
+    palabras = limpiar_titulo(titulo).split()
+    if not palabras:
+        return []
+    expresion = "titulo : (" + " OR ".join(f'"{p}"' for p in palabras) + ")"
+    with crud_libros.get_connection() as conn:
+        candidatos = conn.execute(
+            """
+            SELECT l.isbn, l.titulo, l.autor, l.anio, l.editorial
+            FROM libros_fts
+            JOIN libros l ON l.id = libros_fts.rowid
+            WHERE libros_fts MATCH ?
+            ORDER BY bm25(libros_fts)
+            LIMIT 50
+            """,
+            (expresion,),
+        ).fetchall()
+
+    propio = crud_libros.clave_isbn(isbn) if isbn else None
+    resultado = []
+    for libro in candidatos:
+        if libro[0] == propio:
+            continue
+        puntaje = similitud(titulo, autor, libro[1], libro[2])
+        if puntaje >= umbral:
+            resultado.append((round(puntaje, 3), libro))
+    resultado.sort(key=lambda par: -par[0])
+    return resultado[:limite]
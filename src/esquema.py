@@ -0,0 +1,476 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import logging
+import threading
+import time
+from datetime import datetime
+
+from pathlib import Path
+import sys
+
+# Ruta absoluta a la raíz del proyecto (donde está config.py)
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Aseguramos que la raíz esté en sys.path
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from config import BCRYPT_ROUNDS, DB_PATH
+from database import obtener_pool
+from isbn import normalizar_isbn
+
+_log = logging.getLogger("biblioteca.esquema")
+
+#********************************************************************************
+#   MIGRACIONES - Cambios de esquema numerados. La versión aplicada se guarda en
+#                 PRAGMA user_version; cada migración corre una sola vez.
+#
+#   Importante: no usar executescript dentro de una migración (hace COMMIT
+#   implícito y rompería la transacción que protege la actualización).
+#   Si una migración retorna un reporte, queda en estado_esquema()["reportes"].
+#********************************************************************************
+
+def _m001_libros(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS libros (
+            isbn TEXT PRIMARY KEY,
+            titulo TEXT NOT NULL,
+            autor TEXT,
+            anio INTEGER,
+            editorial TEXT
+        );
+        """
+    )
+
+def _m002_usuarios(cursor):
+    import bcrypt   # type: ignore
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        );
+        """
+    )
+
+    # Crea usuario admin por defecto si no hay usuarios
+    cursor.execute("SELECT COUNT(*) FROM usuarios")
+    if cursor.fetchone()[0] == 0:
+        password_hash = bcrypt.hashpw("admin123".encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
+        cursor.execute(
+            "INSERT INTO usuarios (username, password_hash, created_at) VALUES (?, ?, ?)",
+            ("admin", password_hash.decode("utf-8"), datetime.utcnow().isoformat()),
+        )
+
+def _m003_indice_titulo(cursor):
+    # Índice para la paginación por cursor (titulo, isbn)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_libros_titulo_isbn ON libros (titulo, isbn)"
+    )
+
+def _m004_texto_completo(cursor):
+    # Tabla FTS5 sobre titulo/autor/editorial sincronizada con `libros` por triggers.
+    # remove_diacritics 2: "Año" y "ano" generan el mismo token. El rowid de
+    # `libros` es libros.id desde la migración 12.
+    cursor.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS libros_fts USING fts5 (
+            titulo, autor, editorial,
+            content = 'libros',
+            content_rowid = 'rowid',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        );
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS libros_fts_ai AFTER INSERT ON libros BEGIN
+            INSERT INTO libros_fts (rowid, titulo, autor, editorial)
+            VALUES (new.rowid, new.titulo, new.autor, new.editorial);
+        END;
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS libros_fts_ad AFTER DELETE ON libros BEGIN
+            INSERT INTO libros_fts (libros_fts, rowid, titulo, autor, editorial)
+            VALUES ('delete', old.rowid, old.titulo, old.autor, old.editorial);
+        END;
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS libros_fts_au AFTER UPDATE ON libros BEGIN
+            INSERT INTO libros_fts (libros_fts, rowid, titulo, autor, editorial)
+            VALUES ('delete', old.rowid, old.titulo, old.autor, old.editorial);
+            INSERT INTO libros_fts (rowid, titulo, autor, editorial)
+            VALUES (new.rowid, new.titulo, new.autor, new.editorial);
+        END;
+        """
+    )
+    # Indexa los libros que ya estaban registrados
+    cursor.execute("INSERT INTO libros_fts (libros_fts) VALUES ('rebuild')")
+
+def canonicalizar_isbns(cursor):
+
+    """
+    Reescribe cada `libros.isbn` como ISBN-13 canónico (no hace commit).
+
+    Devuelve un reporte con:
+      - "convertidos": [(isbn_original, isbn13)]
+      - "colisiones":  [(isbn_original, isbn13)] filas cuyo ISBN-13 ya existe
+                       (el mismo libro registrado dos veces); no se tocan
+      - "invalidos":   [isbn_original] valores que no son un ISBN válido
+    """
+    reporte = {"convertidos": [], "colisiones": [], "invalidos": []}
+    cursor.execute("SELECT isbn FROM libros")
+    existentes = {fila[0] for fila in cursor.fetchall()}
+
+    for original in sorted(existentes):
+        canonico = normalizar_isbn(original)
+        if not canonico:
+            reporte["invalidos"].append(original)
+        elif canonico == original:
+            continue
+        elif canonico in existentes:
+            reporte["colisiones"].append((original, canonico))
+        else:
+            cursor.execute(
+                "UPDATE libros SET isbn = ? WHERE isbn = ?", (canonico, original)
+            )
+            existentes.add(canonico)
+            reporte["convertidos"].append((original, canonico))
+    return reporte
+
+def _m005_isbn_canonico(cursor):
+    reporte = canonicalizar_isbns(cursor)
+    for original, canonico in reporte["colisiones"]:
+        _log.warning("ISBN %s colisiona con %s; no se modificó.", original, canonico)
+    for original in reporte["invalidos"]:
+        _log.warning("ISBN inválido conservado tal cual: %r", original)
+    return reporte
+
+def _m006_indices_filtros(cursor):
+    # Índices para filtrar por autor, año y editorial (filtrar_libros / facetas)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_libros_autor ON libros (autor COLLATE NOCASE)"
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_libros_anio ON libros (anio)")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_libros_editorial ON libros (editorial COLLATE NOCASE)"
+    )
+
+def _m007_registro_cambios(cursor):
+    # Registro de cambios (CDC): un renglón por cada insert/update/delete en
+    # `libros`. AUTOINCREMENT garantiza que `seq` nunca se reutiliza, aun
+    # después de compactar.
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS cambios_libros (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            operacion TEXT NOT NULL CHECK (operacion IN ('I', 'U', 'D')),
+            isbn TEXT NOT NULL,
+            momento TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+        );
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_cambios_libros_momento ON cambios_libros (momento)"
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS libros_cdc_ai AFTER INSERT ON libros BEGIN
+            INSERT INTO cambios_libros (operacion, isbn) VALUES ('I', new.isbn);
+        END;
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS libros_cdc_ad AFTER DELETE ON libros BEGIN
+            INSERT INTO cambios_libros (operacion, isbn) VALUES ('D', old.isbn);
+        END;
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS libros_cdc_au AFTER UPDATE ON libros
+        WHEN old.isbn = new.isbn BEGIN
+            INSERT INTO cambios_libros (operacion, isbn) VALUES ('U', new.isbn);
+        END;
+        """
+    )
+    # Si cambia la clave (p. ej. al canonicalizar el ISBN) se registra como
+    # baja del ISBN viejo y alta del nuevo
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS libros_cdc_au_isbn AFTER UPDATE ON libros
+        WHEN old.isbn IS NOT new.isbn BEGIN
+            INSERT INTO cambios_libros (operacion, isbn) VALUES ('D', old.isbn);
+            INSERT INTO cambios_libros (operacion, isbn) VALUES ('I', new.isbn);
+        END;
+        """
+    )
+
+def _m008_prestamos(cursor):
+    # Ejemplares físicos de cada libro. `estado` es 'disponible', 'prestado'
+    # o 'baja'; se mantiene al prestar/devolver para no contar préstamos.
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ejemplares (
+            id INTEGER PRIMARY KEY,
+            isbn TEXT NOT NULL REFERENCES libros (isbn) ON UPDATE CASCADE,
+            estado TEXT NOT NULL DEFAULT 'disponible',
+            alta TEXT NOT NULL
+        );
+        """
+    )
+    # Cubre "ejemplares libres de este ISBN" (el id es el rowid, ya va en el
+    # índice) y la verificación de la clave foránea al borrar un libro
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_ejemplares_isbn_estado ON ejemplares (isbn, estado)"
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS prestamos (
+            id INTEGER PRIMARY KEY,
+            ejemplar_id INTEGER NOT NULL REFERENCES ejemplares (id),
+            usuario_id INTEGER NOT NULL REFERENCES usuarios (id),
+            prestado_en TEXT NOT NULL,
+            vence TEXT NOT NULL,
+            devuelto_en TEXT
+        );
+        """
+    )
+    # Índices parciales: solo los préstamos activos (devuelto_en IS NULL), que
+    # son pocos comparados con el historial
+    #   - un ejemplar no puede tener dos préstamos activos; también sirve para
+    #     encontrar el préstamo al devolver
+    cursor.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_prestamos_activo_ejemplar
+        ON prestamos (ejemplar_id) WHERE devuelto_en IS NULL
+        """
+    )
+    #   - revisión de vencidos: recorre por fecha, en orden y sin tocar la tabla
+    #     ((vence, ejemplar_id) es único entre los activos: sirve de cursor).
+    #     devuelto_en (siempre NULL aquí) va al final para que sea cubriente.
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_prestamos_vencidos
+        ON prestamos (vence, ejemplar_id, usuario_id, devuelto_en) WHERE devuelto_en IS NULL
+        """
+    )
+    # Préstamos de un usuario (activos e historial) y clave foránea a usuarios
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_prestamos_usuario ON prestamos (usuario_id, devuelto_en)"
+    )
+    # Clave foránea a ejemplares (historial completo, no solo los activos)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_prestamos_ejemplar ON prestamos (ejemplar_id)"
+    )
+
+def _m009_sesiones(cursor):
+    # Sesiones persistentes ("Mantener sesión iniciada"). El token que recibe
+    # el navegador es "selector.validador": el selector es la clave primaria y
+    # del validador solo se guarda su HMAC (ver crud_usuarios.crear_sesion).
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sesiones (
+            selector TEXT PRIMARY KEY,
+            usuario_id INTEGER NOT NULL REFERENCES usuarios (id),
+            validador_hmac TEXT NOT NULL,
+            creada TEXT NOT NULL,
+            expira TEXT NOT NULL
+        );
+        """
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sesiones_expira ON sesiones (expira)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sesiones_usuario ON sesiones (usuario_id)")
+    # Ajustes internos persistentes (p. ej. el secreto que firma las sesiones
+    # cuando no viene de BIBLIO_SESION_SECRETO)
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ajustes (
+            clave TEXT PRIMARY KEY,
+            valor TEXT NOT NULL
+        );
+        """
+    )
+
+def _m010_cache_google_books(cursor):
+    # Respuestas de Google Books ya procesadas (ver cache_google_books.py).
+    # respuesta NULL = la búsqueda no encontró nada (caché negativa).
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS cache_google_books (
+            clave TEXT PRIMARY KEY,
+            respuesta TEXT,
+            guardada REAL NOT NULL,
+            expira REAL NOT NULL,
+            usada REAL NOT NULL,
+            ms_consulta REAL NOT NULL DEFAULT 0
+        );
+        """
+    )
+    # Para desalojar las menos usadas cuando la tabla se llena
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_cache_google_books_usada ON cache_google_books (usada)"
+    )
+
+def _m011_indices_filtros_compuestos(cursor):
+    # filtrar_libros ordena por (titulo, isbn): con el título detrás del autor
+    # o la editorial, el índice ya entrega las filas en orden (sin ordenar en
+    # un B-tree temporal). (anio, editorial) cubre las facetas con rango de
+    # años. Reemplazan a los índices simples de la migración 6.
+    cursor.execute("DROP INDEX IF EXISTS idx_libros_autor")
+    cursor.execute("DROP INDEX IF EXISTS idx_libros_editorial")
+    cursor.execute("DROP INDEX IF EXISTS idx_libros_anio")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_libros_autor_titulo "
+        "ON libros (autor COLLATE NOCASE, titulo, isbn)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_libros_editorial_titulo "
+        "ON libros (editorial COLLATE NOCASE, titulo, isbn)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_libros_anio_editorial "
+        "ON libros (anio, editorial COLLATE NOCASE)"
+    )
+
+def _m012_libros_id(cursor):
+    # libros_fts se enlaza con `libros` por rowid, pero con la clave primaria
+    # TEXT el rowid es implícito y SQLite no promete conservarlo (VACUUM, un
+    # volcado y recarga). Se reconstruye la tabla con `id INTEGER PRIMARY KEY`,
+    # que es alias del rowid y ya no cambia; los id son los rowid actuales.
+    #
+    # DROP TABLE con claves foráneas activas hace un DELETE implícito que
+    # ejemplares rechazaría: se difiere la verificación al COMMIT y, como las
+    # filas vuelven a entrar en `libros` (no por RENAME), quedan satisfechas.
+    cursor.execute("PRAGMA defer_foreign_keys = ON")
+    cursor.execute(
+        "SELECT sql FROM sqlite_master "
+        "WHERE tbl_name = 'libros' AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+    )
+    indices_y_triggers = [fila[0] for fila in cursor.fetchall()]
+    cursor.execute(
+        "CREATE TEMP TABLE _libros_copia AS "
+        "SELECT rowid AS id, isbn, titulo, autor, anio, editorial FROM libros"
+    )
+    cursor.execute("DROP TABLE libros")
+    cursor.execute(
+        """
+        CREATE TABLE libros (
+            id INTEGER PRIMARY KEY,
+            isbn TEXT NOT NULL UNIQUE,
+            titulo TEXT NOT NULL,
+            autor TEXT,
+            anio INTEGER,
+            editorial TEXT
+        );
+        """
+    )
+    # Sin triggers todavía: copiar no es un cambio para cambios_libros ni libros_fts
+    cursor.execute(
+        "INSERT INTO libros (id, isbn, titulo, autor, anio, editorial) "
+        "SELECT id, isbn, titulo, autor, anio, editorial FROM _libros_copia"
+    )
+    cursor.execute("DROP TABLE _libros_copia")
+    for sql in indices_y_triggers:
+        cursor.execute(sql)
+    # Por si el índice ya estaba desfasado (p. ej. un VACUUM que renumeró)
+    cursor.execute("INSERT INTO libros_fts (libros_fts) VALUES ('rebuild')")
+
+MIGRACIONES = [
+    (1, "Tabla libros", _m001_libros),
+    (2, "Tabla usuarios y admin por defecto", _m002_usuarios),
+    (3, "Índice (titulo, isbn)", _m003_indice_titulo),
+    (4, "Búsqueda de texto completo (FTS5)", _m004_texto_completo),
+    (5, "ISBN-13 canónico", _m005_isbn_canonico),
+    (6, "Índices por autor, año y editorial", _m006_indices_filtros),
+    (7, "Registro de cambios de libros", _m007_registro_cambios),
+    (8, "Ejemplares y préstamos", _m008_prestamos),
+    (9, "Sesiones persistentes", _m009_sesiones),
+    (10, "Caché de Google Books", _m010_cache_google_books),
+    (11, "Índices compuestos para filtros y facetas", _m011_indices_filtros_compuestos),
+    (12, "Id entero estable en libros (rowid de libros_fts)", _m012_libros_id),
+]
+
+VERSION_ESQUEMA = MIGRACIONES[-1][0]
+
+#********************************************************************************
+#   ASEGURAR_ESQUEMA - Aplica las migraciones pendientes una vez por proceso
+#********************************************************************************
+
+_listas = set()             # Pools ya verificados en este proceso (uno nuevo, p. ej. tras
+                            # cerrar_pools con el motor en memoria, se vuelve a verificar)
+_lock = threading.Lock()
+_estado = {}                # ruta -> métricas de la inicialización
+
+def asegurar_esquema(ruta=None):
+
+    """
+    Deja la base de datos en VERSION_ESQUEMA. La primera llamada del proceso
+    revisa user_version y aplica lo que falte; las siguientes retornan de
+    inmediato sin tocar la base de datos (p. ej. en cada rerun de Streamlit).
+    """
+    ruta = str(ruta or DB_PATH)
+    pool = obtener_pool(ruta)
+    if pool in _listas:
+        _estado[ruta]["llamadas_omitidas"] += 1
+        return
+
+    with _lock:
+        if pool in _listas:
+            _estado[ruta]["llamadas_omitidas"] += 1
+            return
+
+        inicio = time.perf_counter()
+        aplicadas = []
+        reportes = {}
+        with pool.conexion() as conn:
+            cursor = conn.cursor()
+            version = cursor.execute("PRAGMA user_version").fetchone()[0]
+            if version < VERSION_ESQUEMA:
+                # BEGIN IMMEDIATE toma el bloqueo de escritura: si otro proceso
+                # (otro worker) está migrando, esperamos a que termine y luego
+                # releemos la versión para no repetir su trabajo.
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+                    for numero, descripcion, migracion in MIGRACIONES:
+                        if numero > version:
+                            reporte = migracion(cursor)
+                            if reporte:
+                                reportes[numero] = reporte
+                            cursor.execute(f"PRAGMA user_version = {numero}")
+                            aplicadas.append(f"{numero}: {descripcion}")
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                version = max(version, VERSION_ESQUEMA)
+
+        _estado[ruta] = {
+            "version": version,
+            "migraciones_aplicadas": aplicadas,
+            "reportes": reportes,
+            "inicializacion_ms": (time.perf_counter() - inicio) * 1000,
+            "llamadas_omitidas": 0,
+        }
+        _listas.add(pool)
+
+def estado_esquema(ruta=None):
+
+    """
+    Métricas de asegurar_esquema: cuánto costó la verificación inicial y cuántas
+    llamadas posteriores se la ahorraron (cada una habría costado algo similar).
+    """
+    return _estado.get(str(ruta or DB_PATH))
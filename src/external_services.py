@@ -10,6 +10,8 @@ import requests
 import streamlit as st # type: ignore
 from openai import OpenAI # pyright: ignore[reportMissingImports]
 
+from cache_google_books import clave_consulta, obtener_cache
+
 
 #*****************************************************************************************
 #   GET_OPENAI_API_KEY - Obtiene la clave de la API de OpenAI desde el ambiente 
@@ -183,15 +185,30 @@ GOOGLE_BOOKS_URL="https://www.googleapis.com/books/v1/volumes"
 
 def buscar_en_google_books(isbn=None, titulo=None, autor=None):
     
-    """Consulta Google Books para completar datos. Prioriza ISBN si existe."""
+    """
+    Consulta Google Books para completar datos. Prioriza ISBN si existe.
+    Las respuestas (también los "no encontrado") se guardan en la caché
+    persistente de cache_google_books: volver a escanear un libro conocido
+    no sale a la red.
+    """
+    clave = clave_consulta(isbn, titulo, autor)
+    if clave is None:
+        return None
+    return obtener_cache().obtener(clave, lambda: _consultar_google_books(isbn, titulo, autor))
+
+def _consultar_google_books(isbn=None, titulo=None, autor=None):
+
+    """
+    Petición real a Google Books. Devuelve el dict del libro o None si no hay
+    resultados; los errores de red o HTTP se propagan para que la caché no
+    los guarde como "no encontrado".
+    """
     if isbn:
         q = f"isbn:{isbn}"
     elif titulo and autor:
         q = f'intitle:"{titulo}" inauthor:"{autor}"'
-    elif titulo:
-        q = f'intitle:"{titulo}"'
     else:
-        return None
+        q = f'intitle:"{titulo}"'
 
     # params = {"q": q, "maxResults": 5}
     params = {
@@ -248,8 +265,9 @@ def buscar_en_google_books(isbn=None, titulo=None, autor=None):
         # st.markdown("### 📥 DEBUG - JSON parseado de Google Books")
         # st.json(data)
     
-    except Exception:
-        return None
+    except Exception as e:
+        print("Error al consultar Google Books:", e)
+        raise
 
     
     items = data.get("items")
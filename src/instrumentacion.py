@@ -0,0 +1,321 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import logging
+import re
+import sqlite3
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+
+from pathlib import Path
+
+# Ruta absoluta a la raíz del proyecto (donde está config.py)
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Aseguramos que la raíz esté en sys.path
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from config import CONSULTA_LENTA_MS, CONSULTAS_LENTAS_LOG, CONSULTAS_LENTAS_MAX
+
+#********************************************************************************
+#   HISTOGRAMA - Conteo de duraciones por rangos fijos (en ms)
+#********************************************************************************
+
+LIMITES_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class Histograma:
+
+    """
+    Rangos fijos: sumar una muestra es O(log n) y la memoria no crece con
+    las llamadas. Los percentiles son aproximados (límite superior del rango).
+    """
+
+    def __init__(self):
+        self.conteos = [0] * (len(LIMITES_MS) + 1)    # El último: más de 5 s
+        self.llamadas = 0
+        self.total_ms = 0.0
+        self.maximo_ms = 0.0
+        self.filas = 0
+
+    def agregar(self, ms, filas):
+        self.conteos[bisect_left(LIMITES_MS, ms)] += 1
+        self.llamadas += 1
+        self.total_ms += ms
+        if ms > self.maximo_ms:
+            self.maximo_ms = ms
+        if filas > 0:
+            self.filas += filas
+
+    def percentil(self, p):
+        if not self.llamadas:
+            return 0.0
+        objetivo = p * self.llamadas
+        acumulado = 0
+        for i, conteo in enumerate(self.conteos):
+            acumulado += conteo
+            if acumulado >= objetivo:
+                return LIMITES_MS[i] if i < len(LIMITES_MS) else self.maximo_ms
+        return self.maximo_ms
+
+#********************************************************************************
+#   REGISTRO - Histogramas por sitio de llamada y bitácora de consultas lentas
+#********************************************************************************
+
+_lock = threading.Lock()
+_histogramas = {}       # (sitio, sql) -> Histograma
+_lentas = deque(maxlen=CONSULTAS_LENTAS_MAX)
+_bitacora = None
+umbral_lenta_ms = CONSULTA_LENTA_MS     # Se puede cambiar en caliente
+
+_ESPACIOS = re.compile(r"\s+")
+_LISTAS = re.compile(r"\?(?:\s*,\s*\?)+")      # IN (?, ?, ?) de largo variable
+_textos = {}                                    # sql -> texto normalizado
+_SIN_PLAN = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "PRAGMA", "EXPLAIN")
+_MODULOS_INTERNOS = {__name__, "database", "contextlib", "threading", "concurrent.futures.thread"}
+
+def _sitio():
+    # Primera función fuera de esta capa y del pool: "crud_libros.buscar_libro:187"
+    marco = sys._getframe(2)
+    while marco is not None:
+        modulo = marco.f_globals.get("__name__", "")
+        if modulo not in _MODULOS_INTERNOS:
+            return f"{modulo}.{marco.f_code.co_name}", marco.f_lineno
+        marco = marco.f_back
+    return "?", 0
+
+def _logger():
+    global _bitacora
+    if _bitacora is None:
+        _bitacora = logging.getLogger("biblioteca.consultas_lentas")
+        if CONSULTAS_LENTAS_LOG and not _bitacora.handlers:
+            Path(CONSULTAS_LENTAS_LOG).parent.mkdir(parents=True, exist_ok=True)
+            manejador = logging.FileHandler(CONSULTAS_LENTAS_LOG, encoding="utf-8")
+            manejador.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            _bitacora.addHandler(manejador)
+            _bitacora.setLevel(logging.INFO)
+            _bitacora.propagate = False
+    return _bitacora
+
+def _plan(conn, sql, params):
+    if sql.lstrip().upper().startswith(_SIN_PLAN):
+        return []
+    if params is None:
+        return ["(executemany: plan no capturado)"]
+    try:
+        return [fila[3] for fila in sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, params)]
+    except sqlite3.Error as error:
+        return [f"(sin plan: {error})"]
+
+def _normalizar(sql):
+    texto = _textos.get(sql)
+    if texto is None:
+        texto = _LISTAS.sub("?, …", _ESPACIOS.sub(" ", sql).strip())
+        if len(_textos) < 2000:
+            _textos[sql] = texto
+    return texto
+
+def _registrar(conn, sql, params, ms, filas, sitio, plan=None):
+
+    """
+    `plan` ya capturado o, si no lo hay, se pide a `conn` en este momento.
+    Con conn=None (la medición la cierra el recolector de basura, cuando la
+    conexión quizá ya volvió al pool) la consulta lenta queda sin plan.
+    """
+    texto = _textos.get(sql) or _normalizar(sql)
+    clave = (sitio[0], texto)
+    with _lock:
+        histograma = _histogramas.get(clave)
+        if histograma is None:
+            histograma = _histogramas[clave] = Histograma()
+        histograma.agregar(ms, filas)
+
+    if ms >= umbral_lenta_ms:
+        if plan is None:
+            plan = _plan(conn, sql, params) if conn is not None else ["(plan no capturado: cursor sin cerrar)"]
+        lenta = {
+            "momento": datetime.now().isoformat(timespec="seconds"),
+            "sitio": f"{sitio[0]}:{sitio[1]}",
+            "ms": round(ms, 3),
+            "filas": filas,
+            "sql": texto,
+            "plan": plan,
+        }
+        _lentas.append(lenta)
+        _logger().info(
+            "%.1f ms %s filas=%s | %s | plan: %s",
+            ms, lenta["sitio"], filas, texto, " / ".join(lenta["plan"]),
+        )
+
+#********************************************************************************
+#   CONEXION / CURSOR INSTRUMENTADOS - Se usan como factory de sqlite3.connect
+#********************************************************************************
+
+class CursorInstrumentado(sqlite3.Cursor):
+
+    """
+    Mide cada sentencia desde execute hasta que se terminan de leer sus filas
+    (SQLite calcula las filas de un SELECT a medida que se piden). La
+    medición se cierra al agotar el resultado, al ejecutar otra sentencia en
+    el mismo cursor o al cerrarlo.
+
+    El plan de una consulta lenta se pide siempre en el hilo que la ejecuta,
+    mientras tiene la conexión: en execute si ya ahí pasó el umbral, o al
+    cerrar la medición. Nunca desde __del__.
+    """
+
+    _pendiente = None   # [sql, params, ms, filas, sitio, plan]
+
+    def _cerrar_medicion(self, conn=None):
+        pendiente, self._pendiente = self._pendiente, None
+        if pendiente is not None:
+            _registrar(conn, *pendiente)
+
+    def _medir(self, metodo, sql, params, sitio):
+        self._cerrar_medicion(self.connection)
+        inicio = time.perf_counter()
+        try:
+            metodo(sql, params)
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+        if self.description is None:
+            # Sin filas que leer (INSERT/UPDATE/DELETE/DDL): queda medida ya
+            _registrar(self.connection, sql, params, ms, self.rowcount, sitio)
+        else:
+            plan = _plan(self.connection, sql, params) if ms >= umbral_lenta_ms else None
+            self._pendiente = [sql, params, ms, 0, sitio, plan]
+        return self
+
+    def execute(self, sql, params=()):
+        return self._medir(super().execute, sql, params, _sitio())
+
+    def executemany(self, sql, filas):
+        self._cerrar_medicion(self.connection)
+        inicio = time.perf_counter()
+        try:
+            super().executemany(sql, filas)
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+        # `filas` puede ser un generador ya consumido: no se guarda para el plan
+        _registrar(self.connection, sql, None, ms, self.rowcount, _sitio())
+        return self
+
+    def _leer(self, metodo, *args):
+        inicio = time.perf_counter()
+        resultado = metodo(*args)
+        pendiente = self._pendiente
+        if pendiente is not None:
+            pendiente[2] += (time.perf_counter() - inicio) * 1000
+            return resultado, pendiente
+        return resultado, None
+
+    def fetchone(self):
+        fila, pendiente = self._leer(super().fetchone)
+        if pendiente is not None:
+            if fila is None:
+                self._cerrar_medicion(self.connection)
+            else:
+                pendiente[3] += 1
+        return fila
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        filas, pendiente = self._leer(super().fetchmany, size)
+        if pendiente is not None:
+            pendiente[3] += len(filas)
+            if len(filas) < size:
+                self._cerrar_medicion(self.connection)
+        return filas
+
+    def fetchall(self):
+        filas, pendiente = self._leer(super().fetchall)
+        if pendiente is not None:
+            pendiente[3] += len(filas)
+            self._cerrar_medicion(self.connection)
+        return filas
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        fila = self.fetchone()
+        if fila is None:
+            raise StopIteration
+        return fila
+
+    def close(self):
+        self._cerrar_medicion(self.connection)
+        super().close()
+
+    def __del__(self):
+        # Resultado leído a medias (p. ej. fetchone de un solo libro): se
+        # registra el tiempo sin tocar la conexión, que puede ser de otro hilo
+        if self._pendiente is not None:
+            try:
+                self._cerrar_medicion()
+            except Exception:
+                pass
+
+class ConexionInstrumentada(sqlite3.Connection):
+
+    def cursor(self, factory=CursorInstrumentado):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, filas):
+        return self.cursor().executemany(sql, filas)
+
+    def commit(self):
+        inicio = time.perf_counter()
+        super().commit()
+        _registrar(self, "COMMIT", (), (time.perf_counter() - inicio) * 1000, -1, _sitio())
+
+#********************************************************************************
+#   ESTADISTICAS_CONSULTAS - Lo que ven los llamadores de Python y el panel
+#********************************************************************************
+
+def estadisticas_consultas():
+
+    """
+    Una entrada por (sitio de llamada, sentencia), de la más costosa en tiempo
+    total a la menos: llamadas, filas, total/media/p50/p95/p99/máx en ms y el
+    histograma {"<= límite ms": llamadas}.
+    """
+    with _lock:
+        elementos = list(_histogramas.items())
+        resultado = []
+        for (sitio, sql), h in elementos:
+            resultado.append({
+                "sitio": sitio,
+                "sql": sql,
+                "llamadas": h.llamadas,
+                "filas": h.filas,
+                "total_ms": round(h.total_ms, 3),
+                "media_ms": round(h.total_ms / h.llamadas, 4) if h.llamadas else 0.0,
+                "p50_ms": h.percentil(0.50),
+                "p95_ms": h.percentil(0.95),
+                "p99_ms": h.percentil(0.99),
+                "max_ms": round(h.maximo_ms, 3),
+                "histograma": {
+                    (f"<= {LIMITES_MS[i]} ms" if i < len(LIMITES_MS) else f"> {LIMITES_MS[-1]} ms"): n
+                    for i, n in enumerate(h.conteos) if n
+                },
+            })
+    resultado.sort(key=lambda e: -e["total_ms"])
+    return resultado
+
+def consultas_lentas():
+    """Las últimas consultas que superaron el umbral, de la más reciente a la más vieja."""
+    return list(reversed(_lentas))
+
+def reiniciar_estadisticas():
+    with _lock:
+        _histogramas.clear()
+        _lentas.clear()
@@ -0,0 +1,52 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import re
+
+#********************************************************************************
+#   VALIDACION DE ISBN - Dígitos de control de ISBN-10 e ISBN-13
+#********************************************************************************
+
+def _limpiar(valor) -> str:
+    # Deja solo dígitos y X, igual que limpiar_isbn en external_services.py
+    return re.sub(r"[^0-9X]", "", str(valor or "").upper())
+
+def es_isbn10_valido(isbn: str) -> bool:
+    if not re.fullmatch(r"[0-9]{9}[0-9X]", isbn):
+        return False
+    total = sum((10 - i) * int(d) for i, d in enumerate(isbn[:9]))
+    total += 10 if isbn[9] == "X" else int(isbn[9])
+    return total % 11 == 0
+
+def es_isbn13_valido(isbn: str) -> bool:
+    if not re.fullmatch(r"[0-9]{13}", isbn):
+        return False
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(isbn))
+    return total % 10 == 0
+
+def _digito_control_13(primeros12: str) -> str:
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(primeros12))
+    return str((10 - total % 10) % 10)
+
+#********************************************************************************
+#   NORMALIZAR_ISBN - Devuelve la forma canónica ISBN-13 de un ISBN-10 o ISBN-13
+#                     (con o sin guiones), o "" si no es un ISBN válido
+#********************************************************************************
+
+def normalizar_isbn(valor) -> str:
+    isbn = _limpiar(valor)
+    if len(isbn) == 13 and es_isbn13_valido(isbn):
+        return isbn
+    if len(isbn) == 10 and es_isbn10_valido(isbn):
+        base = "978" + isbn[:9]
+        return base + _digito_control_13(base)
+    return ""
+
+def clave_isbn(valor) -> str:
+
+    """
+    Clave de búsqueda: el ISBN-13 canónico si es válido; si no, el texto tal cual
+    (sin espacios) para seguir encontrando registros antiguos no normalizables.
+    """
+    return normalizar_isbn(valor) or str(valor or "").strip()
@@ -0,0 +1,137 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import threading
+import time
+from collections import OrderedDict
+
+#********************************************************************************
+#   LIMITADOR_INTENTOS - Cubeta de fichas por clave (usuario o cliente) con
+#                        bloqueo exponencial tras fallos seguidos
+#********************************************************************************
+
+class LimitadorIntentos:
+
+    """
+    Cada clave tiene una cubeta de `capacidad` fichas que se rellena a razón
+    de una cada `recarga_s` segundos; cada intento gasta una. Sin fichas, el
+    intento se rechaza sin hacer nada costoso.
+
+    Además, tras `fallos_bloqueo` fallos seguidos la clave queda bloqueada
+    `bloqueo_base_s` segundos, y el tiempo se duplica con cada fallo posterior
+    (hasta `bloqueo_max_s`). Un éxito reinicia los fallos.
+
+    Guarda a lo más `max_claves` claves; al llenarse olvida la menos reciente.
+    """
+
+    def __init__(self, capacidad, recarga_s, fallos_bloqueo, bloqueo_base_s, bloqueo_max_s,
+                 max_claves=100000):
+        self.capacidad = capacidad
+        self.recarga_s = recarga_s
+        self.fallos_bloqueo = fallos_bloqueo
+        self.bloqueo_base_s = bloqueo_base_s
+        self.bloqueo_max_s = bloqueo_max_s
+        self.max_claves = max_claves
+        self._estado = OrderedDict()    # clave -> [fichas, actualizado, fallos, bloqueado_hasta]
+        self._lock = threading.Lock()
+
+        # Contadores
+        self._permitidos = 0
+        self._rechazados = 0
+        self._bloqueos = 0
+
+    def _entrada(self, clave, ahora):
+        entrada = self._estado.get(clave)
+        if entrada is None:
+            entrada = self._estado[clave] = [float(self.capacidad), ahora, 0, 0.0]
+            while len(self._estado) > self.max_claves:
+                self._estado.popitem(last=False)
+        else:
+            self._estado.move_to_end(clave)
+            entrada[0] = min(self.capacidad, entrada[0] + (ahora - entrada[1]) / self.recarga_s)
+            entrada[1] = ahora
+        return entrada
+
+    def espera(self, clave):
+        """
+        Segundos que faltan para poder intentar (0 = se puede). No gasta ficha;
+        si hay que esperar, cuenta como intento rechazado.
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entrada(clave, ahora)
+            espera = self._espera(entrada, ahora)
+            if espera:
+                self._rechazados += 1
+            return espera
+
+    def _espera(self, entrada, ahora):
+        if entrada[3] > ahora:
+            return entrada[3] - ahora
+        if entrada[0] < 1:
+            return (1 - entrada[0]) * self.recarga_s
+        return 0.0
+
+    def consumir(self, clave):
+        """Gasta una ficha. Devuelve 0 si el intento puede seguir o los segundos a esperar."""
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entrada(clave, ahora)
+            espera = self._espera(entrada, ahora)
+            if espera:
+                self._rechazados += 1
+                return espera
+            entrada[0] -= 1
+            self._permitidos += 1
+            return 0.0
+
+    def devolver(self, clave):
+        """Reintegra una ficha gastada en un intento que al final no se hizo."""
+        with self._lock:
+            entrada = self._estado.get(clave)
+            if entrada is not None:
+                entrada[0] = min(self.capacidad, entrada[0] + 1)
+                self._permitidos -= 1
+                self._rechazados += 1
+
+    def fallo(self, clave):
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entrada(clave, ahora)
+            entrada[2] += 1
+            exceso = entrada[2] - self.fallos_bloqueo
+            if exceso >= 0:
+                duracion = min(self.bloqueo_max_s, self.bloqueo_base_s * 2 ** min(exceso, 32))
+                entrada[3] = ahora + duracion
+                self._bloqueos += 1
+
+    def exito(self, clave):
+        with self._lock:
+            entrada = self._estado.get(clave)
+            if entrada is not None:
+                entrada[2] = 0
+                entrada[3] = 0.0
+
+    def limpiar(self):
+        """Olvida todas las claves (fichas, fallos y bloqueos); los contadores siguen."""
+        with self._lock:
+            self._estado.clear()
+
+    def bloqueadas(self):
+        """[(clave, segundos_restantes, fallos)] de las claves bloqueadas ahora."""
+        ahora = time.monotonic()
+        with self._lock:
+            return sorted(
+                ((clave, e[3] - ahora, e[2]) for clave, e in self._estado.items() if e[3] > ahora),
+                key=lambda fila: -fila[1],
+            )
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "claves": len(self._estado),
+                "permitidos": self._permitidos,
+                "rechazados": self._rechazados,
+                "bloqueos": self._bloqueos,
+            }
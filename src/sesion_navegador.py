@@ -0,0 +1,96 @@
+#********************************************************************************
+#   LIBRERIAS
+#********************************************************************************
+
+import json
+
+import streamlit as st # type: ignore
+import streamlit.components.v1 as components # type: ignore
+
+from pathlib import Path
+import sys
+
+# Ruta absoluta a la raíz del proyecto (donde está config.py)
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Aseguramos que la raíz esté en sys.path
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from config import SESION_COOKIE, SESION_DIAS
+from crud_usuarios import crear_sesion, validar_sesion, revocar_sesion
+
+#********************************************************************************
+#   SESION_NAVEGADOR - "Mantener sesión iniciada": el token vive en una cookie
+#                      del navegador, nunca en la URL (la URL queda en el
+#                      historial, los marcadores, los logs de proxies y el
+#                      Referer).
+#
+#   Streamlit solo deja leer cookies (st.context.cookies, tal como llegaron al
+#   abrir la página); se escriben con un componente HTML que corre en el
+#   navegador. Por eso la cookie no puede ser HttpOnly: va con SameSite=Strict,
+#   Secure bajo https y vence con la sesión (SESION_DIAS).
+#
+#   Como esas cookies no se actualizan hasta recargar, el token de la sesión
+#   en curso (creado al entrar o restaurado de la cookie) se guarda también
+#   en session_state: es el que se revoca al cerrar sesión.
+#
+#   La escritura de la cookie queda pendiente en session_state y se aplica en
+#   el siguiente rerun (aplicar_cookie): lo que se dibuja justo antes de
+#   st.rerun() no alcanza a ejecutarse en el navegador.
+#********************************************************************************
+
+_TOKEN = "_token_sesion"
+_PENDIENTE = "_cookie_sesion_pendiente"
+
+def _cookie():
+    try:
+        return st.context.cookies.get(SESION_COOKIE) or None
+    except Exception:
+        return None
+
+def _escribir_cookie(valor, max_age):
+    st.session_state[_PENDIENTE] = (valor, max_age)
+
+def recordar(username):
+    """Crea la sesión persistente del usuario recién autenticado y la deja en la cookie."""
+    token = crear_sesion(username)
+    if token:
+        st.session_state[_TOKEN] = token
+        _escribir_cookie(token, SESION_DIAS * 86400)
+    return token is not None
+
+def restaurar():
+    """Username de la sesión guardada en la cookie (sin bcrypt, solo un HMAC), o None."""
+    token = _cookie()
+    if not token:
+        return None
+    username = validar_sesion(token)
+    if username:
+        st.session_state[_TOKEN] = token
+    else:
+        _escribir_cookie("", 0)
+    return username
+
+def cerrar():
+    """Revoca la sesión persistente en curso y borra la cookie, haya o no token."""
+    token = st.session_state.pop(_TOKEN, None) or _cookie()
+    if token:
+        revocar_sesion(token)
+    _escribir_cookie("", 0)
+
+def aplicar_cookie():
+    pendiente = st.session_state.pop(_PENDIENTE, None)
+    if pendiente is None:
+        return
+    valor, max_age = pendiente
+    components.html(
+        f"""
+        <script>
+        const seguro = window.parent.location.protocol === "https:" ? "; Secure" : "";
+        window.parent.document.cookie = {json.dumps(SESION_COOKIE)} + "=" + {json.dumps(valor)}
+            + "; Max-Age={int(max_age)}; Path=/; SameSite=Strict" + seguro;
+        </script>
+        """,
+        height=0,
+    )
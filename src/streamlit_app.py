@@ -14,23 +14,50 @@ ROOT_DIR = Path(__file__).resolve().parent.parent
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from config import asset_path, DB_PATH
+from config import asset_path, DB_PATH, INSTRUMENTAR_CONSULTAS
 
 
 from crud_libros import (
-    init_db,
     insertar_libro,
     buscar_libro,
+    buscar_texto,
     actualizar_libro,
     eliminar_libro,
     obtener_todos,
+    obtener_pagina,
+    exportar_libros,
+    actualizar_libros_batch,
+    eliminar_libros_batch,
+    estadisticas_cache_libros,
+    estadisticas_escritura,
 )
 from crud_usuarios import (
-    init_users_table,
     create_user,
     verify_user,
+    clave_cliente,
+    estadisticas_hash,
+    estadisticas_login,
+    estadisticas_sesiones,
+    crear_usuarios_batch,
+    leer_csv_usuarios,
 )
 from external_services import identificar_libro_por_imagen
+from esquema import asegurar_esquema, estado_esquema
+from catalogo_memoria import obtener_catalogo
+from autocompletar import sugerir
+from duplicados import posibles_duplicados
+from crud_prestamos import (
+    agregar_ejemplares,
+    disponibilidad,
+    prestar,
+    devolver,
+    prestamos_de_usuario,
+    prestamos_vencidos,
+)
+from database import estadisticas_pools
+from cache_google_books import estadisticas_cache_google_books
+import instrumentacion
+import sesion_navegador
 
 
 #********************************************************************************
@@ -230,15 +257,19 @@ def pantalla_login():
 
             col1, col2 = st.columns([3, 2])
             with col1:
-                recordar = st.checkbox("Mantener sesión iniciada", value=True)
+                recordar = st.checkbox("Mantener sesión iniciada", value=False)
             with col2:
                 st.write("")  # espacio
 
             if st.button("Ingresar", key="btn_login"):
-                ok, msg = verify_user(user, pwd)
+                ok, msg = verify_user(user, pwd, cliente=_cliente())
                 if ok:
                     st.session_state.logged_in = True
                     st.session_state.username = (user or "").strip().lower()
+                    if recordar:
+                        # El token queda en una cookie: al volver (o tras
+                        # reiniciar el servidor) no se pide la contraseña
+                        sesion_navegador.recordar(st.session_state.username)
                     st.success(f"Bienvenido, {st.session_state.username}")
                     st.rerun()
                 else:
@@ -272,7 +303,27 @@ def pantalla_login():
 
 
 
+def _cliente():
+    # IP del navegador, para limitar intentos de login por origen
+    try:
+        contexto = st.context
+        return clave_cliente(
+            getattr(contexto, "ip_address", None), contexto.headers.get("X-Forwarded-For")
+        )
+    except Exception:
+        return None
+
+
+def restaurar_sesion():
+    # Sesión guardada con "Mantener sesión iniciada"
+    username = sesion_navegador.restaurar()
+    if username:
+        st.session_state.logged_in = True
+        st.session_state.username = username
+
+
 def cerrar_sesion():
+    sesion_navegador.cerrar()
     st.session_state.logged_in = False
     st.session_state.username = None
     for k in [
@@ -283,6 +334,10 @@ def cerrar_sesion():
         "edit_editorial",
         "scan_data",
         "scan_image_hash",
+        "todos_pagina",
+        "todos_num",
+        "todos_clave",
+        "buscar_texto",
     ]:
         st.session_state.pop(k, None)
     st.success("Sesión cerrada.")
@@ -291,22 +346,28 @@ def cerrar_sesion():
 
 # ================== MENÚ PRINCIPAL ==================
 
+def es_admin():
+    return st.session_state.username == "admin"
+
+
 def menu_principal():
 
     
     st.sidebar.title(f"Usuario: {st.session_state.username}")
-    opcion = st.sidebar.selectbox(
-        "Menú",
-        (
-            "Buscar libro por ISBN",
-            "Registrar libro",
-            "Actualizar libro por ISBN",
-            "Eliminar libro por ISBN",
-            "Ver todos los libros",
-            "Escanear libro con cámara (IA)",
-            "Cerrar sesión",
-        ),
-    )
+    opciones = [
+        "Buscar libro por ISBN",
+        "Buscar libro por título o autor",
+        "Registrar libro",
+        "Actualizar libro por ISBN",
+        "Eliminar libro por ISBN",
+        "Ver todos los libros",
+        "Escanear libro con cámara (IA)",
+        "Préstamos y devoluciones",
+    ]
+    if es_admin():
+        opciones.append("Panel de administración")
+    opciones.append("Cerrar sesión")
+    opcion = st.sidebar.selectbox("Menú", opciones)
    
 
     return opcion
@@ -333,6 +394,72 @@ def vista_buscar():
                 st.error("No se encontró un libro con ese ISBN.")
 
 
+def _elegir_sugerencia(texto):
+    # Callback: corre antes del rerun, así podemos cambiar el valor del cuadro
+    st.session_state.buscar_texto = texto
+    st.session_state.buscar_ahora = True
+
+
+def vista_buscar_texto():
+    st.header("🔎 Buscar libro por título o autor")
+    texto = st.text_input("Palabras del título, autor o editorial", key="buscar_texto")
+
+    # Autocompletado: sugerencias de títulos y autores según lo escrito
+    sugerencias = sugerir(texto) if texto.strip() else []
+    if sugerencias:
+        st.caption("Sugerencias:")
+        columnas = st.columns(2)
+        for i, (sugerencia, tipo, libros) in enumerate(sugerencias):
+            icono = "📖" if tipo == "titulo" else "👤"
+            columnas[i % 2].button(
+                f"{icono} {sugerencia} ({libros})",
+                key=f"sugerencia_{i}",
+                on_click=_elegir_sugerencia,
+                args=(sugerencia,),
+                use_container_width=True,
+            )
+
+    buscar = st.button("Buscar", key="btn_buscar_texto")
+    if st.session_state.pop("buscar_ahora", False) or buscar:
+        if not texto.strip():
+            st.warning("Ingresa al menos una palabra.")
+        else:
+            data = buscar_texto(texto, limit=50)
+            if not data:
+                st.error("No se encontraron libros con esas palabras.")
+            else:
+                st.success(f"{len(data)} libro(s) encontrado(s):")
+                st.dataframe(
+                    {
+                        "ISBN": [d[0] for d in data],
+                        "Título": [d[1] for d in data],
+                        "Autor": [d[2] for d in data],
+                        "Año": [d[3] for d in data],
+                        "Editorial": [d[4] for d in data],
+                    },
+                    use_container_width=True
+                )
+
+
+def _aviso_duplicados(isbn, titulo, autor, clave):
+    """Muestra los libros parecidos ya registrados; devuelve True si se puede guardar."""
+    parecidos = posibles_duplicados(titulo, autor, isbn=isbn) if titulo.strip() else []
+    if not parecidos:
+        return True
+    st.warning("⚠️ Este libro se parece a otros que ya están en la biblioteca:")
+    st.dataframe(
+        {
+            "Similitud": [f"{p:.0%}" for p, _ in parecidos],
+            "ISBN": [l[0] for _, l in parecidos],
+            "Título": [l[1] for _, l in parecidos],
+            "Autor": [l[2] for _, l in parecidos],
+            "Año": [l[3] for _, l in parecidos],
+        },
+        use_container_width=True
+    )
+    return st.checkbox("Es un libro distinto, guardarlo de todos modos", key=clave)
+
+
 def vista_registrar():
     st.header("📕 Registrar nuevo libro")
     isbn = st.text_input("ISBN")
@@ -340,10 +467,13 @@ def vista_registrar():
     autor = st.text_input("Autor")
     anio = st.number_input("Año", min_value=0, max_value=9999, step=1)
     editorial = st.text_input("Editorial")
+    confirmado = _aviso_duplicados(isbn.strip(), titulo, autor, "reg_confirmar_duplicado")
 
     if st.button("Guardar libro"):
         if not titulo.strip():
             st.warning("El título es obligatorio.")
+        elif not confirmado:
+            st.error("Revisa los posibles duplicados antes de guardar.")
         else:
             ok, msg = insertar_libro(
                 isbn.strip(),
@@ -440,22 +570,168 @@ def vista_eliminar():
                 st.error(msg)
 
 
+LIBROS_POR_PAGINA = 50
+
+def _tabla_libros(data):
+    st.dataframe(
+        {
+            "ISBN": [d[0] for d in data],
+            "Título": [d[1] for d in data],
+            "Autor": [d[2] for d in data],
+            "Año": [d[3] for d in data],
+            "Editorial": [d[4] for d in data],
+        },
+        use_container_width=True
+    )
+
+
+def _pagina_desde_memoria(catalogo):
+    # Lista, ordena y filtra sobre el catálogo en memoria compartido
+    ordenes = {"Título": "titulo", "Autor": "autor", "Año": "anio", "Editorial": "editorial", "ISBN": "isbn"}
+    col1, col2, col3 = st.columns([3, 2, 1])
+    with col1:
+        texto = st.text_input("Filtrar por título, autor o editorial", key="todos_filtro")
+    with col2:
+        orden = st.selectbox("Ordenar por", list(ordenes), key="todos_orden")
+    with col3:
+        descendente = st.checkbox("Desc.", key="todos_desc")
+
+    # Si cambia el filtro o el orden volvemos a la primera página
+    clave = (texto, orden, descendente)
+    if st.session_state.get("todos_clave") != clave:
+        st.session_state.todos_clave = clave
+        st.session_state.todos_num = 1
+    numero = st.session_state.get("todos_num", 1)
+
+    data, total = catalogo.consultar(
+        orden=ordenes[orden], descendente=descendente, texto=texto,
+        pagina=numero, tamano=LIBROS_POR_PAGINA,
+    )
+    paginas = max((total + LIBROS_POR_PAGINA - 1) // LIBROS_POR_PAGINA, 1)
+    if not data and numero > 1:
+        st.session_state.todos_num = 1
+        st.rerun()
+    if not data:
+        return data
+
+    _tabla_libros(data)
+    col1, col2, col3 = st.columns([1, 1, 1])
+    with col1:
+        if st.button("⬅️ Anterior", key="todos_anterior", disabled=numero <= 1):
+            st.session_state.todos_num = numero - 1
+            st.rerun()
+    with col2:
+        st.caption(f"Página {numero} de {paginas} · {total} libro(s)")
+    with col3:
+        if st.button("Siguiente ➡️", key="todos_siguiente", disabled=numero >= paginas):
+            st.session_state.todos_num = numero + 1
+            st.rerun()
+    return data
+
+
+def _pagina_desde_bd():
+    # Catálogo demasiado grande para memoria: solo se consulta la página visible
+    # y el cursor (titulo, isbn) vive en la sesión
+    if "todos_pagina" not in st.session_state:
+        st.session_state.todos_pagina = {"despues": None, "antes": None, "numero": 1}
+    nav = st.session_state.todos_pagina
+
+    data, siguiente, anterior = obtener_pagina(
+        LIBROS_POR_PAGINA, despues=nav["despues"], antes=nav["antes"]
+    )
+    if not data and nav["numero"] > 1:
+        # La página quedó vacía (p. ej. se eliminaron libros): volvemos al inicio
+        st.session_state.todos_pagina = {"despues": None, "antes": None, "numero": 1}
+        st.rerun()
+    if not data:
+        return data
+
+    _tabla_libros(data)
+    col1, col2, col3 = st.columns([1, 1, 1])
+    with col1:
+        if st.button("⬅️ Anterior", key="todos_anterior", disabled=anterior is None):
+            st.session_state.todos_pagina = {
+                "despues": None, "antes": anterior, "numero": nav["numero"] - 1
+            }
+            st.rerun()
+    with col2:
+        st.caption(f"Página {nav['numero']}")
+    with col3:
+        if st.button("Siguiente ➡️", key="todos_siguiente", disabled=siguiente is None):
+            st.session_state.todos_pagina = {
+                "despues": siguiente, "antes": None, "numero": nav["numero"] + 1
+            }
+            st.rerun()
+    return data
+
+
 def vista_todos():
     st.header("📚 Listado de todos los libros")
-    data = obtener_todos()
+
+    if st.session_state.get("todos_mensaje"):
+        st.success(st.session_state.pop("todos_mensaje"))
+
+    catalogo = obtener_catalogo()
+    if catalogo.disponible():
+        data = _pagina_desde_memoria(catalogo)
+    else:
+        data = _pagina_desde_bd()
+
     if not data:
         st.info("No hay libros registrados.")
     else:
-        st.dataframe(
-            {
-                "ISBN": [d[0] for d in data],
-                "Título": [d[1] for d in data],
-                "Autor": [d[2] for d in data],
-                "Año": [d[3] for d in data],
-                "Editorial": [d[4] for d in data],
-            },
-            use_container_width=True
-        )
+        with st.expander("🗂️ Editar o eliminar varios libros"):
+            seleccion = st.multiselect(
+                "Libros de esta página",
+                [d[0] for d in data],
+                format_func=lambda isbn: f"{isbn} · {next(d[1] for d in data if d[0] == isbn)}",
+                key="todos_seleccion",
+            )
+            campos = {"Autor": "autor", "Editorial": "editorial", "Año": "anio"}
+            campo = st.selectbox("Campo a cambiar", list(campos), key="lote_campo")
+            if campo == "Año":
+                valor = st.number_input("Nuevo valor", min_value=0, max_value=9999, step=1, key="lote_anio")
+            else:
+                valor = st.text_input("Nuevo valor", key="lote_valor")
+
+            col1, col2 = st.columns(2)
+            with col1:
+                aplicar = st.button("Aplicar a seleccionados", key="btn_lote_actualizar")
+            with col2:
+                borrar = st.button("Eliminar seleccionados", key="btn_lote_eliminar")
+
+            if (aplicar or borrar) and not seleccion:
+                st.warning("Selecciona al menos un libro.")
+            elif aplicar or borrar:
+                if aplicar:
+                    resultados = actualizar_libros_batch(seleccion, cambios={campos[campo]: valor})
+                    accion = "actualizado(s)"
+                else:
+                    resultados = eliminar_libros_batch(seleccion)
+                    accion = "eliminado(s)"
+                ok = sum(1 for exito, _ in resultados.values() if exito)
+                # Mensaje persistente tras el rerun, igual que en el escáner
+                st.session_state.todos_mensaje = f"{ok} de {len(resultados)} libro(s) {accion}."
+                st.session_state.pop("todos_seleccion", None)
+                st.rerun()
+
+        with st.expander("⬇️ Exportar catálogo"):
+            formato = st.selectbox("Formato", ("csv", "jsonl"), key="exp_formato")
+            comprimir = st.checkbox("Comprimir (gzip)", key="exp_gzip")
+            st.caption(
+                "La descarga se arma en memoria (Streamlit la guarda completa para "
+                "servirla). Para catálogos grandes: python src/crud_libros.py exportar catalogo.csv.gz"
+            )
+            if st.button("Preparar archivo", key="btn_exportar"):
+                # Solo al pedirlo: cada rerun no vuelve a exportar el catálogo
+                datos = b"".join(exportar_libros(formato, comprimir))
+                nombre = f"catalogo.{formato}" + (".gz" if comprimir else "")
+                st.download_button(
+                    "Descargar " + nombre,
+                    data=datos,
+                    file_name=nombre,
+                    mime="application/gzip" if comprimir else "text/plain",
+                )
 
 
 # ================== VISTA: ESCANEAR LIBRO CON IA ==================
@@ -825,10 +1101,13 @@ def vista_escanear_libro():
         # =============================================================
 
         # ===== BOTÓN GUARDAR =====
+        confirmado = _aviso_duplicados(isbn.strip(), titulo, autor, "scan_confirmar_duplicado")
         st.markdown("<div class='scan-center-btn'>", unsafe_allow_html=True)
         if st.button("💾 Guardar libro en biblioteca", key="btn_guardar_libro"):
             if not titulo.strip():
                 st.warning("El título es obligatorio.")
+            elif not confirmado:
+                st.error("Revisa los posibles duplicados antes de guardar.")
             else:
                 ok, msg = insertar_libro(
                     isbn.strip(),
@@ -856,16 +1135,228 @@ def vista_escanear_libro():
     st.markdown("</div></div>", unsafe_allow_html=True)
 
 
+# ================== PRÉSTAMOS ==================
+
+def _mostrar_resultado(ok, msg):
+    if ok:
+        st.success(msg)
+    else:
+        st.error(msg)
+
+def vista_prestamos():
+    st.header("📖 Préstamos y devoluciones")
+    tab_prestar, tab_devolver, tab_ejemplares, tab_vencidos = st.tabs(
+        ["Prestar", "Devolver", "Ejemplares", "Vencidos"]
+    )
+
+    with tab_prestar:
+        usuario = st.text_input("Usuario", key="prestamo_usuario")
+        isbn = st.text_input("ISBN (cualquier ejemplar libre)", key="prestamo_isbn")
+        ejemplar = st.number_input(
+            "…o número de ejemplar (0 = cualquiera)", min_value=0, step=1, key="prestamo_ejemplar"
+        )
+        if st.button("Registrar préstamo"):
+            if not usuario.strip():
+                st.warning("Ingresa el usuario.")
+            else:
+                _mostrar_resultado(*prestar(
+                    usuario.strip(),
+                    isbn=isbn.strip() or None,
+                    ejemplar_id=int(ejemplar) or None,
+                ))
+        if usuario.strip():
+            activos = prestamos_de_usuario(usuario.strip())
+            if activos:
+                st.write(f"Préstamos activos de **{usuario.strip()}**:")
+                st.dataframe(
+                    {
+                        "Ejemplar": [p[0] for p in activos],
+                        "ISBN": [p[1] for p in activos],
+                        "Título": [p[2] for p in activos],
+                        "Vence": [p[4][:10] for p in activos],
+                    },
+                    use_container_width=True
+                )
+
+    with tab_devolver:
+        ejemplar = st.number_input("Número de ejemplar", min_value=1, step=1, key="devolucion_ejemplar")
+        if st.button("Registrar devolución"):
+            _mostrar_resultado(*devolver(int(ejemplar)))
+
+    with tab_ejemplares:
+        isbn = st.text_input("ISBN del libro", key="ejemplares_isbn")
+        if isbn.strip():
+            estado = disponibilidad(isbn.strip())
+            st.write(
+                f"**Disponibles:** {estado['disponibles']} · **Prestados:** {estado['prestados']} "
+                f"· **De baja:** {estado['baja']}"
+            )
+            cantidad = st.number_input("Ejemplares a agregar", min_value=1, max_value=100, step=1)
+            if st.button("Agregar ejemplares"):
+                _mostrar_resultado(*agregar_ejemplares(isbn.strip(), int(cantidad)))
+
+    with tab_vencidos:
+        vencidos = prestamos_vencidos(limite=500)
+        if not vencidos:
+            st.info("No hay préstamos vencidos.")
+        else:
+            st.warning(f"{len(vencidos)} préstamo(s) vencido(s) (se muestran hasta 500).")
+            st.dataframe(
+                {
+                    "Venció": [v[0][:10] for v in vencidos],
+                    "Ejemplar": [v[1] for v in vencidos],
+                    "Usuario": [v[2] for v in vencidos],
+                    "ISBN": [v[3] for v in vencidos],
+                    "Título": [v[4] for v in vencidos],
+                },
+                use_container_width=True
+            )
+
+
+# ================== PANEL DE ADMINISTRACIÓN ==================
+
+def _cambiar_umbral_lenta():
+    # Callback: solo corre cuando el admin cambia el valor del cuadro
+    instrumentacion.umbral_lenta_ms = st.session_state.umbral_lenta_ms
+
+
+def vista_admin():
+    st.header("🛠️ Panel de administración")
 
+    st.subheader("Consultas SQL")
+    if not INSTRUMENTAR_CONSULTAS:
+        st.info("La instrumentación está desactivada: se activa con BIBLIO_INSTRUMENTAR=1.")
 
+    col1, col2 = st.columns(2)
+    with col1:
+        # El umbral es de todo el proceso: el cuadro muestra el valor vigente
+        # (otra sesión pudo cambiarlo) y solo se escribe cuando el admin lo edita
+        st.session_state.umbral_lenta_ms = float(instrumentacion.umbral_lenta_ms)
+        st.number_input(
+            "Umbral de consulta lenta (ms)",
+            min_value=0.0,
+            step=10.0,
+            key="umbral_lenta_ms",
+            on_change=_cambiar_umbral_lenta,
+        )
+    with col2:
+        if st.button("Reiniciar estadísticas"):
+            instrumentacion.reiniciar_estadisticas()
+
+    consultas = instrumentacion.estadisticas_consultas()
+    if not consultas:
+        st.info("Todavía no hay consultas registradas.")
+    else:
+        st.dataframe(
+            {
+                "Sitio": [c["sitio"] for c in consultas],
+                "SQL": [c["sql"] for c in consultas],
+                "Llamadas": [c["llamadas"] for c in consultas],
+                "Filas": [c["filas"] for c in consultas],
+                "Total ms": [c["total_ms"] for c in consultas],
+                "Media ms": [c["media_ms"] for c in consultas],
+                "p50 ms": [c["p50_ms"] for c in consultas],
+                "p95 ms": [c["p95_ms"] for c in consultas],
+                "p99 ms": [c["p99_ms"] for c in consultas],
+                "Máx ms": [c["max_ms"] for c in consultas],
+            },
+            use_container_width=True
+        )
+
+    lentas = instrumentacion.consultas_lentas()
+    st.subheader(f"Consultas lentas ({len(lentas)})")
+    for lenta in lentas[:50]:
+        with st.expander(f"{lenta['ms']} ms · {lenta['sitio']} · {lenta['momento']}"):
+            st.code(lenta["sql"], language="sql")
+            st.write(f"**Filas:** {lenta['filas']}")
+            if lenta["plan"]:
+                st.code("\n".join(lenta["plan"]), language="text")
+
+    st.subheader("Alta masiva de usuarios")
+    archivo = st.file_uploader(
+        "CSV con columnas username,password", type=["csv"], key="alta_usuarios_csv"
+    )
+    if archivo is not None and st.button("Crear usuarios"):
+        with st.spinner("Creando usuarios…"):
+            resultado = crear_usuarios_batch(leer_csv_usuarios(archivo))
+        st.success(
+            f"{resultado['creados']} usuario(s) creado(s) en {resultado['segundos']:.1f} s "
+            f"({resultado['por_segundo']:.0f} por segundo)."
+        )
+        rechazados = [r for r in resultado["resultados"] if not r[2]]
+        if rechazados:
+            st.warning(f"{len(rechazados)} fila(s) no se crearon:")
+            st.dataframe(
+                {
+                    "Fila": [r[0] for r in rechazados],
+                    "Usuario": [r[1] for r in rechazados],
+                    "Motivo": [r[3] for r in rechazados],
+                },
+                use_container_width=True
+            )
+
+    st.subheader("Inicios de sesión")
+    login = estadisticas_login()
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write("**Por usuario**")
+        st.json(login["usuarios"])
+    with col2:
+        st.write("**Por cliente**")
+        st.json(login["clientes"])
+    if login["bloqueados"]:
+        st.warning(f"{len(login['bloqueados'])} usuario(s)/cliente(s) bloqueado(s):")
+        st.dataframe(
+            {
+                "Tipo": [b[0] for b in login["bloqueados"]],
+                "Clave": [b[1] for b in login["bloqueados"]],
+                "Segundos restantes": [round(b[2]) for b in login["bloqueados"]],
+                "Fallos seguidos": [b[3] for b in login["bloqueados"]],
+            },
+            use_container_width=True
+        )
+
+    st.subheader("Caché de Google Books")
+    google = estadisticas_cache_google_books()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Tasa de aciertos", f"{google['tasa_aciertos']:.0%}")
+    col2.metric("Consultas a la red", google["consultas_red"])
+    col3.metric("Tiempo ahorrado", f"{google['segundos_ahorrados']:.1f} s")
+    col4.metric("Entradas", f"{google['entradas']} / {google['max_entradas']}")
+
+    st.subheader("Catálogo en memoria")
+    catalogo = obtener_catalogo().estadisticas()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Libros", f"{catalogo['libros']} / {catalogo['max_libros']}")
+    col2.metric("Memoria", f"{catalogo['memoria_bytes'] / 2**20:.1f} MiB")
+    col3.metric("Por 100k libros", f"{catalogo['bytes_por_100k_libros'] / 2**20:.1f} MiB")
+    col4.metric("Recargas", catalogo["recargas"])
+    if catalogo["desbordado"]:
+        st.warning("El catálogo superó el máximo: la vista de todos los libros pagina sobre la BD.")
+
+    st.subheader("Conexiones, caché, escrituras y contraseñas")
+    st.json({
+        "pools": estadisticas_pools(),
+        "cache_libros": estadisticas_cache_libros(),
+        "catalogo_memoria": catalogo,
+        "escritura": estadisticas_escritura(),
+        "hash_contrasenas": estadisticas_hash(),
+        "sesiones": estadisticas_sesiones(),
+        "google_books": google,
+        "esquema": estado_esquema(),
+    })
 
 
 
 # ================== INICIALIZACIÓN Y FLUJO PRINCIPAL ==================
 
-# Crear tablas necesarias (libros + usuarios, con admin por defecto)
-init_db()
-init_users_table()
+# Crear/actualizar tablas necesarias (libros + usuarios, con admin por defecto).
+# Solo trabaja en el primer rerun del proceso; los siguientes retornan de inmediato.
+asegurar_esquema()
+
+if not st.session_state.logged_in:
+    restaurar_sesion()
+sesion_navegador.aplicar_cookie()
 
 if not st.session_state.logged_in:
     pantalla_login()
@@ -875,6 +1366,8 @@ else:
 
     if opcion == "Buscar libro por ISBN":
         vista_buscar()
+    elif opcion == "Buscar libro por título o autor":
+        vista_buscar_texto()
     elif opcion == "Registrar libro":
         vista_registrar()
     elif opcion == "Actualizar libro por ISBN":
@@ -885,5 +1378,9 @@ else:
         vista_todos()
     elif opcion == "Escanear libro con cámara (IA)":
         vista_escanear_libro()
+    elif opcion == "Préstamos y devoluciones":
+        vista_prestamos()
+    elif opcion == "Panel de administración" and es_admin():
+        vista_admin()
     elif opcion == "Cerrar sesión":
         cerrar_sesion()
@@ -0,0 +1,46 @@
+#********************************************************************************
+#   CONFTEST - Cada prueba usa su propia base de datos (nunca data/biblioteca.db)
+#********************************************************************************
+
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+# Ruta absoluta a la raíz del proyecto y a src/
+ROOT_DIR = Path(__file__).resolve().parent.parent
+for ruta in (ROOT_DIR, ROOT_DIR / "src"):
+    if str(ruta) not in sys.path:
+        sys.path.insert(0, str(ruta))
+
+# bcrypt al mínimo: las pruebas no miden el costo del hash
+os.environ.setdefault("BIBLIO_BCRYPT_ROUNDS", "4")
+
+import cache_google_books
+import crud_libros
+import crud_usuarios
+from database import PREFIJO_MEMORIA, cerrar_pools
+
+MOTORES = ("archivo", "memoria")
+
+@pytest.fixture
+def destino(request, tmp_path, monkeypatch):
+
+    """
+    Base de datos vacía y migrada. Por defecto en memoria; con
+    @pytest.mark.parametrize("destino", MOTORES, indirect=True) corre con
+    ambos motores.
+    """
+    motor = getattr(request, "param", "memoria")
+    if motor == "memoria":
+        destino = f"{PREFIJO_MEMORIA}prueba_{uuid.uuid4().hex}"
+    else:
+        destino = tmp_path / "biblioteca.db"
+    for modulo in (crud_libros, crud_usuarios, cache_google_books):
+        monkeypatch.setattr(modulo, "DB_PATH", destino)
+    crud_libros._cache_libros.limpiar()
+    crud_libros.init_db()
+    yield destino
+    cerrar_pools()
@@ -0,0 +1,92 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import crud_libros
+from acceso_async import AccesoAsync
+from database import Llamada, registrar_llamada
+from isbn import _digito_control_13
+
+LENTA = (
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1000000000) "
+    "SELECT COUNT(*) FROM c"
+)
+
+def _isbn(n):
+    base = f"978000002{n:03d}"
+    return base + _digito_control_13(base)
+
+def _consulta_lenta():
+    with crud_libros.get_connection() as conn:
+        return conn.execute(LENTA).fetchone()[0]
+
+def test_timeout_interrumpe_la_consulta_y_libera_el_hilo(destino):
+    async def escenario():
+        acceso = AccesoAsync(lectores=1)
+        try:
+            inicio = time.perf_counter()
+            with pytest.raises(asyncio.TimeoutError):
+                await acceso._leer(_consulta_lenta, timeout=0.2)
+            # El único lector quedó libre enseguida: la consulta se abortó
+            libro = await acceso.buscar_libro("9780306406157", timeout=5)
+            return libro, time.perf_counter() - inicio
+        finally:
+            acceso.cerrar()
+
+    libro, segundos = asyncio.run(escenario())
+    assert libro is None
+    assert segundos < 3
+
+def test_interrumpir_una_llamada_terminada_no_toca_la_siguiente(destino):
+    # La llamada A ya terminó; el mismo hilo corre ahora la llamada B
+    anterior = Llamada()
+    with registrar_llamada(anterior):
+        crud_libros.buscar_libro("9780306406157")
+
+    resultado = {}
+    actual = Llamada()
+
+    def llamada_b():
+        with registrar_llamada(actual):
+            with crud_libros.get_connection() as conn:
+                resultado["filas"] = conn.execute(
+                    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 2000000) "
+                    "SELECT COUNT(*) FROM c"
+                ).fetchone()[0]
+
+    hilo = threading.Thread(target=llamada_b)
+    hilo.start()
+    time.sleep(0.05)
+    assert anterior.interrumpir() is False
+    hilo.join()
+    assert resultado["filas"] == 2000000
+
+def test_llamada_interrumpida_no_toma_mas_conexiones(destino):
+    llamada = Llamada()
+    llamada.interrumpir()
+    with registrar_llamada(llamada):
+        with pytest.raises(sqlite3.OperationalError):
+            crud_libros.buscar_texto("cien")
+
+def test_escrituras_async_comparten_commit(destino, monkeypatch):
+    # Con un solo hilo escritor la cola recibía una escritura a la vez
+    monkeypatch.setattr(crud_libros._cola_escritura, "ventana", 0.05)
+    antes = crud_libros.estadisticas_escritura()
+
+    async def escenario():
+        acceso = AccesoAsync(escritores=8)
+        try:
+            return await asyncio.gather(*(
+                acceso.insertar_libro(_isbn(n), f"Libro {n}", "", 0, "", timeout=10) for n in range(16)
+            ))
+        finally:
+            acceso.cerrar()
+
+    resultados = asyncio.run(escenario())
+    assert all(ok for ok, _ in resultados)
+    despues = crud_libros.estadisticas_escritura()
+    assert despues["escrituras"] - antes["escrituras"] == 16
+    assert despues["commits"] - antes["commits"] < 16
@@ -0,0 +1,52 @@
+import pytest
+
+import crud_libros
+from autocompletar import IndiceAutocompletar
+from config import AUTOCOMPLETAR_SUGERENCIAS
+from isbn import _digito_control_13
+
+def _isbn(n):
+    base = f"978300{n:06d}"
+    return base + _digito_control_13(base)
+
+LIBROS = [
+    (_isbn(1), "Cien años de soledad", "Gabriel García Márquez", 1967, "Sudamericana"),
+    (_isbn(2), "El amor en los tiempos del cólera", "Gabriel García Márquez", 1985, "Oveja Negra"),
+    (_isbn(3), "Crónica de una muerte anunciada", "Gabriel García Márquez", 1981, "Oveja Negra"),
+    (_isbn(4), "Pedro Páramo", "Juan Rulfo", 1955, "FCE"),
+]
+
+@pytest.fixture
+def indice(destino):
+    crud_libros.insertar_libros_batch(LIBROS)
+    return IndiceAutocompletar()
+
+def test_prefijo_sin_acentos_ni_mayusculas(indice):
+    for texto in ("garcia ma", "GARCÍA MÁ", "Garc Marq"):
+        assert indice.sugerir(texto) == [("Gabriel García Márquez", "autor", 3)]
+    assert indice.sugerir("CRONICA") == [("Crónica de una muerte anunciada", "titulo", 1)]
+    assert indice.sugerir("paramo", tipo="autor") == []
+    assert indice.sugerir("zzz") == []
+
+def test_limite_de_sugerencias(indice):
+    crud_libros.insertar_libros_batch(
+        (_isbn(100 + n), f"Libro número {n}", f"Autora {n}", 2000, "") for n in range(30)
+    )
+    sugerencias = indice.sugerir("libro")
+    assert len(sugerencias) == AUTOCOMPLETAR_SUGERENCIAS
+    assert all(texto.startswith("Libro número") for texto, _, _ in sugerencias)
+    assert len(indice.sugerir("libro", k=3)) == 3
+    assert len(indice.sugerir("lib", k=50)) == 30
+
+def test_el_indice_se_actualiza_tras_insertar(indice):
+    assert indice.sugerir("rayuela") == []
+    recargas = indice.estadisticas()["recargas"]
+
+    assert crud_libros.insertar_libro(_isbn(5), "Rayuela", "Julio Cortázar", 1963, "Sudamericana")[0]
+    assert indice.sugerir("rayu") == [("Rayuela", "titulo", 1)]
+    assert indice.sugerir("cortazar") == [("Julio Cortázar", "autor", 1)]
+    # Incremental: se aplicó el cambio sin recargar todo el catálogo
+    assert indice.estadisticas()["recargas"] == recargas
+
+    assert crud_libros.eliminar_libro(_isbn(5))[0]
+    assert indice.sugerir("rayu") == []
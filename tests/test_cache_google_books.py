@@ -0,0 +1,50 @@
+import pytest
+
+from cache_google_books import CacheGoogleBooks
+
+@pytest.fixture
+def cache(destino, monkeypatch):
+    cache = CacheGoogleBooks(max_entradas=20)
+    cache.conteos = 0
+    contar = cache._contar_entradas
+
+    def contar_espiado(conn):
+        cache.conteos += 1
+        return contar(conn)
+
+    monkeypatch.setattr(cache, "_contar_entradas", contar_espiado)
+    return cache
+
+def _entradas(cache):
+    with cache._conexion() as conn:
+        return conn.execute("SELECT COUNT(*) FROM cache_google_books").fetchone()[0]
+
+def test_desaloja_sin_contar_en_cada_escritura(cache):
+    for n in range(200):
+        cache.guardar(f"isbn:{n}", {"titulo": f"Libro {n}"})
+        assert _entradas(cache) <= cache.max_entradas
+
+    # Un conteo al arrancar y uno por desalojo (cada uno libera un 10 % extra)
+    assert cache.conteos <= 1 + 200 // (cache.max_entradas // 10)
+    assert cache.estadisticas()["desalojos"] == 200 - _entradas(cache)
+    # Se quedan las más recientes
+    assert cache.obtener("isbn:199", lambda: pytest.fail("fue a la red")) == {"titulo": "Libro 199"}
+
+def test_actualizar_la_misma_clave_no_desaloja(cache):
+    for n in range(cache.max_entradas):
+        cache.guardar(f"isbn:{n}", None)
+    for _ in range(100):
+        cache.guardar("isbn:0", {"titulo": "Libro 0"})
+    # La cota sube con cada actualización, pero el conteo real la corrige
+    assert _entradas(cache) == cache.max_entradas
+    assert cache.estadisticas()["desalojos"] == 0
+
+def test_limpiar_reinicia_la_cota(cache):
+    for n in range(10):
+        cache.guardar(f"isbn:{n}", None)
+    cache.limpiar()
+    conteos = cache.conteos
+    for n in range(cache.max_entradas):
+        cache.guardar(f"isbn:{n}", None)
+    assert cache.conteos == conteos
+    assert _entradas(cache) == cache.max_entradas
@@ -0,0 +1,42 @@
+import sqlite3
+
+import pytest
+
+import crud_libros
+
+CIEN = ("9780306406157", "Cien años de soledad", "García Márquez", 1967, "Sudamericana")
+PARAMO = ("9788433920867", "Pedro Páramo", "Juan Rulfo", 1955, "Anagrama")
+NUEVO = ("9781861972712", "El llano en llamas", "Juan Rulfo", 1953, "FCE")
+
+def _aciertos():
+    return crud_libros.estadisticas_cache_libros()["aciertos"]
+
+@pytest.mark.parametrize("destino", ["archivo"], indirect=True)
+def test_escritura_de_otra_conexion_invalida_la_cache(destino):
+    crud_libros.insertar_libros_batch([CIEN, PARAMO])
+    for isbn in (CIEN[0], PARAMO[0], NUEVO[0]):
+        crud_libros.buscar_libro(isbn)          # Llena la caché (NUEVO como None)
+    aciertos = _aciertos()
+    assert crud_libros.buscar_libro(CIEN[0]) == CIEN
+    assert _aciertos() == aciertos + 1
+
+    # Otro proceso escribe directo en el archivo, sin pasar por crud_libros:
+    # solo los triggers de cambios_libros se enteran
+    externa = sqlite3.connect(destino)
+    with externa:
+        externa.execute("UPDATE libros SET titulo = 'Cien años' WHERE isbn = ?", (CIEN[0],))
+        externa.execute("INSERT INTO libros (isbn, titulo, autor, anio, editorial) VALUES (?, ?, ?, ?, ?)", NUEVO)
+    externa.close()
+
+    assert crud_libros.buscar_libro(CIEN[0])[1] == "Cien años"
+    assert crud_libros.buscar_libro(NUEVO[0]) == NUEVO
+    # Lo que no cambió se sigue sirviendo desde la caché
+    aciertos = _aciertos()
+    assert crud_libros.buscar_libro(PARAMO[0]) == PARAMO
+    assert _aciertos() == aciertos + 1
+
+    externa = sqlite3.connect(destino)
+    with externa:
+        externa.execute("DELETE FROM libros WHERE isbn = ?", (PARAMO[0],))
+    externa.close()
+    assert crud_libros.buscar_libro(PARAMO[0]) is None
@@ -0,0 +1,50 @@
+import crud_libros
+from catalogo_memoria import CatalogoColumnar
+from isbn import _digito_control_13
+
+def _isbn(i):
+    base = f"978100000{i:03d}"
+    return base + _digito_control_13(base)
+
+def _insertar(*numeros):
+    crud_libros.insertar_libros_batch(
+        (_isbn(i), f"Libro {i}", "Autor", 2000 + i, "Era") for i in numeros
+    )
+
+def test_cambios_incrementales(destino):
+    _insertar(1, 2)
+    catalogo = CatalogoColumnar(max_libros=10)
+    assert catalogo.disponible() and len(catalogo) == 2
+
+    _insertar(3)
+    crud_libros.eliminar_libro(_isbn(1))
+    filas, total = catalogo.consultar()
+    assert total == 2 and [f[0] for f in filas] == [_isbn(2), _isbn(3)]
+    assert catalogo.estadisticas()["recargas"] == 1
+
+def test_se_recupera_del_desborde(destino):
+    _insertar(1, 2, 3)
+    catalogo = CatalogoColumnar(max_libros=3)
+    assert catalogo.disponible()
+
+    _insertar(4)
+    assert not catalogo.disponible()
+
+    crud_libros.eliminar_libro(_isbn(4))
+    assert catalogo.disponible()
+    assert catalogo.consultar()[1] == 3
+
+    # De vuelta al modo incremental, sin recargar todo en cada cambio
+    recargas = catalogo.estadisticas()["recargas"]
+    crud_libros.eliminar_libro(_isbn(3))
+    assert catalogo.disponible() and catalogo.consultar()[1] == 2
+    assert catalogo.estadisticas()["recargas"] == recargas
+
+def test_estadisticas_de_memoria(destino):
+    _insertar(*range(1, 51))
+    catalogo = CatalogoColumnar(max_libros=100)
+    assert catalogo.disponible()
+    e = catalogo.estadisticas()
+    assert e["libros"] == 50 and not e["desbordado"]
+    assert e["memoria_bytes"] == catalogo.memoria_bytes() > 0
+    assert e["bytes_por_100k_libros"] == int(e["memoria_bytes"] / 50 * 100000)
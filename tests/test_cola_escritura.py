@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+import crud_libros
+from isbn import _digito_control_13
+
+LIBRO = ("9780306406157", "Cien años de soledad", "García Márquez", 1967, "Sudamericana")
+
+@pytest.fixture
+def cola(destino):
+    return crud_libros.ColaEscritura()
+
+def test_error_despues_del_commit_no_detiene_la_cola(cola, monkeypatch):
+    def falla(isbns):
+        raise RuntimeError("caché rota")
+
+    monkeypatch.setattr(crud_libros, "_despues_de_escribir", falla)
+    ok, _ = cola.enviar(crud_libros._op_insertar, *LIBRO, timeout=5)
+    assert ok
+    # El hilo escritor sigue vivo y atiende la siguiente escritura
+    ok, _ = cola.enviar(crud_libros._op_actualizar, LIBRO[0], "Otro título", *LIBRO[2:], timeout=5)
+    assert ok
+    assert cola.estadisticas()["commits"] == 2
+    with crud_libros.get_connection() as conn:
+        assert conn.execute("SELECT titulo FROM libros").fetchone() == ("Otro título",)
+
+def test_error_inesperado_responde_a_todos_los_llamadores(cola, monkeypatch):
+    def revienta(lote):
+        raise RuntimeError("error interno")
+
+    with monkeypatch.context() as parche:
+        parche.setattr(cola, "_confirmar", revienta)
+        with pytest.raises(RuntimeError):
+            cola.enviar(crud_libros._op_insertar, *LIBRO, timeout=5)
+    assert cola.enviar(crud_libros._op_insertar, *LIBRO, timeout=5)[0]
+
+def test_escrituras_concurrentes_comparten_commit(cola):
+    resultados = []
+    barrera = threading.Barrier(20)
+
+    def escribir(n):
+        barrera.wait()
+        base = f"978000001{n:03d}"
+        isbn = base + _digito_control_13(base)
+        resultados.append(cola.enviar(crud_libros._op_insertar, isbn, f"Libro {n}", "", 0, "", timeout=5))
+
+    hilos = [threading.Thread(target=escribir, args=(n,)) for n in range(20)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert all(ok for ok, _ in resultados) and len(resultados) == 20
+    assert cola.estadisticas()["escrituras"] == 20
@@ -0,0 +1,42 @@
+import crud_libros
+from config import UMBRAL_DUPLICADO
+from duplicados import buscar_duplicados, posibles_duplicados, similitud
+
+CIEN = ("9780306406157", "Cien años de soledad", "Gabriel García Márquez", 1967, "Sudamericana")
+CIEN_OTRA = ("9788433920867", "Cien Años De Soledad (Edición conmemorativa)", "García Márquez, Gabriel", 2007, "RAE")
+PARAMO = ("9781861972712", "Pedro Páramo", "Juan Rulfo", 1955, "FCE")
+SOLEDAD = ("9780451524935", "El laberinto de la soledad", "Octavio Paz", 1950, "Cuadernos Americanos")
+
+def test_similitud_sobre_y_bajo_el_umbral():
+    assert similitud(CIEN[1], CIEN[2], CIEN_OTRA[1], CIEN_OTRA[2]) >= UMBRAL_DUPLICADO
+    assert similitud(CIEN[1], CIEN[2], SOLEDAD[1], SOLEDAD[2]) < UMBRAL_DUPLICADO
+
+def test_buscar_duplicados(destino):
+    crud_libros.insertar_libros_batch([CIEN, CIEN_OTRA, PARAMO, SOLEDAD])
+    r = buscar_duplicados()
+    assert r["libros"] == 4
+    assert [set(par[1:]) for par in r["pares"]] == [{CIEN[0], CIEN_OTRA[0]}]
+    assert r["pares"][0][0] >= UMBRAL_DUPLICADO
+    assert [set(grupo) for grupo in r["grupos"]] == [{CIEN[0], CIEN_OTRA[0]}]
+
+def test_posibles_duplicados(destino):
+    crud_libros.insertar_libros_batch([CIEN, PARAMO, SOLEDAD])
+    parecidos = posibles_duplicados(CIEN_OTRA[1], CIEN_OTRA[2])
+    assert [libro[0] for _, libro in parecidos] == [CIEN[0]]
+    # Comparte "soledad", pero es otra obra
+    assert posibles_duplicados("Soledad de otoño", "Ana Pérez") == []
+    # Al editar un libro no se lo compara consigo mismo
+    assert posibles_duplicados(CIEN[1], CIEN[2], isbn=CIEN[0]) == []
+
+def test_insertar_bloquea_o_permite_duplicados(destino):
+    assert crud_libros.insertar_libro(*CIEN)[0]
+
+    ok, msg = crud_libros.insertar_libro(*CIEN_OTRA, permitir_duplicado=False)
+    assert not ok and msg == f"Posible duplicado de: {CIEN[1]} ({CIEN[0]})."
+    assert crud_libros.buscar_libro(CIEN_OTRA[0]) is None
+
+    # Un título distinto pasa aunque se pida revisar
+    assert crud_libros.insertar_libro(*SOLEDAD, permitir_duplicado=False)[0]
+    # Y con permitir_duplicado (el valor por defecto) se registra igual
+    assert crud_libros.insertar_libro(*CIEN_OTRA)[0]
+    assert crud_libros.buscar_libro(CIEN_OTRA[0])[1] == CIEN_OTRA[1]
@@ -0,0 +1,164 @@
+import sqlite3
+import threading
+
+import pytest
+
+import crud_libros
+import esquema
+from database import cerrar_pools
+
+@pytest.fixture
+def ruta(tmp_path, monkeypatch):
+    # Base de datos nueva, sin migrar, y el memo del proceso sin tocar
+    monkeypatch.setattr(esquema, "_listas", set())
+    monkeypatch.setattr(esquema, "_estado", {})
+    yield tmp_path / "nueva.db"
+    cerrar_pools()
+
+def _version(ruta):
+    conn = sqlite3.connect(ruta)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_varios_hilos_migran_una_sola_vez(ruta, monkeypatch):
+    llamadas = {}
+
+    def contar(numero, migracion):
+        def espia(cursor):
+            llamadas[numero] = llamadas.get(numero, 0) + 1
+            return migracion(cursor)
+        return espia
+
+    monkeypatch.setattr(esquema, "MIGRACIONES", [
+        (numero, descripcion, contar(numero, migracion))
+        for numero, descripcion, migracion in esquema.MIGRACIONES
+    ])
+
+    hilos = 8
+    barrera = threading.Barrier(hilos)
+    errores = []
+
+    def trabajar():
+        barrera.wait()
+        try:
+            esquema.asegurar_esquema(ruta)
+        except Exception as e:
+            errores.append(e)
+
+    trabajadores = [threading.Thread(target=trabajar) for _ in range(hilos)]
+    for t in trabajadores:
+        t.start()
+    for t in trabajadores:
+        t.join()
+
+    assert errores == []
+    assert _version(ruta) == esquema.VERSION_ESQUEMA
+    assert llamadas == {numero: 1 for numero, _, _ in esquema.MIGRACIONES}
+    estado = esquema.estado_esquema(ruta)
+    assert len(estado["migraciones_aplicadas"]) == len(esquema.MIGRACIONES)
+    assert estado["llamadas_omitidas"] == hilos - 1
+
+    # Otro proceso (sin memo) encuentra la base al día y no repite nada
+    esquema._listas.clear()
+    esquema.asegurar_esquema(ruta)
+    assert esquema.estado_esquema(ruta)["migraciones_aplicadas"] == []
+    assert llamadas == {numero: 1 for numero, _, _ in esquema.MIGRACIONES}
+
+def test_colisiones_de_isbn_quedan_reportadas(ruta, caplog):
+    # Base en la versión 4 con el mismo libro escrito de dos formas
+    conn = sqlite3.connect(ruta)
+    cursor = conn.cursor()
+    for numero, _, migracion in esquema.MIGRACIONES[:4]:
+        migracion(cursor)
+    cursor.execute("PRAGMA user_version = 4")
+    cursor.executemany(
+        "INSERT INTO libros (isbn, titulo) VALUES (?, ?)",
+        [("0-306-40615-2", "Cien años de soledad"), ("978-0306406157", "Cien años de soledad"),
+         ("sin-isbn", "Pedro Páramo")],
+    )
+    conn.commit()
+    conn.close()
+
+    with caplog.at_level("WARNING", logger="biblioteca.esquema"):
+        esquema.asegurar_esquema(ruta)
+
+    reporte = esquema.estado_esquema(ruta)["reportes"][5]
+    assert reporte["convertidos"] == [("0-306-40615-2", "9780306406157")]
+    assert reporte["colisiones"] == [("978-0306406157", "9780306406157")]
+    assert reporte["invalidos"] == ["sin-isbn"]
+    assert "978-0306406157 colisiona con 9780306406157" in caplog.text
+
+    # La fila que colisiona se conserva tal cual
+    conn = sqlite3.connect(ruta)
+    isbns = sorted(fila[0] for fila in conn.execute("SELECT isbn FROM libros"))
+    conn.close()
+    assert isbns == ["978-0306406157", "9780306406157", "sin-isbn"]
+
+CIEN = ("9780306406157", "Cien años de soledad", "García Márquez", 1967, "Sudamericana")
+PARAMO = ("9788433920867", "Pedro Páramo", "Juan Rulfo", 1955, "Anagrama")
+FICCIONES = ("9781861972712", "Ficciones", "Jorge Luis Borges", 1944, "Sur")
+
+@pytest.mark.parametrize("destino", ["archivo"], indirect=True)
+def test_texto_completo_sobrevive_a_vacuum(destino):
+    crud_libros.insertar_libros_batch([CIEN, PARAMO, FICCIONES])
+    crud_libros.eliminar_libro(CIEN[0])         # Deja un hueco en los id
+
+    conn = sqlite3.connect(destino)
+    try:
+        # libros_fts se enlaza por rowid: tiene que ser un alias (id) y no el
+        # rowid implícito, que SQLite puede renumerar
+        columnas = {fila[1]: fila for fila in conn.execute("PRAGMA table_info(libros)")}
+        assert columnas["id"][2] == "INTEGER" and columnas["id"][5] == 1
+        antes = conn.execute("SELECT rowid, id FROM libros ORDER BY isbn").fetchall()
+        conn.execute("VACUUM")
+        assert conn.execute("SELECT rowid, id FROM libros ORDER BY isbn").fetchall() == antes
+    finally:
+        conn.close()
+
+    assert [f[0] for f in crud_libros.buscar_texto("borges")] == [FICCIONES[0]]
+    assert [f[0] for f in crud_libros.buscar_texto("rulfo")] == [PARAMO[0]]
+    assert crud_libros.buscar_texto("soledad") == []
+
+def test_migracion_12_conserva_libros_y_claves_foraneas(ruta):
+    # Base en la versión 11, con huecos en el rowid y un ejemplar
+    conn = sqlite3.connect(ruta)
+    conn.execute("PRAGMA foreign_keys = ON")
+    cursor = conn.cursor()
+    for _, _, migracion in esquema.MIGRACIONES[:11]:
+        migracion(cursor)
+    cursor.execute("PRAGMA user_version = 11")
+    cursor.executemany(
+        "INSERT INTO libros (isbn, titulo, autor, anio, editorial) VALUES (?, ?, ?, ?, ?)",
+        [CIEN, PARAMO, FICCIONES],
+    )
+    cursor.execute("DELETE FROM libros WHERE isbn = ?", (CIEN[0],))
+    cursor.execute("INSERT INTO ejemplares (isbn, alta) VALUES (?, '')", (PARAMO[0],))
+    conn.commit()
+    antes = conn.execute("SELECT rowid, isbn FROM libros ORDER BY isbn").fetchall()
+    objetos = conn.execute(
+        "SELECT type, name FROM sqlite_master WHERE tbl_name = 'libros' ORDER BY name"
+    ).fetchall()
+    conn.close()
+
+    esquema.asegurar_esquema(ruta)
+    assert esquema.estado_esquema(ruta)["migraciones_aplicadas"] == [
+        "12: Id entero estable en libros (rowid de libros_fts)"
+    ]
+
+    conn = sqlite3.connect(ruta)
+    conn.execute("PRAGMA foreign_keys = ON")
+    try:
+        assert conn.execute("SELECT id, isbn FROM libros ORDER BY isbn").fetchall() == antes
+        # Los mismos índices y triggers que antes
+        assert conn.execute(
+            "SELECT type, name FROM sqlite_master WHERE tbl_name = 'libros' ORDER BY name"
+        ).fetchall() == objetos
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO ejemplares (isbn, alta) VALUES ('no-existe', '')")
+        # Copiar las filas no se registró como cambio
+        assert conn.execute("SELECT COUNT(*) FROM cambios_libros").fetchone()[0] == 4
+    finally:
+        conn.close()
@@ -0,0 +1,24 @@
+import gzip
+import json
+
+import crud_libros
+from database import cerrar_pools
+
+def test_exportar_desde_la_linea_de_comandos_con_bd_nueva(tmp_path, monkeypatch):
+    # Base de datos sin migrar: el comando debe dejarla lista antes de leer
+    monkeypatch.setattr(crud_libros, "DB_PATH", tmp_path / "nueva.db")
+    try:
+        crud_libros._main(["exportar", str(tmp_path / "catalogo.csv")])
+    finally:
+        cerrar_pools()
+    assert (tmp_path / "catalogo.csv").read_text(encoding="utf-8") == "isbn,titulo,autor,anio,editorial\n"
+
+def test_exportar_jsonl_comprimido(destino, tmp_path):
+    crud_libros.insertar_libro("9780306406157", "Cien años de soledad", "García Márquez", 1967, "Sudamericana")
+    salida = tmp_path / "catalogo.jsonl.gz"
+    assert crud_libros.exportar_a_archivo(salida) == salida.stat().st_size
+    filas = [json.loads(linea) for linea in gzip.decompress(salida.read_bytes()).splitlines()]
+    assert filas == [{
+        "isbn": "9780306406157", "titulo": "Cien años de soledad", "autor": "García Márquez",
+        "anio": 1967, "editorial": "Sudamericana",
+    }]
@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+import crud_libros
+from isbn import _digito_control_13
+
+LIBROS = [
+    ("9780306406157", "Cien años de soledad", "Gabriel García Márquez", 1967, "Sudamericana"),
+    ("9788433920867", "Pedro Páramo", "Juan Rulfo", 1955, "Anagrama"),
+]
+
+def _libro(n):
+    base = f"978100{n:06d}"
+    return (base + _digito_control_13(base), f"Libro {n}", "Autor", 2000, "Editorial")
+
+def test_filas_vacias_se_rechazan_sin_abortar_el_lote(destino):
+    filas = [LIBROS[0], (), [], {}, None, ("9788433920867", "Pedro Páramo"), LIBROS[1]]
+    r = crud_libros.insertar_libros_batch(filas, tamano_lote=3)
+
+    assert r["escritos"] == 2
+    assert [n for n, _, _ in r["conflictos"]] == [2, 3, 4, 5, 6]
+    assert r["conflictos"][0][1] is None
+    assert r["conflictos"][4][1] == "9788433920867"
+    assert crud_libros.buscar_libro(LIBROS[1][0]) == LIBROS[1]
+
+def test_isbn_duplicado_se_reporta_como_conflicto(destino):
+    crud_libros.insertar_libros_batch(LIBROS[:1])
+    r = crud_libros.insertar_libros_batch(LIBROS)
+
+    assert r["escritos"] == 1
+    assert r["conflictos"] == [(1, LIBROS[0][0], "Ya existe un libro con ese ISBN.")]
+
+@pytest.mark.parametrize("agrupada", [True, False])
+@pytest.mark.parametrize("destino", ["archivo"], indirect=True)
+def test_lotes_mientras_otros_hilos_escriben(destino, monkeypatch, agrupada):
+    # Con transacciones diferidas, un lote que lee y después escribe choca
+    # con el commit de otro hilo (SQLITE_BUSY_SNAPSHOT, sin reintento)
+    monkeypatch.setattr(crud_libros, "ESCRITURA_AGRUPADA", agrupada)
+    catalogo = [_libro(n) for n in range(300)]
+    crud_libros.insertar_libros_batch(catalogo)
+    isbns = [libro[0] for libro in catalogo]
+
+    errores = []
+    detener = threading.Event()
+
+    def insertar(hilo):
+        n = 0
+        while not detener.is_set():
+            try:
+                ok, msg = crud_libros.insertar_libro(*_libro(100000 * (hilo + 1) + n))
+                assert ok, msg
+            except Exception as error:
+                errores.append(error)
+            n += 1
+
+    hilos = [threading.Thread(target=insertar, args=(h,)) for h in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    try:
+        for ronda in range(20):
+            resultados = crud_libros.actualizar_libros_batch(isbns, cambios={"editorial": f"Ronda {ronda}"})
+            assert all(ok for ok, _ in resultados.values()), resultados
+            r = crud_libros.insertar_libros_batch(_libro(5000 + ronda * 10 + i) for i in range(10))
+            assert r["escritos"] == 10, r
+        resultados = crud_libros.eliminar_libros_batch(isbns[:100])
+        assert all(ok for ok, _ in resultados.values()), resultados
+    finally:
+        detener.set()
+        for hilo in hilos:
+            hilo.join()
+    assert errores == []
+    assert crud_libros.buscar_libro(isbns[200])[4] == "Ronda 19"
+    assert crud_libros.buscar_libro(isbns[0]) is None
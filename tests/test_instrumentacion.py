@@ -0,0 +1,76 @@
+import ast
+import gc
+import logging
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import instrumentacion
+from instrumentacion import ConexionInstrumentada
+
+APP = Path(__file__).resolve().parent.parent / "src" / "streamlit_app.py"
+
+@pytest.fixture
+def conn(monkeypatch):
+    # La bitácora de la prueba no escribe en data/consultas_lentas.log
+    monkeypatch.setattr(instrumentacion, "_bitacora", logging.getLogger("prueba.consultas_lentas"))
+    instrumentacion.reiniciar_estadisticas()
+    conexion = sqlite3.connect(":memory:", factory=ConexionInstrumentada)
+    conexion.execute("CREATE TABLE t (n INTEGER)")
+    conexion.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(10)])
+    yield conexion
+    conexion.close()
+    instrumentacion.reiniciar_estadisticas()
+
+def test_plan_se_captura_en_execute(conn, monkeypatch):
+    monkeypatch.setattr(instrumentacion, "umbral_lenta_ms", 0.0)
+    cursor = conn.execute("SELECT n FROM t")
+    cursor.fetchone()
+
+    # Desde aquí la conexión ya no se puede usar: el plan tiene que estar
+    # tomado desde execute
+    monkeypatch.setattr(instrumentacion, "_plan", lambda *a: pytest.fail("plan pedido fuera de execute"))
+    del cursor
+    gc.collect()
+    lenta = instrumentacion.consultas_lentas()[0]
+    assert lenta["sql"] == "SELECT n FROM t"
+    assert any("SCAN" in paso for paso in lenta["plan"])
+
+def test_finalizador_no_toca_la_conexion(conn, monkeypatch):
+    cursor = conn.execute("SELECT n FROM t")
+    cursor.fetchone()
+
+    # Pasa el umbral recién al liberar el cursor: se registra sin plan
+    monkeypatch.setattr(instrumentacion, "umbral_lenta_ms", 0.0)
+    monkeypatch.setattr(instrumentacion, "_plan", lambda *a: pytest.fail("__del__ pidió el plan"))
+    del cursor
+    gc.collect()
+    lenta = instrumentacion.consultas_lentas()[0]
+    assert lenta["filas"] == 1
+    assert lenta["plan"] == ["(plan no capturado: cursor sin cerrar)"]
+
+def test_lectura_completa_captura_el_plan(conn, monkeypatch):
+    cursor = conn.execute("SELECT n FROM t")
+    monkeypatch.setattr(instrumentacion, "umbral_lenta_ms", 0.0)
+    assert len(cursor.fetchall()) == 10
+    lenta = instrumentacion.consultas_lentas()[0]
+    assert lenta["filas"] == 10
+    assert any("SCAN" in paso for paso in lenta["plan"])
+
+def test_panel_solo_cambia_el_umbral_desde_el_callback():
+    # Asignarlo en el cuerpo de la vista lo reescribiría en cada rerun de
+    # cualquier sesión de admin, aunque nadie tocara el cuadro
+    arbol = ast.parse(APP.read_text(encoding="utf-8"))
+    callbacks = {
+        k.value.id for nodo in ast.walk(arbol) if isinstance(nodo, ast.Call)
+        for k in nodo.keywords if k.arg == "on_change" and isinstance(k.value, ast.Name)
+    }
+    asignan = [
+        funcion.name for funcion in ast.walk(arbol) if isinstance(funcion, ast.FunctionDef)
+        for nodo in ast.walk(funcion) if isinstance(nodo, ast.Assign)
+        for destino in nodo.targets
+        if isinstance(destino, ast.Attribute) and destino.attr == "umbral_lenta_ms"
+        and getattr(destino.value, "id", None) == "instrumentacion"
+    ]
+    assert asignan and set(asignan) <= callbacks
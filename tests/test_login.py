@@ -0,0 +1,107 @@
+import pytest
+
+import crud_usuarios
+
+@pytest.fixture
+def lector(destino):
+    crud_usuarios.reiniciar_limites_login()
+    ok, msg = crud_usuarios.create_user("lector", "clave-correcta")
+    assert ok, msg
+    yield "lector"
+    crud_usuarios.reiniciar_limites_login()
+
+def _hashes():
+    return crud_usuarios.estadisticas_hash()["hashes"]
+
+def _intentos(usuario, n, cliente=None):
+    for i in range(n):
+        ok, _ = crud_usuarios.verify_user(usuario, f"mala{i}", cliente=cliente)
+        assert not ok
+
+@pytest.mark.parametrize("usuario", ["lector", "no_existe"])
+@pytest.mark.parametrize("cliente", [None, "203.0.113.7"])
+def test_hashes_fijos_ante_intentos_fallidos(lector, usuario, cliente):
+    crud_usuarios._hash_senuelo()       # El señuelo se calcula una sola vez
+    antes = _hashes()
+    _intentos(usuario, 50, cliente)
+    tras_50 = _hashes()
+    assert 0 < tras_50 - antes <= crud_usuarios.LOGIN_INTENTOS_USUARIO
+
+    # Diez veces más intentos no cuestan ni un hash más
+    _intentos(usuario, 500, cliente)
+    assert _hashes() == tras_50
+
+def test_cliente_frena_el_recorrido_de_cuentas(lector):
+    # Muchas cuentas, existentes o no, desde un mismo cliente: el límite por
+    # cliente corta antes que el de cada usuario
+    crud_usuarios._hash_senuelo()
+    antes = _hashes()
+    cuentas = ["lector"] + [f"no_existe{n}" for n in range(200)]
+    for i, cuenta in enumerate(cuentas * 3):
+        crud_usuarios.verify_user(cuenta, f"mala{i}", cliente="203.0.113.7")
+    assert _hashes() - antes <= crud_usuarios.LOGIN_INTENTOS_CLIENTE
+
+def test_reiniciar_limites_login(lector):
+    _intentos("lector", 20)
+    ok, msg = crud_usuarios.verify_user("lector", "clave-correcta")
+    assert not ok and msg.startswith("Demasiados")
+    crud_usuarios.reiniciar_limites_login()
+    assert crud_usuarios.verify_user("lector", "clave-correcta") == (True, "OK")
+
+def test_xff_solo_detras_de_un_proxy_de_confianza(monkeypatch):
+    monkeypatch.setattr(crud_usuarios, "LOGIN_CONFIAR_PROXY", False)
+    # Rotar la cabecera no da un cliente nuevo
+    assert crud_usuarios.clave_cliente("10.0.0.1", "1.2.3.4") == "10.0.0.1"
+    assert crud_usuarios.clave_cliente(None, "1.2.3.4") is None
+
+    monkeypatch.setattr(crud_usuarios, "LOGIN_CONFIAR_PROXY", True)
+    # Vale el salto que agregó el proxy, no lo que mandó el cliente antes
+    assert crud_usuarios.clave_cliente("10.0.0.1", "6.6.6.6, 203.0.113.7") == "203.0.113.7"
+    assert crud_usuarios.clave_cliente("10.0.0.1", None) == "10.0.0.1"
+
+def _agotar(limite, clave):
+    while not limite.consumir(clave):
+        pass
+
+def test_rechazo_por_cliente_no_gasta_intentos_del_usuario(lector):
+    _agotar(crud_usuarios._limite_cliente, "203.0.113.7")
+    for _ in range(10):
+        ok, msg = crud_usuarios.verify_user(lector, "mala", cliente="203.0.113.7")
+        assert msg.startswith("Demasiados")
+    assert crud_usuarios.verify_user(lector, "clave-correcta", cliente="198.51.100.1") == (True, "OK")
+
+def test_rechazo_por_usuario_no_gasta_intentos_del_cliente(lector):
+    _agotar(crud_usuarios._limite_usuario, lector)
+    for _ in range(50):
+        ok, msg = crud_usuarios.verify_user(lector, "mala", cliente="203.0.113.7")
+        assert msg.startswith("Demasiados")
+    fichas = crud_usuarios._limite_cliente._estado["203.0.113.7"][0]
+    assert fichas >= crud_usuarios.LOGIN_INTENTOS_CLIENTE - 1
+
+def test_ficha_del_usuario_se_devuelve_si_el_cliente_se_agota_en_medio(lector, monkeypatch):
+    # Otro hilo agotó al cliente entre la revisión y el gasto
+    _agotar(crud_usuarios._limite_cliente, "203.0.113.7")
+    monkeypatch.setattr(crud_usuarios._limite_cliente, "espera", lambda clave: 0.0)
+    for _ in range(10):
+        ok, msg = crud_usuarios.verify_user(lector, "mala", cliente="203.0.113.7")
+        assert msg.startswith("Demasiados")
+    assert crud_usuarios._limite_usuario._estado[lector][0] >= crud_usuarios.LOGIN_INTENTOS_USUARIO - 1
+
+def _costo_guardado(username):
+    with crud_usuarios.get_connection() as conn:
+        fila = conn.execute("SELECT password_hash FROM usuarios WHERE username = ?", (username,)).fetchone()
+    return crud_usuarios.costo_hash(fila[0])
+
+def test_admin_inicial_usa_bcrypt_rounds(destino):
+    assert _costo_guardado("admin") == crud_usuarios.BCRYPT_ROUNDS
+
+def test_login_rehace_el_hash_con_el_costo_nuevo(lector, monkeypatch):
+    assert _costo_guardado(lector) == 4
+    rehashes = crud_usuarios.estadisticas_hash()["rehashes"]
+
+    monkeypatch.setattr(crud_usuarios, "BCRYPT_ROUNDS", 5)
+    assert crud_usuarios.verify_user(lector, "clave-correcta") == (True, "OK")
+    assert _costo_guardado(lector) == 5
+    assert crud_usuarios.estadisticas_hash()["rehashes"] == rehashes + 1
+    # La contraseña sigue valiendo con el hash nuevo
+    assert crud_usuarios.verify_user(lector, "clave-correcta") == (True, "OK")
@@ -0,0 +1,106 @@
+import sqlite3
+
+import pytest
+
+import crud_libros
+import crud_prestamos
+from conftest import MOTORES
+from database import MotorArchivo, MotorMemoria, crear_motor, obtener_pool
+
+# El mismo contrato CRUD para los dos motores: lo que pase con el archivo de
+# producción debe pasar igual con la base en memoria de pruebas y benchmarks
+
+pytestmark = pytest.mark.parametrize("destino", MOTORES, indirect=True)
+
+CIEN = ("9780306406157", "Cien años de soledad", "Gabriel García Márquez", 1967, "Sudamericana")
+PARAMO = ("9788433920867", "Pedro Páramo", "Juan Rulfo", 1955, "Anagrama")
+FICCIONES = ("9788420633114", "Ficciones", "Jorge Luis Borges", 1944, "Alianza")
+
+def test_crear_motor_segun_destino(destino):
+    motor = obtener_pool(destino).motor
+    esperado = MotorMemoria if str(destino).startswith("memoria:") else MotorArchivo
+    assert isinstance(motor, esperado)
+    assert isinstance(crear_motor(destino), esperado)
+
+def test_pragmas_de_cada_conexion(destino):
+    with crud_libros.get_connection() as conn:
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2     # MEMORY
+        modo = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    # WAL solo existe en disco; memdb usa su propio diario en memoria
+    assert modo == ("memory" if str(destino).startswith("memoria:") else "wal")
+
+def test_insertar_buscar_actualizar_eliminar(destino):
+    assert crud_libros.insertar_libro(*CIEN)[0]
+    assert crud_libros.insertar_libro(*CIEN) == (False, "Ya existe un libro con ese ISBN.")
+    # Cualquier forma del ISBN resuelve al mismo libro
+    assert crud_libros.buscar_libro("0-306-40615-2") == CIEN
+
+    assert crud_libros.actualizar_libro(CIEN[0], "Cien años", *CIEN[2:])[0]
+    assert crud_libros.buscar_libro(CIEN[0])[1] == "Cien años"
+
+    assert crud_libros.eliminar_libro(CIEN[0])[0]
+    assert crud_libros.buscar_libro(CIEN[0]) is None
+    assert crud_libros.eliminar_libro(CIEN[0]) == (False, "No se encontró un libro con ese ISBN.")
+
+def test_busqueda_de_texto_completo(destino):
+    crud_libros.insertar_libros_batch([CIEN, PARAMO, FICCIONES])
+    assert [f[0] for f in crud_libros.buscar_texto("cien sol")] == [CIEN[0]]
+    assert [f[0] for f in crud_libros.buscar_texto("RULFO")] == [PARAMO[0]]
+    # Los triggers mantienen el índice FTS al actualizar y eliminar
+    crud_libros.actualizar_libro(FICCIONES[0], "El Aleph", *FICCIONES[2:])
+    crud_libros.eliminar_libro(PARAMO[0])
+    assert crud_libros.buscar_texto("ficciones") == []
+    assert crud_libros.buscar_texto("rulfo") == []
+    assert [f[0] for f in crud_libros.buscar_texto("aleph")] == [FICCIONES[0]]
+
+def test_lotes_con_tabla_temporal(destino):
+    r = crud_libros.insertar_libros_batch([CIEN, PARAMO, FICCIONES, CIEN], tamano_lote=2)
+    assert r["escritos"] == 3 and r["lotes"] == 2 and len(r["conflictos"]) == 1
+
+    inexistente = "9780000000002"
+    cambios = crud_libros.actualizar_libros_batch([CIEN[0], PARAMO[0], inexistente], {"editorial": "Era"})
+    assert cambios[inexistente][0] is False
+    assert [crud_libros.buscar_libro(i)[4] for i in (CIEN[0], PARAMO[0], FICCIONES[0])] == ["Era", "Era", "Alianza"]
+
+    # La tabla temporal se reutiliza en la misma conexión sin arrastrar ISBN
+    borrados = crud_libros.eliminar_libros_batch([PARAMO[0], inexistente])
+    assert borrados == {
+        PARAMO[0]: (True, "Libro eliminado correctamente."),
+        inexistente: (False, "No se encontró un libro con ese ISBN."),
+    }
+    assert [f[0] for f in crud_libros.obtener_todos()] == [CIEN[0], FICCIONES[0]]
+
+def test_claves_foraneas(destino):
+    crud_libros.insertar_libro(*CIEN)
+    assert crud_prestamos.agregar_ejemplares(CIEN[0], 2)[0]
+    assert crud_libros.eliminar_libro(CIEN[0]) == (
+        False, "El libro tiene ejemplares registrados; no se puede eliminar."
+    )
+    with crud_libros.get_connection() as conn:
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO ejemplares (isbn, estado, alta) VALUES ('no-existe', 'disponible', '')")
+        conn.rollback()
+
+def test_version_datos_cambia_con_commits_de_otra_conexion(destino):
+    pool = obtener_pool(destino)
+    antes = pool.version_datos()
+    assert pool.version_datos() == antes
+    crud_libros.insertar_libro(*CIEN)
+    assert pool.version_datos() != antes
+
+def test_seguidor_de_cambios(destino):
+    seguidor = crud_libros.SeguidorCambios()
+    assert seguidor.sincronizar() is None           # Primera llamada: cargar todo
+    assert seguidor.sincronizar() == set()          # Sin commits
+    crud_libros.insertar_libros_batch([CIEN, PARAMO])
+    crud_libros.eliminar_libro(CIEN[0])
+    assert seguidor.sincronizar() == {CIEN[0], PARAMO[0]}
+    assert seguidor.sincronizar() == set()
+
+def test_pagina_por_cursor(destino):
+    crud_libros.insertar_libros_batch([CIEN, PARAMO, FICCIONES])
+    filas, siguiente, anterior = crud_libros.obtener_pagina(tamano=2)
+    assert [f[1] for f in filas] == ["Cien años de soledad", "Ficciones"] and anterior is None
+    filas, siguiente, anterior = crud_libros.obtener_pagina(tamano=2, despues=siguiente)
+    assert [f[1] for f in filas] == ["Pedro Páramo"] and siguiente is None
@@ -0,0 +1,106 @@
+import pytest
+
+import crud_libros
+from isbn import _digito_control_13
+
+# Cada forma de filtro de filtrar_libros / facetas_libros y el plan que debe
+# usar: ninguna recorre la tabla completa ni ordena todo el catálogo
+
+def _plan(sql, params):
+    with crud_libros.get_connection() as conn:
+        return [fila[3] for fila in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+def _isbn(i):
+    base = f"978000000{i:03d}"
+    return base + _digito_control_13(base)
+
+@pytest.fixture
+def catalogo(destino):
+    editoriales = ("Anagrama", "Planeta", "Alfaguara", "Era")
+    r = crud_libros.insertar_libros_batch(
+        (_isbn(i), f"Título {i}", f"Autor {i % 40}", 1950 + i % 70, editoriales[i % 4])
+        for i in range(400)
+    )
+    assert r["escritos"] == 400
+    return destino
+
+CASOS_FILTRAR = [
+    ({}, "SCAN libros USING INDEX idx_libros_titulo_isbn"),
+    ({"despues": ("Título 5", "9780000000050")},
+     "SEARCH libros USING INDEX idx_libros_titulo_isbn ((titulo,isbn)>(?,?))"),
+    ({"autor": "autor 3"}, "SEARCH libros USING INDEX idx_libros_autor_titulo (autor=?)"),
+    ({"editorial": "era"}, "SEARCH libros USING INDEX idx_libros_editorial_titulo (editorial=?)"),
+    ({"autor": "autor 3", "anio_desde": 1990},
+     "SEARCH libros USING INDEX idx_libros_autor_titulo (autor=?)"),
+    ({"editorial": "era", "anio_desde": 1990, "anio_hasta": 2000},
+     "SEARCH libros USING INDEX idx_libros_editorial_titulo (editorial=?)"),
+    ({"autor": "autor 3", "despues": ("Título 5", "9780000000050")},
+     "SEARCH libros USING INDEX idx_libros_autor_titulo (autor=? AND (titulo,isbn)>(?,?))"),
+]
+
+@pytest.mark.parametrize("filtros, esperado", CASOS_FILTRAR)
+def test_plan_filtrar_libros(catalogo, filtros, esperado):
+    plan = _plan(*crud_libros._sql_filtrar(**filtros))
+    assert plan == [esperado]
+
+CASOS_ANIOS = [
+    ({"anio_desde": 2000}, "(anio>?)"),
+    ({"anio_hasta": 1960}, "(anio<?)"),
+    ({"anio_desde": 1990, "anio_hasta": 2000}, "(anio>? AND anio<?)"),
+]
+
+@pytest.mark.parametrize("filtros, rango", CASOS_ANIOS)
+def test_plan_rango_de_anios_acotado(catalogo, filtros, rango):
+    # Pocos libros en el rango: se buscan por año y se ordenan solo ésos
+    with crud_libros.get_connection() as conn:
+        assert crud_libros._rango_acotado(conn.cursor(), filtros.get("anio_desde"), filtros.get("anio_hasta"))
+    plan = _plan(*crud_libros._sql_filtrar(**filtros, por_anio=True))
+    assert plan == [
+        f"SEARCH libros USING INDEX idx_libros_anio_editorial {rango}",
+        "USE TEMP B-TREE FOR ORDER BY",
+    ]
+
+@pytest.mark.parametrize("filtros, rango", CASOS_ANIOS)
+def test_plan_rango_de_anios_amplio(catalogo, monkeypatch, filtros, rango):
+    # Muchos libros en el rango: por título, sin ordenar nada aparte
+    monkeypatch.setattr(crud_libros, "FILTRO_ANIO_MAX_ORDENAR", 10)
+    with crud_libros.get_connection() as conn:
+        assert not crud_libros._rango_acotado(conn.cursor(), filtros.get("anio_desde"), filtros.get("anio_hasta"))
+    plan = _plan(*crud_libros._sql_filtrar(**filtros, por_anio=False))
+    assert plan == ["SCAN libros USING INDEX idx_libros_titulo_isbn"]
+
+CASOS_FACETAS = [
+    ({}, ["SCAN libros USING COVERING INDEX idx_libros_anio_editorial",
+          "SCAN libros USING COVERING INDEX idx_libros_editorial_titulo"]),
+    ({"anio_desde": 2000}, ["SEARCH libros USING COVERING INDEX idx_libros_anio_editorial (anio>?)",
+                            "SEARCH libros USING COVERING INDEX idx_libros_anio_editorial (anio>?)"]),
+    ({"autor": "autor 3"}, ["SEARCH libros USING INDEX idx_libros_autor_titulo (autor=?)",
+                            "SEARCH libros USING INDEX idx_libros_autor_titulo (autor=?)"]),
+    ({"editorial": "era", "anio_desde": 1990},
+     ["SEARCH libros USING INDEX idx_libros_editorial_titulo (editorial=?)",
+      "SEARCH libros USING INDEX idx_libros_editorial_titulo (editorial=?)"]),
+]
+
+@pytest.mark.parametrize("filtros, esperados", CASOS_FACETAS)
+def test_plan_facetas_libros(catalogo, filtros, esperados):
+    plan = _plan(*crud_libros._sql_facetas(**filtros))
+    accesos = [paso for paso in plan if paso.startswith(("SCAN", "SEARCH"))]
+    assert accesos == esperados
+    # Ninguna mitad de la faceta lee la tabla completa
+    assert "SCAN libros" not in plan
+
+def test_filtros_devuelven_lo_mismo_por_cualquier_indice(catalogo, monkeypatch):
+    todos = crud_libros.filtrar_libros(tamano=1000)
+    esperado = [f for f in todos if f[3] >= 2000][:50]
+    assert crud_libros.filtrar_libros(anio_desde=2000) == esperado
+    monkeypatch.setattr(crud_libros, "FILTRO_ANIO_MAX_ORDENAR", 10)
+    assert crud_libros.filtrar_libros(anio_desde=2000) == esperado
+
+    pagina = crud_libros.filtrar_libros(autor="AUTOR 3", tamano=4)
+    siguiente = crud_libros.filtrar_libros(autor="autor 3", tamano=4, despues=(pagina[-1][1], pagina[-1][0]))
+    assert pagina + siguiente == crud_libros.filtrar_libros(autor="autor 3", tamano=8)
+
+    facetas = crud_libros.facetas_libros(anio_desde=2000)
+    assert sum(n for _, n in facetas["anio"]) == sum(n for _, n in facetas["editorial"]) == len(
+        [f for f in todos if f[3] >= 2000]
+    )
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+import pytest
+
+import crud_libros
+import crud_prestamos
+import crud_usuarios
+from config import PRESTAMOS_POR_USUARIO
+
+CIEN = ("9780306406157", "Cien años de soledad", "García Márquez", 1967, "Sudamericana")
+PARAMO = ("9788433920867", "Pedro Páramo", "Juan Rulfo", 1955, "Anagrama")
+
+@pytest.fixture
+def biblioteca(destino):
+    for libro in (CIEN, PARAMO):
+        assert crud_libros.insertar_libro(*libro)[0]
+    assert crud_prestamos.agregar_ejemplares(CIEN[0], PRESTAMOS_POR_USUARIO + 3)[0]
+    assert crud_prestamos.agregar_ejemplares(PARAMO[0], 1)[0]
+    for usuario in ("lector", "otra"):
+        assert crud_usuarios.create_user(usuario, "clave-correcta")[0]
+
+def _ejemplares(isbn):
+    return [fila[0] for fila in crud_prestamos.ejemplares_de(isbn)]
+
+def test_limite_de_prestamos_por_usuario(biblioteca):
+    for _ in range(PRESTAMOS_POR_USUARIO):
+        ok, msg = crud_prestamos.prestar("lector", isbn=CIEN[0])
+        assert ok, msg
+    ok, msg = crud_prestamos.prestar("lector", isbn=CIEN[0])
+    assert (ok, msg) == (False, f"El usuario ya tiene {PRESTAMOS_POR_USUARIO} préstamos activos.")
+    assert crud_prestamos.disponibilidad(CIEN[0])["prestados"] == PRESTAMOS_POR_USUARIO
+
+    # Al devolver uno vuelve a tener cupo
+    ejemplar = crud_prestamos.prestamos_de_usuario("lector")[0][0]
+    assert crud_prestamos.devolver(ejemplar)[0]
+    assert crud_prestamos.prestar("lector", isbn=CIEN[0])[0]
+
+def test_ejemplar_ya_prestado(biblioteca):
+    ejemplar = _ejemplares(PARAMO[0])[0]
+    assert crud_prestamos.prestar("lector", ejemplar_id=ejemplar)[0]
+    # El UPDATE condicionado al estado pierde: no hay doble préstamo
+    assert crud_prestamos.prestar("otra", ejemplar_id=ejemplar) == (False, "Ese ejemplar no está disponible.")
+    assert crud_prestamos.prestar("otra", isbn=PARAMO[0]) == (False, "No hay ejemplares disponibles de ese libro.")
+    assert crud_prestamos.prestamos_de_usuario("otra") == []
+
+def test_ejemplar_de_otro_libro(biblioteca):
+    ejemplar = _ejemplares(PARAMO[0])[0]
+    ok, msg = crud_prestamos.prestar("lector", isbn=CIEN[0], ejemplar_id=ejemplar)
+    assert (ok, msg) == (False, f"El ejemplar {ejemplar} no es de ese libro.")
+    assert crud_prestamos.disponibilidad(PARAMO[0])["disponibles"] == 1
+    assert crud_prestamos.prestar("lector", isbn=CIEN[0], ejemplar_id=999999) == (False, "No existe ese ejemplar.")
+    # ISBN y ejemplar que coinciden (en cualquier forma del ISBN)
+    assert crud_prestamos.prestar("lector", isbn="978-84-339-2086-7", ejemplar_id=ejemplar)[0]
+
+def test_devolver_dos_veces(biblioteca):
+    ejemplar = _ejemplares(PARAMO[0])[0]
+    assert crud_prestamos.prestar("lector", ejemplar_id=ejemplar)[0]
+    assert crud_prestamos.devolver(ejemplar) == (True, f"Ejemplar {ejemplar} devuelto.")
+    assert crud_prestamos.devolver(ejemplar) == (False, "Ese ejemplar no tiene un préstamo activo.")
+    assert crud_prestamos.disponibilidad(PARAMO[0]) == {"disponibles": 1, "prestados": 0, "baja": 0, "total": 1}
+
+def test_vencidos_paginados(biblioteca):
+    # Dos préstamos por plazo: los empates en `vence` se ordenan por ejemplar
+    plazos = {"lector": [1, 1, 2, 3, 4], "otra": [2, 5]}
+    for usuario, dias in plazos.items():
+        for d in dias:
+            assert crud_prestamos.prestar(usuario, isbn=CIEN[0], dias=d)[0]
+    # Uno que vence después del corte no aparece
+    assert crud_prestamos.prestar("otra", isbn=PARAMO[0], dias=30)[0]
+
+    al = crud_prestamos._ahora() + timedelta(days=10)
+    todos = crud_prestamos.prestamos_vencidos(al=al)
+    assert len(todos) == 7 == crud_prestamos.contar_vencidos(al=al)
+    assert [fila[:2] for fila in todos] == sorted(fila[:2] for fila in todos)
+
+    paginas, despues = [], None
+    while True:
+        pagina = crud_prestamos.prestamos_vencidos(al=al, limite=3, despues=despues)
+        if not pagina:
+            break
+        paginas.append(pagina)
+        despues = pagina[-1][:2]
+    assert [len(p) for p in paginas] == [3, 3, 1]
+    assert [fila for pagina in paginas for fila in pagina] == todos
@@ -0,0 +1,121 @@
+import ast
+import importlib
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+import crud_usuarios
+from config import SESION_COOKIE
+
+APP = Path(__file__).resolve().parent.parent / "src" / "streamlit_app.py"
+
+class _Estado(dict):
+    __getattr__ = dict.get
+
+    def __setattr__(self, nombre, valor):
+        self[nombre] = valor
+
+@pytest.fixture
+def st(monkeypatch):
+    # Streamlit falso: lo justo para lo que toca sesion_navegador
+    falso = types.ModuleType("streamlit")
+    falso.query_params = {}
+    falso.session_state = _Estado()
+    falso.context = types.SimpleNamespace(cookies={})
+    falso.dibujado = []
+    componentes = types.ModuleType("streamlit.components.v1")
+    componentes.html = lambda html, **kwargs: falso.dibujado.append(html)
+    falso.components = types.SimpleNamespace(v1=componentes)
+    monkeypatch.setitem(sys.modules, "streamlit", falso)
+    monkeypatch.setitem(sys.modules, "streamlit.components", falso.components)
+    monkeypatch.setitem(sys.modules, "streamlit.components.v1", componentes)
+    monkeypatch.delitem(sys.modules, "sesion_navegador", raising=False)
+    return falso
+
+@pytest.fixture
+def sesion_navegador(st):
+    return importlib.import_module("sesion_navegador")
+
+@pytest.fixture
+def lector(destino):
+    ok, msg = crud_usuarios.create_user("lector", "clave-correcta")
+    assert ok, msg
+    return "lector"
+
+def _rerun(st, sesion_navegador):
+    sesion_navegador.aplicar_cookie()
+    return st.dibujado.pop() if st.dibujado else None
+
+def test_token_va_a_la_cookie_y_nunca_a_la_url(st, sesion_navegador, lector):
+    assert sesion_navegador.recordar(lector)
+    token = st.session_state["_token_sesion"]
+    assert st.dibujado == []     # Se escribe en el siguiente rerun
+    html = _rerun(st, sesion_navegador)
+    assert f'"{SESION_COOKIE}"' in html and f'"{token}"' in html
+    assert "SameSite=Strict" in html
+    assert token not in str(st.query_params)
+
+    # Ya aplicada, no se vuelve a escribir en cada rerun
+    assert _rerun(st, sesion_navegador) is None
+
+def test_recordar_y_cerrar_en_la_misma_sesion(st, sesion_navegador, lector):
+    # La cookie no aparece en st.context.cookies hasta recargar la página:
+    # cerrar sesión igual tiene que revocar el token y borrar la cookie
+    sesion_navegador.recordar(lector)
+    token = st.session_state["_token_sesion"]
+    _rerun(st, sesion_navegador)
+    assert st.context.cookies == {}
+
+    sesion_navegador.cerrar()
+    assert crud_usuarios.validar_sesion(token) is None
+    assert "Max-Age=0" in _rerun(st, sesion_navegador)
+
+    # Al recargar con la cookie vieja no se vuelve a entrar
+    st.context.cookies[SESION_COOKIE] = token
+    assert sesion_navegador.restaurar() is None
+
+def test_restaurar_y_cerrar(st, sesion_navegador, lector):
+    token = crud_usuarios.crear_sesion(lector)
+    st.context.cookies[SESION_COOKIE] = token
+    assert sesion_navegador.restaurar() == lector
+    sesion_navegador.cerrar()
+    assert crud_usuarios.validar_sesion(token) is None
+    assert "Max-Age=0" in _rerun(st, sesion_navegador)
+
+def test_cerrar_sin_token_borra_la_cookie(st, sesion_navegador):
+    sesion_navegador.cerrar()
+    assert "Max-Age=0" in _rerun(st, sesion_navegador)
+
+def test_cookie_invalida_se_borra(st, sesion_navegador, destino):
+    st.context.cookies[SESION_COOKIE] = "no.valido"
+    assert sesion_navegador.restaurar() is None
+    assert "Max-Age=0" in _rerun(st, sesion_navegador)
+
+def _es_query_params(nodo):
+    return isinstance(nodo, ast.Attribute) and nodo.attr == "query_params"
+
+def test_app_no_escribe_query_params():
+    arbol = ast.parse(APP.read_text(encoding="utf-8"))
+    for nodo in ast.walk(arbol):
+        if isinstance(nodo, ast.Assign):
+            for destino in nodo.targets:
+                assert not (isinstance(destino, ast.Subscript) and _es_query_params(destino.value)), (
+                    f"streamlit_app.py:{nodo.lineno} guarda algo en st.query_params"
+                )
+        if isinstance(nodo, ast.Call) and isinstance(nodo.func, ast.Attribute):
+            assert not (_es_query_params(nodo.func.value) and nodo.func.attr in ("update", "from_dict")), (
+                f"streamlit_app.py:{nodo.lineno} guarda algo en st.query_params"
+            )
+
+def test_mantener_sesion_apagado_por_defecto():
+    arbol = ast.parse(APP.read_text(encoding="utf-8"))
+    casillas = [
+        nodo for nodo in ast.walk(arbol)
+        if isinstance(nodo, ast.Call) and getattr(nodo.func, "attr", None) == "checkbox"
+        and nodo.args and getattr(nodo.args[0], "value", None) == "Mantener sesión iniciada"
+    ]
+    assert len(casillas) == 1
+    valor = {k.arg: k.value for k in casillas[0].keywords}.get("value")
+    assert valor is None or (isinstance(valor, ast.Constant) and valor.value is False)
@@ -0,0 +1,59 @@
+import io
+
+import crud_usuarios
+
+CSV = """username,password
+Ana,clave-ana
+beto,clave-beto
+ana,otra-clave
+,sin-usuario
+cd,clave-corta-de-usuario
+existente,clave-nueva
+carla,corta
+dario,clave-dario
+"""
+
+def test_importar_csv(destino):
+    ok, msg = crud_usuarios.create_user("existente", "clave-existente")
+    assert ok, msg
+
+    filas = crud_usuarios.leer_csv_usuarios(io.StringIO(CSV))
+    r = crud_usuarios.crear_usuarios_batch(filas, tamano_lote=3, procesos=2, rondas=4)
+
+    assert r["creados"] == 3
+    assert r["lotes"] == 3
+    por_fila = {numero: (username, ok, msg) for numero, username, ok, msg in r["resultados"]}
+    assert sorted(por_fila) == list(range(1, 9))
+    assert [n for n, (_, ok, _) in por_fila.items() if ok] == [1, 2, 8]
+    assert por_fila[3] == ("ana", False, "Usuario repetido en el archivo.")
+    assert por_fila[4][1:] == (False, "Usuario y contraseña son obligatorios.")
+    assert por_fila[5][1:] == (False, "El usuario debe tener al menos 3 caracteres.")
+    assert por_fila[6] == ("existente", False, "El usuario ya existe.")
+    assert por_fila[7][1:] == (False, "La contraseña debe tener al menos 6 caracteres.")
+
+    # Los hashes de los procesos hijos sirven para iniciar sesión, y el
+    # usuario que ya existía conserva su contraseña
+    crud_usuarios.reiniciar_limites_login()
+    assert crud_usuarios.verify_user("ana", "clave-ana") == (True, "OK")
+    assert crud_usuarios.verify_user("dario", "clave-dario") == (True, "OK")
+    assert crud_usuarios.verify_user("existente", "clave-existente") == (True, "OK")
+
+def test_filas_sin_columnas(destino):
+    r = crud_usuarios.crear_usuarios_batch([("solo_usuario",), ("eva", "clave-eva")], procesos=1, rondas=4)
+    assert r["creados"] == 1
+    assert r["resultados"][0] == (1, None, False, "Fila sin usuario y contraseña.")
+
+def test_procesos_con_spawn(destino, monkeypatch):
+    # Un fork copiaría el servidor multihilo con sus locks tomados
+    import concurrent.futures
+
+    contextos = []
+    original = concurrent.futures.ProcessPoolExecutor
+
+    def espia(*args, mp_context=None, **kwargs):
+        contextos.append(mp_context and mp_context.get_start_method())
+        return original(*args, mp_context=mp_context, **kwargs)
+
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", espia)
+    crud_usuarios.crear_usuarios_batch([("fede", "clave-fede")], procesos=1, rondas=4)
+    assert contextos == ["spawn"]